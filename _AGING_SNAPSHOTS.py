@@ -0,0 +1,209 @@
+import os
+import pandas as pd
+from datetime import datetime
+from _RECON_KEYS import canonical_order_number
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # the snapshot store needs pyarrow; loaders skip it without
+    pa = ds = pq = None
+
+# === CONFIGURATION ===
+# erp_aging_data only holds the latest pull. Every pull is also appended here
+# as one Parquet file per run, partitioned by run date:
+#   aging_snapshots/run_date=2026-10-18/aging_20261018_063000.parquet
+# Rows carry an int32 order_key instead of the order strings; the strings live
+# once in _order_keys.parquet. Repeated text columns are dictionary encoded,
+# so a daily pull of ~13k orders is a few tens of KB and a year of them stays
+# well clear of mad_recon.db. Queries read only the columns they need and the
+# run_date partitions in range.
+# Anchored to this file, like the other local data folders: loaders and the
+# dashboards run from different working directories and must share it
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "aging_snapshots")
+KEYS_FILE = "_order_keys.parquet"  # leading "_" keeps it out of the dataset
+TS_FORMAT = "%Y%m%d_%H%M%S"
+READ_CHUNK_ROWS = 50000
+# Rows are sorted by order_key and written in row groups of this size, so an
+# order lookup skips every row group whose key range does not contain it
+ROW_GROUP_ROWS = 4096
+COMPRESSION = "zstd"
+
+# Columns of the order-key dictionary, and of each snapshot row
+KEY_ATTRIBUTES = ["order-number", "cShopifyOrderNumber", "cShopifyOrderID"]
+STATE_COLUMNS = ["bo-number", "warehouse", "warehouse-status", "hold-code", "lHasFulfillment", "lHasShipment"]
+BACKLOG_GROUPS = ("warehouse", "hold-code", "warehouse-status", "lHasFulfillment", "lHasShipment")
+
+
+def _schemas():
+    keys = pa.schema([("order_key", pa.int32())] + [(c, pa.string()) for c in KEY_ATTRIBUTES])
+    rows = pa.schema(
+        [("snapshot_ts", pa.timestamp("s")), ("order_key", pa.int32())]
+        + [(c, pa.dictionary(pa.int32(), pa.string())) for c in STATE_COLUMNS]
+        + [("iAge", pa.int32())]
+    )
+    return keys, rows
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("the aging snapshot store needs pyarrow (pip install pyarrow)")
+
+
+def _partition(taken_at):
+    return f"run_date={taken_at:%Y-%m-%d}"
+
+
+def _replace_file(table, path):
+    # Written next to the target under a dotted name, then renamed over it
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    pq.write_table(table, tmp_path, compression=COMPRESSION, row_group_size=ROW_GROUP_ROWS)
+    os.replace(tmp_path, path)
+
+
+# === ORDER-KEY DICTIONARY ===
+def load_order_keys(snapshot_dir=SNAPSHOT_DIR):
+    # DataFrame: order_key plus KEY_ATTRIBUTES, one row per ERP order-number ever seen
+    _require_pyarrow()
+    path = os.path.join(snapshot_dir, KEYS_FILE)
+    if not os.path.exists(path):
+        return _schemas()[0].empty_table().to_pandas()
+    return pq.read_table(path).to_pandas()
+
+
+def _assign_keys(order_keys, chunk):
+    # order_keys: the dictionary indexed by order-number. Unseen order numbers
+    # get the next ids and known ones take the chunk's Shopify number/ID.
+    # Returns (order_keys, the chunk's keys).
+    attributes = chunk[KEY_ATTRIBUTES].drop_duplicates("order-number", keep="last").set_index("order-number")
+    new = attributes.index.difference(order_keys.index)
+    added = attributes.loc[new].assign(order_key=range(len(order_keys), len(order_keys) + len(new)))
+    order_keys = pd.concat([order_keys, added[order_keys.columns]])
+    order_keys.update(attributes)
+    return order_keys, order_keys["order_key"].reindex(chunk["order-number"]).to_numpy()
+
+
+# === WRITING ===
+def append_snapshot(frames, taken_at, snapshot_dir=SNAPSHOT_DIR):
+    # frames: iterable of DataFrames with the erp_aging_data columns, together
+    # one pull. Writes the pull's Parquet file and the updated dictionary;
+    # the snapshot file only appears once the dictionary covers its keys.
+    # Returns (path, rows).
+    _require_pyarrow()
+    key_schema, row_schema = _schemas()
+    partition_dir = os.path.join(snapshot_dir, _partition(taken_at))
+    os.makedirs(partition_dir, exist_ok=True)
+
+    order_keys = load_order_keys(snapshot_dir).set_index("order-number")
+    tables = []
+    for chunk in frames:
+        chunk = chunk[chunk["order-number"].notna()].astype({c: "string" for c in KEY_ATTRIBUTES + STATE_COLUMNS})
+        if chunk.empty:
+            continue
+        order_keys, keys = _assign_keys(order_keys, chunk)
+        rows = pd.DataFrame({"snapshot_ts": pd.Timestamp(taken_at).floor("s"), "order_key": keys})
+        for column in STATE_COLUMNS:
+            rows[column] = chunk[column].to_numpy()
+        rows["iAge"] = pd.to_numeric(chunk["iAge"], errors="coerce").astype("Int32").to_numpy()
+        tables.append(pa.Table.from_pandas(rows, schema=row_schema, preserve_index=False))
+    order_keys = order_keys.rename_axis("order-number").reset_index()[["order_key"] + KEY_ATTRIBUTES]
+
+    table = pa.concat_tables(tables).unify_dictionaries() if tables else row_schema.empty_table()
+    table = table.sort_by("order_key")
+    path = os.path.join(partition_dir, f"aging_{taken_at.strftime(TS_FORMAT)}.parquet")
+    _replace_file(pa.Table.from_pandas(order_keys, schema=key_schema, preserve_index=False),
+                  os.path.join(snapshot_dir, KEYS_FILE))
+    _replace_file(table, path)
+    return path, table.num_rows
+
+
+def snapshot_aging_table(conn, taken_at=None, snapshot_dir=SNAPSHOT_DIR, table="erp_aging_data"):
+    # Appends the current contents of erp_aging_data (the pull just applied)
+    # as one snapshot, read in chunks. taken_at defaults to the rows' timestamp.
+    if pa is None:
+        print("[!] pyarrow is not installed, aging snapshot skipped")
+        return None
+    if taken_at is None:
+        latest = conn.execute(f"SELECT MAX(timestamp) FROM {table}").fetchone()[0]
+        taken_at = datetime.strptime(latest, TS_FORMAT) if latest else datetime.now()
+    frames = pd.read_sql_query(f"SELECT * FROM {table}", conn, chunksize=READ_CHUNK_ROWS)
+    path, rows = append_snapshot(frames, taken_at, snapshot_dir)
+    print(f"[✓] Appended {rows:,} aging rows to snapshot {path} ({os.path.getsize(path) / 1024:,.0f} KB)")
+    return path
+
+
+# === QUERIES ===
+def _dataset(snapshot_dir):
+    partitioning = ds.partitioning(pa.schema([("run_date", pa.string())]), flavor="hive")
+    return ds.dataset(snapshot_dir, format="parquet", partitioning=partitioning)
+
+
+def _date_filter(start, end):
+    # start/end: anything pd.Timestamp accepts; both ends inclusive
+    return _and(ds.field("run_date") >= f"{pd.Timestamp(start):%Y-%m-%d}" if start is not None else None,
+                ds.field("run_date") <= f"{pd.Timestamp(end):%Y-%m-%d}" if end is not None else None)
+
+
+def _and(*expressions):
+    expressions = [e for e in expressions if e is not None]
+    if not expressions:
+        return None
+    combined = expressions[0]
+    for expression in expressions[1:]:
+        combined = combined & expression
+    return combined
+
+
+def snapshot_dates(snapshot_dir=SNAPSHOT_DIR):
+    # Run dates present in the store, oldest first
+    if not os.path.isdir(snapshot_dir):
+        return []
+    return sorted(name.split("=", 1)[1] for name in os.listdir(snapshot_dir) if name.startswith("run_date="))
+
+
+def order_trajectory(order_number, start=None, end=None, snapshot_dir=SNAPSHOT_DIR):
+    # Every snapshot of one order, oldest first. order_number is an ERP
+    # order-number or a Shopify order number ("#19424237" or "19424237"),
+    # which can match several ERP orders.
+    _require_pyarrow()
+    order_keys = load_order_keys(snapshot_dir)
+    shopify_number = canonical_order_number(pd.Series([str(order_number)])).iloc[0]
+    matches = order_keys[(order_keys["order-number"] == str(order_number).strip())
+                         | (order_keys["cShopifyOrderNumber"] == shopify_number)]
+    columns = ["snapshot_ts", "order_key"] + STATE_COLUMNS + ["iAge"]
+    if matches.empty or not snapshot_dates(snapshot_dir):
+        return pd.DataFrame(columns=["order-number"] + columns[:1] + columns[2:])
+
+    wanted = pa.array(matches["order_key"].to_numpy(), type=pa.int32())
+    table = _dataset(snapshot_dir).to_table(
+        columns=columns, filter=_and(ds.field("order_key").isin(wanted), _date_filter(start, end))
+    )
+    df = table.to_pandas().merge(matches[["order_key", "order-number"]], on="order_key")
+    return df[["order-number"] + columns[:1] + columns[2:]].sort_values(["order-number", "snapshot_ts"],
+                                                                        ignore_index=True)
+
+
+def backlog_over_time(by=("warehouse",), start=None, end=None, min_age=None, snapshot_dir=SNAPSHOT_DIR):
+    # One row per snapshot and group: orders in the backlog, their mean and
+    # max age. by: any of BACKLOG_GROUPS (empty for the whole backlog);
+    # min_age keeps only orders at least that many days old.
+    _require_pyarrow()
+    by = list(by)
+    unknown = set(by) - set(BACKLOG_GROUPS)
+    if unknown:
+        raise ValueError(f"cannot group the backlog by {', '.join(sorted(unknown))}")
+    if not snapshot_dates(snapshot_dir):
+        return pd.DataFrame(columns=["snapshot_ts"] + by + ["orders", "mean_age", "max_age"])
+
+    age_filter = ds.field("iAge") >= min_age if min_age is not None else None
+    table = _dataset(snapshot_dir).to_table(
+        columns=["snapshot_ts"] + by + ["iAge"], filter=_and(_date_filter(start, end), age_filter)
+    )
+    # Grouping keys as plain strings; NULL (e.g. no hold code) stays its own group
+    for column in by:
+        table = table.set_column(table.schema.get_field_index(column), column, table[column].cast(pa.string()))
+    grouped = table.group_by(["snapshot_ts"] + by).aggregate([([], "count_all"), ("iAge", "mean"), ("iAge", "max")])
+    df = grouped.to_pandas().rename(columns={"count_all": "orders", "iAge_mean": "mean_age", "iAge_max": "max_age"})
+    return df[["snapshot_ts"] + by + ["orders", "mean_age", "max_age"]].sort_values(["snapshot_ts"] + by,
+                                                                                    ignore_index=True)
@@ -0,0 +1,92 @@
+import os
+import time
+import sqlite3
+import tempfile
+import pandas as pd
+from _ERP_OPEN_ORDERS_SHOP_V2 import AGING_COLUMNS, bulk_upsert_aging
+
+# === CONFIGURATION ===
+# Loads erpAgingReport.csv replicated SCALES times into a fresh erp_aging_data,
+# then times a second run in which CHANGED_FRACTION of orders changed age and
+# DROPPED_FRACTION left the report. The old row-by-row loader is quadratic in
+# the table size, so it is only timed up to LEGACY_MAX_SCALE.
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SCALES = [1, 10, 100]
+LEGACY_MAX_SCALE = 1
+CHANGED_FRACTION = 0.05
+DROPPED_FRACTION = 0.02
+
+
+def legacy_load(conn, df_new, timestamp):
+    # The loader this replaced: SELECT *, then DELETE + INSERT per CSV row
+    # against an unkeyed table
+    df_new = df_new.copy()
+    df_new["timestamp"] = timestamp
+    cursor = conn.cursor()
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS erp_aging_data (
+        timestamp TEXT, "order-number" TEXT, "bo-number" TEXT, "warehouse" TEXT,
+        "cShopifyOrderNumber" TEXT, "cShopifyOrderID" TEXT, "warehouse-status" TEXT,
+        "hold-code" TEXT, "lHasFulfillment" TEXT, "lHasShipment" TEXT, "iAge" INTEGER
+    )
+    """)
+    existing_df = pd.read_sql_query("SELECT * FROM erp_aging_data", conn)
+    orders_to_delete = set(existing_df["order-number"].tolist()) - set(df_new["order-number"].tolist())
+    cursor.executemany("DELETE FROM erp_aging_data WHERE `order-number` = ?", [(o,) for o in orders_to_delete])
+    for _, row in df_new.iterrows():
+        cursor.execute("DELETE FROM erp_aging_data WHERE `order-number` = ?", (row["order-number"],))
+        cursor.execute("INSERT INTO erp_aging_data VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+            row["timestamp"], row["order-number"], str(row["bo-number"]), row["warehouse"],
+            row["cShopifyOrderNumber"], str(row["cShopifyOrderID"]), row["warehouse-status"],
+            row["hold-code"], row["lHasFulfillment"], row["lHasShipment"], int(row["iAge"])
+        ))
+    conn.commit()
+
+
+def scaled_report(base, scale):
+    frames = []
+    for i in range(scale):
+        frame = base.copy()
+        frame["order-number"] = frame["order-number"] + (f"-{i}" if i else "")
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def next_run(report):
+    changed = report.sample(frac=CHANGED_FRACTION, random_state=1).index
+    report = report.copy()
+    report.loc[changed, "iAge"] += 1
+    return report.drop(report.sample(frac=DROPPED_FRACTION, random_state=2).index)
+
+
+def time_loader(loader, first, second):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        started = time.monotonic()
+        loader(conn, first, "20250101_000000")
+        initial = time.monotonic() - started
+        started = time.monotonic()
+        loader(conn, second, "20250102_000000")
+        rerun = time.monotonic() - started
+        rows = conn.execute("SELECT COUNT(*) FROM erp_aging_data").fetchone()[0]
+        conn.close()
+    return initial, rerun, rows
+
+
+def main():
+    base = pd.read_csv(os.path.join(REPO_DIR, "erpAgingReport.csv"), header=None, names=AGING_COLUMNS)
+    print(f"[→] Base report: {len(base):,} rows; rerun changes {CHANGED_FRACTION:.0%} and drops {DROPPED_FRACTION:.0%}")
+    for scale in SCALES:
+        first = scaled_report(base, scale)
+        second = next_run(first)
+        initial, rerun, rows = time_loader(lambda c, d, t: bulk_upsert_aging(c, d, t), first, second)
+        print(f"[✓] {scale:>3}x ({len(first):>9,} rows) bulk upsert: initial {initial:7.2f}s  "
+              f"rerun {rerun:7.2f}s  {len(second) / rerun:10,.0f} rows/s  table={rows:,}")
+        if scale <= LEGACY_MAX_SCALE:
+            initial, rerun, rows = time_loader(legacy_load, first, second)
+            print(f"[✓] {scale:>3}x ({len(first):>9,} rows) row-by-row:  initial {initial:7.2f}s  "
+                  f"rerun {rerun:7.2f}s  {len(second) / rerun:10,.0f} rows/s  table={rows:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+import pandas as pd
+import _CSV_INGEST as ingest
+from _SQLITE_STORAGE import connect
+from _ERP_OPEN_ORDERS_SHOP_V2 import AGING_COLUMNS
+
+# === CONFIGURATION ===
+# Loads erpAgingReport.csv replicated SCALES times into a fresh database with
+# the old pattern (whole-file pd.read_csv with type inference, then to_sql)
+# and with _CSV_INGEST's chunked, typed ingestion. Each load runs in its own
+# process, so the peak RSS it reports belongs to that load alone.
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SCALES = [1, 10, 100]
+
+
+def legacy_load(csv_path, db_path):
+    conn = connect(db_path)
+    df = pd.read_csv(csv_path, header=None, names=AGING_COLUMNS)
+    df.to_sql("erp_aging_report", conn, index=False)
+    conn.commit()
+    conn.close()
+    return len(df), str(df["cShopifyOrderID"].dtype)
+
+
+def chunked_load(csv_path, db_path):
+    conn = connect(db_path)
+    rows = ingest.ingest_csv(conn, csv_path, ingest.ERP_AGING_REPORT, "erp_aging_report")["rows"]
+    dtype = conn.execute('SELECT typeof("cShopifyOrderID") FROM erp_aging_report LIMIT 1').fetchone()[0]
+    conn.close()
+    return rows, dtype
+
+
+def run(queue, loader, csv_path, db_path):
+    sys.stdout = open(os.devnull, "w")
+    started = time.monotonic()
+    rows, dtype = loader(csv_path, db_path)
+    queue.put((rows, time.monotonic() - started, ingest._peak_rss_mb(), dtype))
+
+
+def timed(loader, csv_path, db_path):
+    # (rows, seconds, peak RSS MB, cShopifyOrderID type) from a fresh process
+    queue = multiprocessing.get_context("spawn").Queue()
+    process = multiprocessing.get_context("spawn").Process(target=run, args=(queue, loader, csv_path, db_path))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    with open(os.path.join(REPO_DIR, "erpAgingReport.csv")) as f:
+        report = f.read()
+    engine = "pyarrow" if ingest.pa_csv is not None else "pandas chunks"
+    for scale in SCALES:
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "erpAgingReport.csv")
+            with open(csv_path, "w") as f:
+                f.write(report * scale)
+            for label, loader in (("read_csv + to_sql", legacy_load), (engine, chunked_load)):
+                rows, seconds, peak_mb, dtype = timed(loader, csv_path, os.path.join(tmp, f"{loader.__name__}.db"))
+                print(f"[✓] {scale:>3}x ({rows:>9,} rows) {label:<18} {seconds:6.2f}s "
+                      f"{rows / seconds:9,.0f} rows/s  peak RSS {peak_mb:7.1f} MB  cShopifyOrderID {dtype}")
+
+
+if __name__ == "__main__":
+    main()
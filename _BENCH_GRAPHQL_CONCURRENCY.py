@@ -0,0 +1,53 @@
+import time
+import requests
+from _MOCK_SHOPIFY_SERVER import MockShopifyState, start_mock_server
+from _SHOPIFY_GRAPHQL_ENGINE import build_batch_query, chunk_list, enrich_orders
+
+# === CONFIGURATION ===
+NUM_ORDERS = 2000
+BATCH_SIZE = 50
+CONCURRENCY_LEVELS = [1, 2, 4, 8, 16]
+# (label, maximumAvailable, restoreRate): standard shops are cost-bound quickly,
+# larger buckets stay latency-bound and show the concurrency gain
+BUCKET_PROFILES = [
+    ("standard", 1000.0, 50.0),
+    ("plus", 20000.0, 1000.0),
+]
+HEADERS = {"Content-Type": "application/json"}
+
+
+def serial_baseline(endpoint, order_ids):
+    # Mirrors the original loop: one batch at a time followed by time.sleep(1)
+    started = time.monotonic()
+    for batch in chunk_list(order_ids, BATCH_SIZE):
+        requests.post(endpoint, headers=HEADERS, json={"query": build_batch_query(batch)}, timeout=20)
+        time.sleep(1)
+    return time.monotonic() - started
+
+
+def main():
+    order_ids = [str(6000000000000 + i) for i in range(NUM_ORDERS)]
+    print(f"[→] Benchmarking {NUM_ORDERS} orders in batches of {BATCH_SIZE} against mock Shopify")
+
+    for label, bucket_max, restore_rate in BUCKET_PROFILES:
+        print(f"\n[→] Bucket profile '{label}': max={bucket_max:.0f}, restoreRate={restore_rate:.0f}/s")
+
+        server, state, endpoint = start_mock_server(MockShopifyState(bucket_max, restore_rate))
+        elapsed = serial_baseline(endpoint, order_ids)
+        print(f"[✓] serial + sleep(1) baseline: {elapsed:6.2f}s  {NUM_ORDERS / elapsed:7.1f} orders/s")
+        server.shutdown()
+
+        for concurrency in CONCURRENCY_LEVELS:
+            # Fresh server per run so every level starts with a full bucket
+            server, state, endpoint = start_mock_server(MockShopifyState(bucket_max, restore_rate))
+            orders, stats = enrich_orders(order_ids, endpoint, HEADERS, concurrency=concurrency,
+                                          batch_size=BATCH_SIZE, verbose=False)
+            server.shutdown()
+            print(f"[✓] concurrency={concurrency:>2}: {stats['elapsed']:6.2f}s  "
+                  f"{len(orders) / stats['elapsed']:7.1f} orders/s  "
+                  f"requests={stats['requests']}  throttled={stats['throttled']}  "
+                  f"throttle_wait={stats['throttle_wait']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
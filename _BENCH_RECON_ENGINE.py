@@ -0,0 +1,73 @@
+import os
+import time
+import sqlite3
+import tempfile
+import pandas as pd
+from _SQLITE_STORAGE import connect
+from _RECON_ENGINE import PICKED_TABLE, ERP_TABLE, load_inputs, classify, bucket_counts
+from _PICK_RECON_TABLES import INDEXES, MATERIALIZED_VIEWS, build_recon_tables
+from _RECON_KEYS import PICKED_KEYS, ERP_KEYS, normalize_lines
+
+# === CONFIGURATION ===
+# Replicates the pick and ERP tables of the shipped pick_aging.db SCALES times
+# (order numbers suffixed per copy, so every copy reconciles like the original)
+# and times reading all 16 reconciliation views against one classify() pass and
+# a full build_recon_tables(). The join indexes are created before the views
+# are timed, so the views get their best case.
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SCALES = [1, 10, 70]
+
+
+def scaled_db(db_path, scale):
+    with sqlite3.connect(os.path.join(REPO_DIR, "pick_aging.db")) as source:
+        picked = pd.read_sql_query(f"SELECT * FROM {PICKED_TABLE}", source)
+        erp = pd.read_sql_query(f"SELECT * FROM {ERP_TABLE}", source)
+        views = source.execute("SELECT name, sql FROM sqlite_master WHERE type = 'view'").fetchall()
+
+    picked_frames, erp_frames = [], []
+    for i in range(scale):
+        suffix = f"-{i}" if i else ""
+        picked_frames.append(picked.assign(order_name=picked["order_name"] + suffix))
+        erp_frames.append(erp.assign(CustOrderNum=erp["CustOrderNum"] + suffix))
+
+    conn = connect(db_path)
+    picked = normalize_lines(conn, pd.concat(picked_frames, ignore_index=True), PICKED_KEYS)
+    erp = normalize_lines(conn, pd.concat(erp_frames, ignore_index=True), ERP_KEYS)
+    picked.to_sql(PICKED_TABLE, conn, index=False)
+    erp.to_sql(ERP_TABLE, conn, index=False)
+    for name, sql in views:
+        conn.execute(sql)
+    for sql in INDEXES:
+        conn.execute(sql)
+    conn.commit()
+    return conn
+
+
+def main():
+    for scale in SCALES:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = scaled_db(os.path.join(tmp, "pick_aging.db"), scale)
+            pick_lines = conn.execute(f"SELECT COUNT(*) FROM {PICKED_TABLE}").fetchone()[0]
+
+            started = time.monotonic()
+            view_rows = sum(len(conn.execute(f"SELECT * FROM {v}").fetchall()) for v in MATERIALIZED_VIEWS)
+            views_s = time.monotonic() - started
+
+            started = time.monotonic()
+            classified = classify(*load_inputs(conn))
+            classify_s = time.monotonic() - started
+
+            started = time.monotonic()
+            counts = build_recon_tables(conn)
+            build_s = time.monotonic() - started
+            conn.close()
+
+        matches = "✓" if sum(counts.values()) == view_rows else "X"
+        print(f"[{matches}] {pick_lines:,} pick lines: 16 views {views_s:.2f}s, "
+              f"classify {classify_s:.2f}s, classify + write all tables {build_s:.2f}s "
+              f"({view_rows:,} bucket rows)")
+        print(f"    buckets: {bucket_counts(classified)}")
+
+
+if __name__ == "__main__":
+    main()
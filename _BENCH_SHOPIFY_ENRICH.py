@@ -0,0 +1,79 @@
+import os
+import time
+import pandas as pd
+from _ERP_OPEN_ORDERS_SHOP import ERP_COLUMNS, ERP_DTYPES, enrich_with_shopify
+
+# === CONFIGURATION ===
+# Enriches erpAgingReport.csv replicated SCALES times with a synthetic
+# shopify_data answer for FOUND_FRACTION of its Shopify IDs, once with the old
+# iterrows loop and once with enrich_with_shopify, and checks that both write
+# the same CSV. The loop is only timed up to LEGACY_MAX_SCALE.
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SCALES = [1, 10, 50]
+LEGACY_MAX_SCALE = 1
+FOUND_FRACTION = 0.6
+
+
+def legacy_enrich(df, shopify_data):
+    # The loop this replaced: mutate a copy of every row, then rebuild the frame
+    enriched = []
+    for _, row in df.iterrows():
+        sid = str(row.get("cShopifyOrderID", "")).strip()
+        match = shopify_data.get(sid)
+        if match:
+            row["shopify_status"] = match.get("shopify_status")
+            row["shopify_location"] = match.get("shopify_location")
+            row["shopify_order_id"] = match.get("shopify_order_id")
+        else:
+            row["shopify_status"] = "NOT FOUND"
+            row["shopify_location"] = ""
+            row["shopify_order_id"] = ""
+        enriched.append(row)
+    return pd.DataFrame(enriched)
+
+
+def scaled_report(base, scale):
+    frames = []
+    for i in range(scale):
+        frame = base.copy()
+        frame["cShopifyOrderID"] = frame["cShopifyOrderID"] + (f"{i:02d}" if i else "")
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def fake_shopify_data(df):
+    ids = df["cShopifyOrderID"].str.strip().dropna().unique()
+    found = pd.Series(ids).sample(frac=FOUND_FRACTION, random_state=1)
+    return {
+        sid: {"shopify_status": "FULFILLED", "shopify_location": "Warehouse AV",
+              "shopify_order_id": f"gid://shopify/Order/{sid}"}
+        for sid in found
+    }
+
+
+def main():
+    base = pd.read_csv(os.path.join(REPO_DIR, "erpAgingReport.csv"), names=ERP_COLUMNS, header=None, dtype=ERP_DTYPES)
+    for scale in SCALES:
+        df = scaled_report(base, scale)
+        shopify_data = fake_shopify_data(df)
+
+        started = time.monotonic()
+        enriched = enrich_with_shopify(df, shopify_data)
+        vectorized_s = time.monotonic() - started
+
+        if scale <= LEGACY_MAX_SCALE:
+            started = time.monotonic()
+            legacy = legacy_enrich(df, shopify_data)
+            legacy_s = time.monotonic() - started
+            same = enriched.to_csv(index=False) == legacy.to_csv(index=False)
+            print(f"[{'✓' if same else 'X'}] {len(df):,} rows: iterrows {legacy_s:.2f}s, "
+                  f"merge {vectorized_s:.3f}s ({legacy_s / vectorized_s:.0f}x), identical CSV: {same}")
+        else:
+            print(f"[✓] {len(df):,} rows: merge {vectorized_s:.3f}s")
+
+    empty = enrich_with_shopify(base, {})
+    print(f"[{'✓' if (empty['shopify_status'] == 'NOT FOUND').all() else 'X'}] No Shopify answers: every row NOT FOUND")
+
+
+if __name__ == "__main__":
+    main()
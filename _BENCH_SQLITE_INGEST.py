@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+import pandas as pd
+import _OPEN_SHOPIFY_ORDERS as open_orders
+import _SQLITE_STORAGE as storage
+from _PARSE_SHOP_RESPONSE import INSERT_PARSED_SQL, PARSED_ORDERS_MIGRATIONS, parsed_order_rows
+
+# === CONFIGURATION ===
+# Times the three hot ingest paths with the old pattern (default pragmas,
+# fresh connection per call, one execute per row, unindexed re-parse deletes)
+# against _SQLITE_STORAGE, then measures how long a dashboard-style read waits
+# while a loader holds the write lock, under rollback journaling and WAL.
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+UNFULFILLED_LINES = 50000
+PAGE_LINES = 250                 # lines per Shopify page handed to insert_data
+ERP_LINE_COPIES = 5              # erp_order_lines.csv replicated this many times
+PARSED_ORDERS = 20000
+REPARSED_ORDERS = 2000
+WRITER_HOLD_SECONDS = 1.0
+
+
+def shopify_lines(count):
+    return [{
+        "Order Name": f"#{23000000 + i // 3}", "Order ID": str(6000000000000 + i // 3),
+        "Created At": "2025-06-01T00:00:00Z", "FDM4 Order Number": f"S{9000000 + i // 3}",
+        "Fulfillment Order ID": f"gid://shopify/FulfillmentOrder/{i // 3}", "Assigned Location": "AS",
+        "Line Item ID": f"gid://shopify/LineItem/{i}", "Line Item Name": "Item", "SKU": f"W{i % 5000}",
+        "Ordered Quantity": 1, "Quantity Assigned to Fulfillment": 1,
+    } for i in range(count)]
+
+
+def legacy_insert_lines(db_path, lines):
+    conn = sqlite3.connect(db_path)
+    for line in lines:
+        conn.execute(
+            f"INSERT OR REPLACE INTO unfulfilled_lines VALUES ({', '.join('?' * 11)})",
+            tuple(line[k] for k in ["Order Name", "Order ID", "Created At", "FDM4 Order Number",
+                                    "Fulfillment Order ID", "Assigned Location", "Line Item ID",
+                                    "Line Item Name", "SKU", "Ordered Quantity",
+                                    "Quantity Assigned to Fulfillment"])
+        )
+    conn.commit()
+    conn.close()
+
+
+def bench_unfulfilled(tmp):
+    lines = shopify_lines(UNFULFILLED_LINES)
+    pages = [lines[i:i + PAGE_LINES] for i in range(0, len(lines), PAGE_LINES)]
+
+    legacy_db = os.path.join(tmp, "legacy_open.db")
+    conn = sqlite3.connect(legacy_db)
+    conn.executescript(open_orders.MIGRATIONS[0][1])
+    conn.close()
+    started = time.monotonic()
+    for page in pages:
+        legacy_insert_lines(legacy_db, page)
+    legacy = time.monotonic() - started
+
+    open_orders.DB_NAME = os.path.join(tmp, "open.db")
+    open_orders.setup_db()
+    started = time.monotonic()
+    for page in pages:
+        open_orders.insert_data(page)
+    shared = time.monotonic() - started
+    return "unfulfilled_lines", len(lines), legacy, shared
+
+
+def bench_erp_order_lines(tmp):
+    df = pd.concat([pd.read_csv(os.path.join(REPO_DIR, "erp_order_lines.csv"))] * ERP_LINE_COPIES, ignore_index=True)
+    schema = f"CREATE TABLE erp_order_lines ({', '.join(df.columns)})"
+
+    conn = sqlite3.connect(os.path.join(tmp, "legacy_erp.db"))
+    conn.execute(schema)
+    started = time.monotonic()
+    conn.execute("DELETE FROM erp_order_lines")
+    conn.commit()
+    df.to_sql("erp_order_lines", conn, if_exists="append", index=False)
+    conn.commit()
+    legacy = time.monotonic() - started
+    conn.close()
+
+    conn = storage.connect(os.path.join(tmp, "erp.db"))
+    conn.execute(schema)
+    started = time.monotonic()
+    conn.execute("DELETE FROM erp_order_lines")
+    storage.insert_frame(conn, "erp_order_lines", df, batch_rows=len(df))
+    conn.commit()
+    shared = time.monotonic() - started
+    conn.close()
+    return "erp_order_lines", len(df), legacy, shared
+
+
+def bench_parsed_orders(tmp):
+    payloads = [json.dumps({
+        "id": f"gid://shopify/Order/{6000000000000 + i}", "name": f"#{23000000 + i}",
+        "displayFinancialStatus": "PAID",
+        "fulfillments": [{"status": "SUCCESS", "location": {"name": "AS"}}] * (1 + i % 2),
+    }) for i in range(PARSED_ORDERS)]
+    reparsed = payloads[:REPARSED_ORDERS]
+
+    def legacy_parse(conn, rows):
+        for raw in rows:
+            order_id = json.loads(raw)["id"].split("/")[-1]
+            conn.execute("DELETE FROM shopify_parsed_orders WHERE shopify_order_id = ?", (order_id,))
+            for row in parsed_order_rows(raw, "20250101_000000"):
+                conn.execute(INSERT_PARSED_SQL, row)
+        conn.commit()
+
+    conn = sqlite3.connect(os.path.join(tmp, "legacy_parsed.db"))
+    conn.executescript(PARSED_ORDERS_MIGRATIONS[0][1])
+    legacy_parse(conn, payloads)
+    started = time.monotonic()
+    legacy_parse(conn, reparsed)
+    legacy = time.monotonic() - started
+    conn.close()
+
+    def shared_parse(conn, rows):
+        with conn:
+            conn.executemany("DELETE FROM shopify_parsed_orders WHERE shopify_order_id = ?",
+                             [(json.loads(raw)["id"].split("/")[-1],) for raw in rows])
+        with storage.BatchWriter(conn, INSERT_PARSED_SQL) as writer:
+            for raw in rows:
+                writer.extend(parsed_order_rows(raw, "20250101_000000"))
+
+    conn = storage.connect(os.path.join(tmp, "parsed.db"))
+    storage.migrate(conn, PARSED_ORDERS_MIGRATIONS)
+    shared_parse(conn, payloads)
+    started = time.monotonic()
+    shared_parse(conn, reparsed)
+    shared = time.monotonic() - started
+    conn.close()
+    return f"shopify_parsed_orders (re-parse {REPARSED_ORDERS:,} of {PARSED_ORDERS:,})", REPARSED_ORDERS, legacy, shared
+
+
+def reader_wait(db_path, wal):
+    conn = storage.connect(db_path) if wal else sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS t (x)")
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.commit()
+    conn.close()
+    locked = threading.Event()
+
+    def writer():
+        conn = storage.connect(db_path) if wal else sqlite3.connect(db_path)
+        conn.isolation_level = None
+        conn.execute("BEGIN EXCLUSIVE")
+        conn.execute("INSERT INTO t VALUES (2)")
+        locked.set()
+        time.sleep(WRITER_HOLD_SECONDS)
+        conn.execute("COMMIT")
+        conn.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    locked.wait()
+    reader = sqlite3.connect(db_path, timeout=WRITER_HOLD_SECONDS * 5)
+    started = time.monotonic()
+    reader.execute("SELECT COUNT(*) FROM t").fetchone()
+    waited = time.monotonic() - started
+    reader.close()
+    thread.join()
+    return waited
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, rows, legacy, shared in (bench_unfulfilled(tmp), bench_erp_order_lines(tmp), bench_parsed_orders(tmp)):
+            print(f"[✓] {label}: {rows:,} rows  old {legacy:6.2f}s ({rows / legacy:9,.0f}/s)  "
+                  f"shared storage {shared:6.2f}s ({rows / shared:9,.0f}/s)  {legacy / shared:5.1f}x")
+        storage.close_connections()
+        print(f"[✓] Dashboard read during a {WRITER_HOLD_SECONDS:.0f}s write lock: "
+              f"rollback journal waited {reader_wait(os.path.join(tmp, 'rollback.db'), False):.2f}s, "
+              f"WAL waited {reader_wait(os.path.join(tmp, 'wal.db'), True):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import os
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from _ERP_OPEN_ORDERS_SHOP_V2 import AGING_COLUMNS
+from _AGING_SNAPSHOTS import append_snapshot, load_order_keys, order_trajectory, backlog_over_time
+
+# === CONFIGURATION ===
+# Appends DAYS daily pulls to a fresh snapshot store. The first pull is the
+# shipped erpAgingReport.csv; each later one ages every order a day, drops
+# SHIPPED_FRACTION of them and adds as many new orders. The store's size, the
+# append time and both queries are reported, and the query results must equal
+# the same answers computed from the pulls in memory.
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DAYS = 365
+SHIPPED_FRACTION = 0.03
+FIRST_PULL = datetime(2025, 10, 18, 6, 30)
+
+
+def daily_pulls(base):
+    rng = np.random.default_rng(1)
+    pull = base.assign(iAge=base["iAge"].astype(int))
+    for day in range(DAYS):
+        yield FIRST_PULL + timedelta(days=day), pull
+        shipped = rng.random(len(pull)) < SHIPPED_FRACTION
+        new = pull[shipped].assign(iAge=0)
+        new["order-number"] = [f"N{day}-{i}" for i in range(len(new))]
+        pull = pd.concat([pull[~shipped].assign(iAge=pull["iAge"][~shipped] + 1), new], ignore_index=True)
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def main():
+    base = pd.read_csv(os.path.join(REPO_DIR, "erpAgingReport.csv"), header=None, names=AGING_COLUMNS, dtype=str)
+    with tempfile.TemporaryDirectory() as store:
+        append_s, rows = 0.0, 0
+        history = []
+        for taken_at, pull in daily_pulls(base):
+            started = time.monotonic()
+            rows += append_snapshot([pull.astype({"iAge": str})], taken_at, store)[1]
+            append_s += time.monotonic() - started
+            history.append(pull[["order-number", "hold-code", "iAge"]].assign(snapshot_ts=taken_at))
+        history = pd.concat(history, ignore_index=True)
+        csv_mb = os.path.getsize(os.path.join(REPO_DIR, "erpAgingReport.csv")) * DAYS / 1024 / 1024
+        print(f"[✓] {DAYS} daily pulls, {rows:,} rows: store {directory_size(store) / 1024 / 1024:.1f} MB "
+              f"(the same pulls as CSV ~{csv_mb:.0f} MB), {len(load_order_keys(store)):,} order keys, "
+              f"{append_s / DAYS * 1000:.0f} ms per append")
+
+        order = base["order-number"].iloc[0]
+        started = time.monotonic()
+        trajectory = order_trajectory(order, snapshot_dir=store)
+        trajectory_s = time.monotonic() - started
+        expected = history.loc[history["order-number"] == order, "iAge"].tolist()
+        matches = trajectory["iAge"].tolist() == expected
+        print(f"[{'✓' if matches else 'X'}] trajectory of {order}: {len(trajectory)} snapshots in {trajectory_s:.3f}s")
+
+        started = time.monotonic()
+        backlog = backlog_over_time(by=("hold-code",), snapshot_dir=store)
+        backlog_s = time.monotonic() - started
+        expected = history.groupby(["snapshot_ts", "hold-code"], dropna=False).size().sort_index()
+        got = backlog.set_index(["snapshot_ts", "hold-code"])["orders"].sort_index()
+        matches = got.tolist() == expected.tolist() and len(got) == len(expected)
+        print(f"[{'✓' if matches else 'X'}] backlog by hold-code over {DAYS} days: {len(backlog):,} rows "
+              f"in {backlog_s:.3f}s")
+
+        started = time.monotonic()
+        recent = backlog_over_time(by=("warehouse",), start=FIRST_PULL + timedelta(days=DAYS - 30),
+                                   min_age=30, snapshot_dir=store)
+        print(f"[✓] backlog over 30 days by warehouse, orders 30+ days old: {len(recent):,} rows "
+              f"in {time.monotonic() - started:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import os
+import json
+import sqlite3
+import tempfile
+import _OPEN_SHOPIFY_ORDERS as shop
+from _SQLITE_STORAGE import close_connections
+from _MOCK_SHOPIFY_SERVER import MockShopifyState, start_mock_server
+
+# === CONFIGURATION ===
+# Runs the bulk export mode end to end against the local Shopify stand-in,
+# which serves the canned JSONL below, and writes into a throwaway database.
+# Then serves the same records with the first order's children moved after
+# the next orders (Shopify only promises parent-before-child) and expects the
+# same lines; a result with an orphan record and a download that breaks off
+# must both fail and leave the loaded lines untouched.
+SAMPLE_JSONL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bulk_unfulfilled_sample.jsonl")
+
+
+def loaded_rows():
+    conn = sqlite3.connect(shop.DB_NAME)
+    rows = conn.execute("""
+        SELECT order_name, fulfillment_order_id, assigned_location, sku, quantity_assigned
+        FROM unfulfilled_lines ORDER BY order_name, line_item_id
+    """).fetchall()
+    conn.close()
+    return rows
+
+
+def write_jsonl(path, records):
+    with open(path, "w") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+
+
+def main():
+    with open(SAMPLE_JSONL) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    server, state, endpoint = start_mock_server(MockShopifyState(latency=0, bulk_jsonl_path=SAMPLE_JSONL))
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        shop.DB_NAME = os.path.join(tmp, "open_shopify.db")
+        shop.setup_db()
+        shop.run_bulk_export(endpoint=endpoint, poll_seconds=0)
+        rows = loaded_rows()
+        for row in rows:
+            print("   ", row)
+        print(f"[✓] {len(rows)} unfulfilled lines loaded from bulk JSONL")
+
+        # The first order's children after the second order starts
+        first_id = records[0]["id"]
+        first_fos = {r["id"] for r in records if r.get("__parentId") == first_id}
+        children = [r for r in records[1:] if r.get("__parentId") == first_id or r.get("__parentId") in first_fos]
+        rest = [r for r in records[1:] if r not in children]
+        interleaved = [records[0]] + rest[:1] + children + rest[1:]
+        state.bulk_jsonl_path = os.path.join(tmp, "interleaved.jsonl")
+        write_jsonl(state.bulk_jsonl_path, interleaved)
+        loaded = shop.run_bulk_export(endpoint=endpoint, poll_seconds=0)
+        same = loaded and loaded_rows() == rows
+        print(f"[{'✓' if same else 'X'}] {len(children)} records after their order's subtree: "
+              f"{len(loaded_rows())} lines, same as the contiguous file")
+        ok &= same
+
+        write_jsonl(state.bulk_jsonl_path, records + [
+            {"id": "gid://shopify/FulfillmentOrderLineItem/1", "__parentId": "gid://shopify/FulfillmentOrder/1"}
+        ])
+        orphan_failed = not shop.run_bulk_export(endpoint=endpoint, poll_seconds=0) and loaded_rows() == rows
+        print(f"[{'✓' if orphan_failed else 'X'}] Orphan record fails the run, loaded lines untouched")
+        ok &= orphan_failed
+
+        stream_bulk_lines = shop.stream_bulk_lines
+
+        def broken_download(url):
+            yield from list(stream_bulk_lines(url))[:3]
+            raise ConnectionError("download broke off")
+
+        shop.stream_bulk_lines = broken_download
+        try:
+            shop.run_bulk_export(endpoint=endpoint, poll_seconds=0)
+            broke = False
+        except ConnectionError:
+            broke = True
+        shop.stream_bulk_lines = stream_bulk_lines
+        kept = broke and loaded_rows() == rows
+        print(f"[{'✓' if kept else 'X'}] Download failing part way leaves {len(loaded_rows())} lines in place")
+        ok &= kept
+        close_connections()
+    server.shutdown()
+    print(f"[{'✓' if ok else 'X'}] Bulk export checked")
+
+
+if __name__ == "__main__":
+    main()
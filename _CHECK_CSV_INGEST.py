@@ -0,0 +1,60 @@
+import os
+import tempfile
+import pandas as pd
+from _SQLITE_STORAGE import connect
+from _CSV_INGEST import ERP_ORDER_LINES, conform, ingest_frames
+
+# === CONFIGURATION ===
+# Reloads erp_order_lines the way the ERP line loaders do and reads it from a
+# second connection at the moment replace_table renames the staging table in:
+# the reader must still see the old rows (the DROP is not committed yet), and
+# the view on the table must work against the new rows afterwards.
+OLD_ROWS = 300
+NEW_ROWS = 500
+
+
+def lines(count, tag):
+    return conform(pd.DataFrame({
+        "OrderNumber": [f"{tag}{i}" for i in range(count)],
+        "CustOrderNum": [f"#{i}" for i in range(count)],
+        "ItemNumber": "SKU-1",
+        "OrderQty": "1",
+    }), ERP_ORDER_LINES)
+
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "open_shopify.db")
+        conn = connect(path)
+        ingest_frames(conn, "erp_order_lines", [lines(OLD_ROWS, "old")], ERP_ORDER_LINES)
+        conn.execute("CREATE VIEW erp_open_lines AS SELECT * FROM erp_order_lines WHERE OrderQty > 0")
+        conn.commit()
+
+        reader = connect(path, read_only=True)
+        seen = []
+
+        def during_swap(statement):
+            if statement.startswith("ALTER TABLE"):
+                try:
+                    seen.append(reader.execute("SELECT COUNT(*) FROM erp_order_lines").fetchone()[0])
+                except Exception as e:
+                    seen.append(repr(e))
+
+        conn.set_trace_callback(during_swap)
+        ingest_frames(conn, "erp_order_lines", [lines(NEW_ROWS, "new")], ERP_ORDER_LINES)
+        conn.set_trace_callback(None)
+        good = seen == [OLD_ROWS]
+        print(f"[{'✓' if good else 'X'}] Second connection during the swap saw {seen[0] if seen else 'nothing'}")
+        ok &= good
+
+        after = reader.execute("SELECT COUNT(*) FROM erp_open_lines").fetchone()[0]
+        print(f"[{'✓' if after == NEW_ROWS else 'X'}] View reads {after} rows after the swap")
+        ok &= after == NEW_ROWS
+        reader.close()
+        conn.close()
+    print(f"[{'✓' if ok else 'X'}] CSV ingest swap checked")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import os
+import time
+import shutil
+import tempfile
+import threading
+from _SQLITE_STORAGE import bump_snapshot, connect
+from _QUERY_CACHE import QueryCache
+from _DB_BUILDS import BUILD_KEEP, DatabaseBuild, builds_dir, current_db
+from _PICK_RECON_TABLES import build_recon_tables
+from _SUMMARY_TABLES import RECON_SUMMARY
+from _BENCH_RECON_ENGINE import PICKED_TABLE, scaled_db
+
+# === CONFIGURATION ===
+# Builds pick_aging.db x SCALE, then refreshes it the way the loaders do: a
+# reader thread keeps running dashboard reruns through a QueryCache while a
+# build adds rows, and must see the old rows whole until publish and the new
+# ones right after, without a single error. A failed validation and an
+# exception inside a build leave the live build untouched, a second loader
+# waits for the first one's lock and starts from its result, and only
+# BUILD_KEEP builds stay on disk. The build is timed against the same refresh
+# written into the live file.
+SCALE = 70
+ADDED_COPIES = 1
+
+
+def picked_rows(conn):
+    return conn.execute(f"SELECT COUNT(*) FROM {PICKED_TABLE}").fetchone()[0]
+
+
+def summary_rows(conn):
+    return conn.execute(f"SELECT COUNT(*) FROM {RECON_SUMMARY.table}").fetchone()[0]
+
+
+def refresh(conn):
+    # A pick load's worth of work: more lines, recon tables and summary rebuilt
+    conn.execute(f"INSERT INTO {PICKED_TABLE} SELECT * FROM {PICKED_TABLE} LIMIT "
+                 f"(SELECT COUNT(*) / {SCALE} * {ADDED_COPIES} FROM {PICKED_TABLE})")
+    conn.commit()
+    build_recon_tables(conn)
+    bump_snapshot(conn, "check_db_builds")
+
+
+def builds_on_disk(db_path):
+    return sorted(name for name in os.listdir(builds_dir(db_path)) if name.endswith(".db"))
+
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "pick_aging.db")
+        conn = scaled_db(path, SCALE)
+        build_recon_tables(conn)
+        bump_snapshot(conn, "check_db_builds")
+        conn.close()
+        shutil.copy(path, os.path.join(tmp, "in_place.db"))
+
+        cache = QueryCache(path)
+        before = cache.get(picked_rows)
+        seen, errors, done = set(), [], threading.Event()
+
+        def dashboard():
+            while not done.is_set():
+                try:
+                    cache.refresh_snapshot()
+                    seen.add(cache.get(picked_rows))
+                    cache.get(summary_rows)
+                except Exception as e:
+                    errors.append(e)
+                time.sleep(0.01)
+
+        reader = threading.Thread(target=dashboard)
+        reader.start()
+        started = time.monotonic()
+        build = DatabaseBuild(path, "check_db_builds", required_tables=[PICKED_TABLE])
+        refresh(build.open())
+        cache.refresh_snapshot()
+        during = cache.get(picked_rows)
+        build.publish()
+        build_s = time.monotonic() - started
+        time.sleep(0.1)
+        done.set()
+        reader.join()
+        cache.refresh_snapshot()
+        after = cache.get(picked_rows)
+        swapped = (during == before and after > before and seen == {before, after} and not errors
+                   and cache.path == build.path == current_db(path))
+        print(f"[{'✓' if swapped else 'X'}] Reader saw {before:,} rows during the build and {after:,} after the "
+              f"swap; {len(errors)} errors, counts seen {sorted(seen)}")
+        ok &= swapped
+
+        conn = connect(os.path.join(tmp, "in_place.db"))
+        started = time.monotonic()
+        refresh(conn)
+        in_place_s = time.monotonic() - started
+        conn.close()
+        print(f"[✓] Refresh as a build (copy, fast pragmas, ANALYZE, checks) {build_s:.2f}s "
+              f"vs in place on the live file {in_place_s:.2f}s")
+
+        live = current_db(path)
+        failed = DatabaseBuild(path, "check_db_builds", required_tables=["no_such_table"])
+        failed.open().execute("DROP TABLE IF EXISTS recon_classified")
+        try:
+            failed.publish()
+            rejected = False
+        except RuntimeError:
+            rejected = True
+        try:
+            with DatabaseBuild(path, "check_db_builds") as conn:
+                conn.execute(f"DELETE FROM {PICKED_TABLE}")
+                raise ValueError("loader failed half way")
+        except ValueError:
+            pass
+        kept = current_db(path) == live and builds_on_disk(path) == [os.path.basename(live)]
+        cache.refresh_snapshot()
+        kept &= cache.get(picked_rows) == after
+        print(f"[{'✓' if rejected and kept else 'X'}] Failed validation and a failed loader discarded their "
+              f"builds; {os.path.basename(current_db(path))} stayed live")
+        ok &= rejected and kept
+
+        # A second loader blocks on the lock and builds on top of the first
+        first = DatabaseBuild(path, "check_db_builds")
+        first.open().execute("CREATE TABLE first_loader (x)")
+        waited = {}
+
+        def second_loader():
+            started = time.monotonic()
+            with DatabaseBuild(path, "check_db_builds", required_tables=["first_loader"]) as conn:
+                waited["s"] = time.monotonic() - started
+                conn.execute("CREATE TABLE second_loader (x)")
+
+        second = threading.Thread(target=second_loader)
+        second.start()
+        time.sleep(0.5)
+        first.publish()
+        second.join()
+        conn = connect(current_db(path), read_only=True)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.close()
+        serialized = waited.get("s", 0) >= 0.5 and {"first_loader", "second_loader"} <= tables
+        print(f"[{'✓' if serialized else 'X'}] Second loader waited {waited.get('s', 0):.2f}s for the lock and "
+              f"built on the first one's result")
+        ok &= serialized
+
+        for _ in range(BUILD_KEEP):
+            with DatabaseBuild(path, "check_db_builds"):
+                pass
+        on_disk = builds_on_disk(path)
+        pruned = len(on_disk) == BUILD_KEEP and on_disk[-1] == os.path.basename(current_db(path))
+        print(f"[{'✓' if pruned else 'X'}] {len(on_disk)} builds kept after {BUILD_KEEP + 3} publishes: {on_disk}")
+        ok &= pruned
+        cache.conn.close()
+    print(f"[{'✓' if ok else 'X'}] Database builds checked")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+import sqlite3
+import tempfile
+import pandas as pd
+import _ERP_SESSION
+import _ERP_SHOPIFY_ORDER_LINES as order_lines
+from _ERP_LINE_CACHE import is_terminal_line
+from _CHECK_ERP_SESSION import REPORTS_DIR, load_erp_answers, process_shopify_lines
+from _MOCK_ERP_SERVER import MockErpState, start_mock_erp
+
+# === CONFIGURATION ===
+# Runs the order-line workflow twice against the local ERP stand-in over every
+# (order, SKU) pair in the shipped erp_order_lines.csv. The second run must
+# only send pairs that are still open and must load the same erp_order_lines
+# table as the first.
+
+
+def count_uploaded(state):
+    # processShopifyLines.p deletes its input, so count what it was handed
+    counts = []
+    handler = state.programs["processShopifyLines.p"]
+
+    def counting(state, param):
+        with open(state.local_path(f"{REPORTS_DIR}/shopify_unfulfilled_lines.csv")) as f:
+            counts.append(sum(1 for _ in f) - 1)
+        return handler(state, param)
+    state.register_program("processShopifyLines.p", counting)
+    return counts
+
+
+def load_table(db_path):
+    with sqlite3.connect(db_path) as conn:
+        df = pd.read_sql_query("SELECT * FROM erp_order_lines", conn).astype(str)
+    return sorted(map(tuple, df.values.tolist()))
+
+
+def main():
+    fieldnames, answers = load_erp_answers()
+    keys = sorted(answers)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "erp")
+        os.makedirs(os.path.join(root, REPORTS_DIR.lstrip("/")))
+        state = MockErpState(root)
+        state.register_program("processShopifyLines.p", process_shopify_lines(fieldnames, answers))
+        uploaded = count_uploaded(state)
+        listener, port = start_mock_erp(state)
+
+        work = os.path.join(tmp, "work")
+        os.makedirs(work)
+        os.chdir(work)
+        db_path = os.path.join(work, "open_shopify.db")
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("CREATE TABLE unfulfilled_lines (order_name TEXT, sku TEXT)")
+            conn.executemany("INSERT INTO unfulfilled_lines VALUES (?, ?)", keys)
+            conn.execute("CREATE TABLE erp_order_lines (%s)" % ", ".join(fieldnames))
+
+        order_lines.SHOPIFY_DB_PATH = order_lines.LOCAL_DB_PATH = db_path
+        order_lines.ERP_HOST, order_lines.ERP_PORT, order_lines.ERP_SHARDS = "127.0.0.1", port, 1
+        tables = []
+        for _ in range(2):
+            order_lines.main()
+            tables.append(load_table(db_path))
+
+        _ERP_SESSION.close_sessions()
+        listener.close()
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    open_keys = sum(1 for rows in answers.values() if not all(is_terminal_line(row) for row in rows))
+    print(f"[{'✓' if uploaded[0] == len(keys) else 'X'}] first run sent {uploaded[0]} of {len(keys)} pairs")
+    print(f"[{'✓' if len(uploaded) == 2 and uploaded[1] == open_keys else 'X'}] second run sent "
+          f"{uploaded[1] if len(uploaded) > 1 else 0} pairs ({open_keys} still open in the ERP)")
+    print(f"[{'✓' if tables[0] == tables[1] else 'X'}] erp_order_lines identical across runs ({len(tables[1])} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import os
+import csv
+import time
+import tempfile
+import _ERP_SESSION
+import _ERP_SHOPIFY_ORDER_LINES as order_lines
+import _ERP_VS_PICK_REPORT as pick_report
+from _MOCK_ERP_SERVER import MockErpState, start_mock_erp
+
+# === CONFIGURATION ===
+# Pushes both order-line workflows through the local SSH/SFTP stand-in in one
+# process, then runs three ERP programs side by side on separate channels.
+# processShopifyLines.p is emulated from the shipped erp_order_lines.csv, with
+# a per-line delay standing in for the ERP lookups; the full key set is then
+# run once as a single session and once sharded, and the outputs compared.
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORTS_DIR = "/home/cutsey/andrewb/python/local/shopify/reports"
+SLOW_PROGRAM_SECONDS = 1.0
+LOOKUP_SECONDS_PER_LINE = 0.0005
+SHARDS = 4
+
+
+def load_erp_answers():
+    answers = {}
+    with open(os.path.join(REPO_DIR, "erp_order_lines.csv"), newline="") as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        for row in reader:
+            answers.setdefault((row["CustOrderNum"], row["ItemNumber"]), []).append(row)
+    return fieldnames, answers
+
+
+def process_shopify_lines(fieldnames, answers):
+    def handler(state, param):
+        reports = state.local_path(REPORTS_DIR)
+        if param:
+            # Sharded run: -param "<input csv>|<output csv>"
+            remote_input, remote_output = param.split("|")
+            return run_lookup(state.local_path(remote_input), state.local_path(remote_output), "order_name", "sku")
+        for name, order_col, sku_col in [("shopify_unfulfilled_lines.csv", "order_name", "sku"),
+                                         ("picked_aging_lines.csv", "order_name", "product_id")]:
+            input_path = os.path.join(reports, name)
+            if os.path.exists(input_path):
+                break
+        else:
+            return "", "** Input CSV not found.\n", 1
+        return run_lookup(input_path, os.path.join(reports, "erp_order_lines.csv"), order_col, sku_col)
+
+    def run_lookup(input_path, output_path, order_col, sku_col):
+        written = 0
+        with open(input_path, newline="") as f_in, \
+                open(output_path, "w", newline="") as f_out:
+            writer = csv.DictWriter(f_out, fieldnames=fieldnames)
+            writer.writeheader()
+            for row in csv.DictReader(f_in):
+                for answer in answers.get((row[order_col], row[sku_col]), []):
+                    writer.writerow(answer)
+                    written += 1
+        time.sleep(written * LOOKUP_SECONDS_PER_LINE)
+        os.remove(input_path)
+        return f"processShopifyLines: {written} lines written\n", "", 0
+    return handler
+
+
+def slow_program(state, param):
+    time.sleep(SLOW_PROGRAM_SECONDS)
+    return f"slow job {param} done\n", "", 0
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "erp")
+        os.makedirs(os.path.join(root, REPORTS_DIR.lstrip("/")))
+        os.makedirs(os.path.join(root, "u/live/code"))
+        state = MockErpState(root)
+        state.register_program("processShopifyLines.p", process_shopify_lines(*load_erp_answers()))
+        state.register_program("slowJob.p", slow_program)
+        listener, port = start_mock_erp(state)
+
+        work = os.path.join(tmp, "work")
+        os.makedirs(work)
+        os.chdir(work)
+        with open(order_lines.LOCAL_SHOPIFY_CSV, "w") as f:
+            f.write("order_name,sku\n#23459629,GCSHOPIFY\n#23460326,W6273R003\n")
+        with open(pick_report.LOCAL_PICKED_CSV, "w") as f:
+            f.write("order_name,product_id,location_id,order_shipment_line_units\n#23460326,W6273R003,AS,1\n")
+
+        for module in (order_lines, pick_report):
+            module.ERP_HOST, module.ERP_PORT = "127.0.0.1", port
+            module.push_csv_and_run_erp()
+
+        timings = {}
+        outputs = {}
+        keys = sorted({key for key in load_erp_answers()[1]})
+        for shards in (1, SHARDS):
+            with open(order_lines.LOCAL_SHOPIFY_CSV, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["order_name", "sku"])
+                writer.writerows(keys)
+            order_lines.ERP_SHARDS = shards
+            started = time.monotonic()
+            order_lines.push_csv_and_run_erp()
+            timings[shards] = time.monotonic() - started
+            with open(order_lines.LOCAL_OUTPUT_CSV, newline="") as f:
+                outputs[shards] = sorted(tuple(row.values()) for row in csv.DictReader(f))
+
+        session = _ERP_SESSION.get_session("127.0.0.1", port, "cutsey", "cuts1978")
+        started = time.monotonic()
+        session.run_programs([("adb", "slowJob.p", str(i)) for i in range(3)], max_parallel=3)
+        elapsed = time.monotonic() - started
+
+        _ERP_SESSION.close_sessions()
+        listener.close()
+        os.chdir(REPO_DIR)
+
+    print(f"[{'✓' if state.handshakes == 1 else 'X'}] SSH handshakes for the whole run: {state.handshakes}")
+    print(f"[{'✓' if elapsed < SLOW_PROGRAM_SECONDS * 2 else 'X'}] 3 x {SLOW_PROGRAM_SECONDS:.0f}s programs "
+          f"on parallel channels took {elapsed:.2f}s")
+    print(f"[{'✓' if outputs[1] == outputs[SHARDS] else 'X'}] {len(keys)} keys: single run {timings[1]:.2f}s, "
+          f"{SHARDS} shards {timings[SHARDS]:.2f}s, {len(outputs[SHARDS])} merged lines match the single run")
+
+
+if __name__ == "__main__":
+    main()
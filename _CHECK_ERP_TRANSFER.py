@@ -0,0 +1,85 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import _ERP_SESSION
+from _MOCK_ERP_SERVER import MockErpState, start_mock_erp
+
+# === CONFIGURATION ===
+# Fetches the shipped erpAgingReport.csv from the local SSH/SFTP stand-in four
+# times: a cold compressed download, an unchanged re-run that must skip the
+# transfer, a re-run after the ERP rewrote the file, and a run that resumes a
+# half-finished .gz.part left behind by an interrupted transfer.
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_CSV = os.path.join(REPO_DIR, "erpAgingReport.csv")
+REMOTE_CSV = "/u/live/code/adb/erpAgingReport.csv"
+
+
+def check(ok, message):
+    print(f"[{'✓' if ok else 'X'}] {message}")
+    return ok
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "erp")
+        state = MockErpState(root)
+        remote_local = state.local_path(REMOTE_CSV)
+        os.makedirs(os.path.dirname(remote_local))
+        shutil.copyfile(SOURCE_CSV, remote_local)
+        listener, port = start_mock_erp(state)
+
+        local_csv = os.path.join(tmp, "erpAgingReport.csv")
+        session = _ERP_SESSION.get_session("127.0.0.1", port, "cutsey", "cuts1978")
+        results = []
+
+        fetched = session.fetch(REMOTE_CSV, local_csv)
+        cold_sent = session.transfer_stats["transferred_bytes"]
+        results.append(check(fetched and _ERP_SESSION._file_md5(local_csv) == _ERP_SESSION._file_md5(SOURCE_CSV),
+                             "cold fetch is byte-identical to the ERP file"))
+        results.append(check(cold_sent < os.path.getsize(SOURCE_CSV) / 2,
+                             f"cold fetch sent {cold_sent:,} of {os.path.getsize(SOURCE_CSV):,} bytes"))
+
+        results.append(check(not session.fetch(REMOTE_CSV, local_csv), "unchanged file is skipped"))
+
+        with open(remote_local, "a") as f:
+            f.write("999999,0,0,0,0,0,0,0,0,0\n")
+        os.utime(remote_local, (1, 1))
+        results.append(check(session.fetch(REMOTE_CSV, local_csv)
+                             and _ERP_SESSION._file_md5(local_csv) == _ERP_SESSION._file_md5(remote_local),
+                             "rewritten file is fetched again"))
+
+        # Leave half of the compressed stream behind as if the last run died mid-transfer
+        os.utime(remote_local, (2, 2))
+        compressed = subprocess.run(["gzip", "-n", "-1", "-c", remote_local], capture_output=True, check=True).stdout
+        part_path = f"{local_csv}.gz.part"
+        with open(part_path, "wb") as f:
+            f.write(compressed[:len(compressed) // 2])
+        _ERP_SESSION._write_json(f"{part_path}.json", {"source_md5": _ERP_SESSION._file_md5(remote_local),
+                                                       "gz_size": len(compressed)})
+        before = session.transfer_stats["transferred_bytes"]
+        results.append(check(session.fetch(REMOTE_CSV, local_csv)
+                             and _ERP_SESSION._file_md5(local_csv) == _ERP_SESSION._file_md5(remote_local),
+                             "interrupted transfer resumes to a verified file"))
+        resumed_sent = session.transfer_stats["transferred_bytes"] - before
+        results.append(check(resumed_sent < len(compressed), f"resume sent {resumed_sent:,} of {len(compressed):,} compressed bytes"))
+        # A stale .gz.part from some other archive must not poison the result
+        with open(part_path, "wb") as f:
+            f.write(b"\x1f\x8b garbage")
+        _ERP_SESSION._write_json(f"{part_path}.json", {"source_md5": _ERP_SESSION._file_md5(remote_local),
+                                                       "gz_size": len(compressed)})
+        os.utime(remote_local, (3, 3))
+        results.append(check(session.fetch(REMOTE_CSV, local_csv)
+                             and _ERP_SESSION._file_md5(local_csv) == _ERP_SESSION._file_md5(remote_local),
+                             "corrupt partial file falls back to a clean download"))
+        results.append(check(not os.path.exists(part_path) and not os.path.exists(remote_local + ".xfer.gz"),
+                             "no temp files left on either side"))
+
+        _ERP_SESSION.close_sessions()
+        listener.close()
+
+    print(f"[{'✓' if all(results) else 'X'}] ERP transfer checks: {sum(results)}/{len(results)} passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import os
+import time
+import tempfile
+import pandas as pd
+from _SQLITE_STORAGE import connect, insert_frame, migrate
+from _ERP_OPEN_ORDERS_SHOP_V2 import AGING_COLUMNS, bulk_upsert_aging
+from _PARSE_SHOP_RESPONSE import PARSED_COLUMNS, PARSED_ORDERS_MIGRATIONS
+from _PICK_RECON_TABLES import CLASSIFIED_TABLE, build_recon_tables, materialized_name
+from _BENCH_RECON_ENGINE import scaled_db
+from _EXPLORER_QUERIES import (PAGE_ROWS, ERP_AGING, SHOPIFY_ORDERS, recon_source, where_clause, count_rows,
+                               fetch_page, iter_pages)
+
+# === CONFIGURATION ===
+# Fills erp_aging_data (erpAgingReport.csv x AGING_SCALE), shopify_parsed_orders
+# (SHOPIFY_ROWS) and the pick_aging.db reconciliation tables (x RECON_SCALE)
+# through their loaders' code paths, then for a few filter sets checks that the
+# keyset pages, joined, are exactly the filtered table in explorer order, and
+# times one page against the old full-table read. The plan of a deep page is
+# reported: walked in index order, or filtered by an index and then sorted
+# (SQLite's choice when a filter is selective; still a bounded page).
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+AGING_SCALE = 10
+SHOPIFY_ROWS = 150000
+RECON_SCALE = 70
+DEEP_PAGE = 100
+
+
+def aging_db(path):
+    base = pd.read_csv(os.path.join(REPO_DIR, "erpAgingReport.csv"), header=None, names=AGING_COLUMNS, dtype=str)
+    report = pd.concat([base.assign(**{"order-number": base["order-number"] + (f"-{i}" if i else "")})
+                        for i in range(AGING_SCALE)], ignore_index=True)
+    conn = connect(path)
+    bulk_upsert_aging(conn, report, "20261018_063000")
+    migrate(conn, PARSED_ORDERS_MIGRATIONS)
+    locations = ["AS", "AV", "AYS051", None]
+    insert_frame(conn, "shopify_parsed_orders", pd.DataFrame({
+        "shopify_order_id": [str(6000000000000 + i // 2) for i in range(SHOPIFY_ROWS)],
+        "order_name": [f"#{23000000 + i // 2}" for i in range(SHOPIFY_ROWS)],
+        "financial_status": "PAID",
+        "fulfillment_status": ["SUCCESS" if i % 3 else None for i in range(SHOPIFY_ROWS)],
+        "fulfillment_location": [locations[i % len(locations)] for i in range(SHOPIFY_ROWS)],
+        "timestamp": [f"202610{1 + i % 28:02d}_063000" for i in range(SHOPIFY_ROWS)],
+    })[PARSED_COLUMNS])
+    conn.commit()
+    return conn
+
+
+def expected_rows(conn, source, values):
+    where, params = where_clause(source, values)
+    columns = ", ".join(f'"{c}"' for c in source.columns) if source.columns else "*"
+    order_by = ", ".join(f"{e} DESC" for e in source.order)
+    return pd.read_sql_query(f"SELECT {columns} FROM {source.table}{where} ORDER BY {order_by}", conn, params=params)
+
+
+def uses_sort(conn, source, values, after):
+    where, params = where_clause(source, values)
+    keyset = f"({', '.join(source.order)}) < ({', '.join('?' * len(after))})"
+    where = f"{where} AND {keyset}" if where else f" WHERE {keyset}"
+    order_by = ", ".join(f"{e} DESC" for e in source.order)
+    plan = conn.execute(f"EXPLAIN QUERY PLAN SELECT * FROM {source.table}{where} ORDER BY {order_by} LIMIT 1",
+                        params + list(after)).fetchall()
+    return any("TEMP B-TREE" in row[-1] for row in plan)
+
+
+def check(conn, label, source, values, legacy_sql):
+    pages = list(iter_pages(conn, source, values))
+    joined = pd.concat(pages, ignore_index=True) if pages else pd.DataFrame()
+    expected = expected_rows(conn, source, values)
+    same = (joined.empty and expected.empty) or joined.astype(str).equals(expected.astype(str))
+    same = same and count_rows(conn, source, values) == len(expected)
+
+    started = time.monotonic()
+    pd.read_sql_query(legacy_sql, conn)
+    legacy_s = time.monotonic() - started
+
+    started = time.monotonic()
+    total = count_rows(conn, source, values)
+    page, after = fetch_page(conn, source, values)
+    first_s = time.monotonic() - started
+
+    deep = None
+    for _ in range(DEEP_PAGE - 1):
+        if after is None:
+            break
+        deep = after
+        page, after = fetch_page(conn, source, values, after)
+    started = time.monotonic()
+    if deep is not None:
+        fetch_page(conn, source, values, deep)
+    deep_s = time.monotonic() - started
+    sorted_plan = deep is not None and uses_sort(conn, source, values, deep)
+
+    table_rows = conn.execute(f"SELECT COUNT(*) FROM {source.table}").fetchone()[0]
+    print(f"[{'✓' if same else 'X'}] {label}: {total:,} of {table_rows:,} rows in {len(pages)} pages match; "
+          f"full read {legacy_s:.3f}s, count + page 1 {first_s:.3f}s, page {DEEP_PAGE} {deep_s:.4f}s ({'filtered, then sorted' if sorted_plan else 'index order'})")
+    return same
+
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = aging_db(os.path.join(tmp, "mad_recon.db"))
+        legacy = "SELECT * FROM erp_aging_data ORDER BY timestamp DESC"
+        for label, values in (
+            ("erp aging, no filter", {}),
+            ("erp aging, warehouse AV + hold OMSHOLD/none", {"warehouse": ["AV"], "hold_code": ["OMSHOLD", "(none)"]}),
+            ("erp aging, age 30-90", {"age": (30, 90)}),
+            ("erp aging, order search 19424", {"order": "19424"}),
+        ):
+            ok &= check(conn, label, ERP_AGING, values, legacy)
+        legacy = "SELECT * FROM shopify_parsed_orders ORDER BY timestamp DESC"
+        for label, values in (
+            ("shopify orders, no filter", {}),
+            ("shopify orders, location AS, status none", {"location": ["AS"], "status": ["(none)"]}),
+        ):
+            ok &= check(conn, label, SHOPIFY_ORDERS, values, legacy)
+        conn.close()
+
+        conn = scaled_db(os.path.join(tmp, "pick_aging.db"), RECON_SCALE)
+        build_recon_tables(conn)
+        table = materialized_name("picked_aging_merged_with_erp")
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")] + ["bucket"]
+        classified = recon_source(CLASSIFIED_TABLE, columns=columns, bucket=True)
+        ok &= check(conn, "recon lines, bucket remaining_open", classified, {"bucket": ["remaining_open"]},
+                    f"SELECT * FROM {table}")
+        ok &= check(conn, "recon lines, no filter", classified, {}, f"SELECT * FROM {table}")
+        missing = recon_source(materialized_name("picked_aging_merged_missing_in_erp"))
+        prefix = conn.execute(f"SELECT order_name FROM {missing.table} LIMIT 1").fetchone()[0][:5]
+        ok &= check(conn, f"missing in ERP, order search {prefix}", missing, {"order": prefix},
+                    f"SELECT * FROM {missing.table}")
+        conn.close()
+    print(f"[{'✓' if ok else 'X'}] Explorer queries checked ({PAGE_ROWS} rows per page)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+import time
+import tempfile
+import tracemalloc
+import pandas as pd
+from _SQLITE_STORAGE import bump_snapshot
+from _PICK_RECON_TABLES import CLASSIFIED_TABLE, build_recon_tables, export_queries, materialized_name
+from _EXPLORER_QUERIES import recon_source, filtered_cursor
+from _EXPORT_ARTIFACTS import (EXPORT_KEEP, CSV_SUFFIX, PARQUET_SUFFIX, pa, artifact_path, export_root,
+                               write_csv_gz, write_exports)
+from _CHECK_EXPLORER_QUERIES import expected_rows
+from _BENCH_RECON_ENGINE import scaled_db
+
+# === CONFIGURATION ===
+# Builds the reconciliation tables on pick_aging.db x SCALE, publishes
+# EXPORT_KEEP + 1 snapshots with their export artifacts, and checks that every
+# gzip CSV (and Parquet, with pyarrow) reads back as its query's rows, that
+# only the newest EXPORT_KEEP snapshots keep files, and that a filtered export
+# streamed from a cursor equals the filtered rows. Python memory of the old
+# "whole view to_csv().encode()" download is compared with the streamed one.
+SCALE = 70
+VIEW = "picked_aging_merged_with_erp"
+
+
+def same_rows(read, expected):
+    # Compared as text, the way both files carry their values
+    normalize = lambda df: df.astype("string").fillna("").replace(r"\.0$", "", regex=True).reset_index(drop=True)
+    return read.shape == expected.shape and normalize(read).equals(normalize(expected))
+
+
+def traced(work):
+    tracemalloc.start()
+    started = time.monotonic()
+    work()
+    seconds = time.monotonic() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 1e6
+
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "pick_aging.db")
+        conn = scaled_db(db_path, SCALE)
+        build_recon_tables(conn)
+        queries = export_queries(conn)
+        for _ in range(EXPORT_KEEP + 1):
+            snapshot_id = bump_snapshot(conn, "check_export_artifacts")
+            started = time.monotonic()
+            counts = write_exports(conn, db_path, snapshot_id, queries)
+            write_s = time.monotonic() - started
+
+        kept = sorted(os.listdir(export_root(db_path)))
+        pruned = kept == [f"snapshot_{snapshot_id - i}" for i in reversed(range(EXPORT_KEEP))]
+        print(f"[{'✓' if pruned else 'X'}] Snapshots with artifacts after {EXPORT_KEEP + 1} loads: {kept}")
+        ok &= pruned
+
+        matches = 0
+        for view_name, sql in queries.items():
+            expected = pd.read_sql_query(sql, conn)
+            read = pd.read_csv(artifact_path(db_path, snapshot_id, view_name, CSV_SUFFIX), dtype=str)
+            good = same_rows(read, expected) and counts[view_name] == len(expected)
+            if pa is not None:
+                good &= same_rows(pd.read_parquet(artifact_path(db_path, snapshot_id, view_name, PARQUET_SUFFIX)),
+                                  expected)
+            matches += good
+        sizes = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(export_root(db_path))
+                    for f in files) / 1e6 / EXPORT_KEEP
+        print(f"[{'✓' if matches == len(queries) else 'X'}] {matches} of {len(queries)} views read back from "
+              f"gzip CSV{' and Parquet' if pa is not None else ''}; {sizes:.1f} MB per snapshot, written in {write_s:.2f}s")
+        ok &= matches == len(queries)
+
+        table = materialized_name(VIEW)
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")] + ["bucket"]
+        source = recon_source(CLASSIFIED_TABLE, columns=columns, bucket=True)
+        values = {"bucket": ["remaining_open", "missing_in_erp"]}
+        path = os.path.join(tmp, "filtered.csv.gz")
+        with open(path, "wb") as f:
+            write_csv_gz(filtered_cursor(conn, source, values), f)
+        filtered = same_rows(pd.read_csv(path, dtype=str), expected_rows(conn, source, values))
+        print(f"[{'✓' if filtered else 'X'}] Filtered export streamed from a cursor matches the filtered rows")
+        ok &= filtered
+
+        full_sql = queries[VIEW]
+        legacy_s, legacy_mb = traced(lambda: pd.read_sql_query(full_sql, conn).to_csv(index=False).encode("utf-8"))
+
+        def streamed():
+            with tempfile.TemporaryFile() as f:
+                write_csv_gz(conn.execute(full_sql), f)
+
+        streamed_s, streamed_mb = traced(streamed)
+        with open(artifact_path(db_path, snapshot_id, VIEW, CSV_SUFFIX), "rb") as f:
+            served_s, served_mb = traced(f.read)
+        print(f"[✓] {VIEW} ({counts[VIEW]:,} rows): DataFrame to_csv {legacy_s:.2f}s / {legacy_mb:.0f} MB peak, "
+              f"cursor to gzip {streamed_s:.2f}s / {streamed_mb:.1f} MB, published artifact {served_s * 1000:.1f}ms / "
+              f"{served_mb:.1f} MB")
+        conn.close()
+    print(f"[{'✓' if ok else 'X'}] Export artifacts checked")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import time
+import tempfile
+from _RECON_ENGINE import PICKED_TABLE, ERP_TABLE, CLASSIFIED_TABLE
+from _PICK_RECON_TABLES import MATERIALIZED_VIEWS, build_recon_tables, materialized_name
+from _BENCH_RECON_ENGINE import scaled_db
+
+# === CONFIGURATION ===
+# Builds the reconciliation tables on a copy of the shipped pick_aging.db
+# (replicated SCALE times), then edits CHANGED_ORDERS orders the way a later
+# load would: quantities changed, ERP lines shipped, an order dropped and new
+# lines added. The incremental refresh must leave every mat_ table identical to
+# its view and to a full rebuild; both refreshes are timed.
+SCALES = [1, 70]
+CHANGED_ORDERS = 40
+
+
+def mat_columns(conn, view_name):
+    # The views' p.*, e.* also carry the interned key ids, which mat_ tables leave out
+    names = [row[1] for row in conn.execute(f"PRAGMA table_info({materialized_name(view_name)})")]
+    return ", ".join(f'"{n}"' for n in names)
+
+
+def read(conn, name, columns="*"):
+    cursor = conn.execute(f"SELECT {columns} FROM {name}")
+    return [d[0] for d in cursor.description], sorted(map(repr, cursor.fetchall()))
+
+
+def edit_sources(conn):
+    orders = [row[0] for row in conn.execute(
+        f"SELECT DISTINCT order_name FROM {PICKED_TABLE} ORDER BY order_name LIMIT ?", (CHANGED_ORDERS,))]
+    quarter = len(orders) // 4
+    marks = ",".join("?" * quarter)
+    conn.execute(f"UPDATE {PICKED_TABLE} SET order_shipment_line_units = order_shipment_line_units + 1 "
+                 f"WHERE order_name IN ({marks})", orders[:quarter])
+    conn.execute(f"UPDATE {ERP_TABLE} SET ShippedQty = OrderQty, CancelQty = 0 "
+                 f"WHERE CustOrderNum IN ({marks})", orders[quarter:2 * quarter])
+    conn.execute(f"DELETE FROM {PICKED_TABLE} WHERE order_name IN ({marks})", orders[2 * quarter:3 * quarter])
+    conn.execute(f"INSERT INTO {PICKED_TABLE} (order_id, order_name, product_id, location_id, "
+                 f"order_shipment_line_units) SELECT order_id, order_name || '-NEW', product_id, location_id, "
+                 f"order_shipment_line_units FROM {PICKED_TABLE} WHERE order_name IN ({marks})", orders[3 * quarter:])
+    conn.execute(f"INSERT INTO {PICKED_TABLE} (order_id, order_name, product_id) VALUES (1, NULL, 'NO-ORDER')")
+    conn.commit()
+
+
+def snapshot(conn):
+    return {view: read(conn, materialized_name(view)) for view in MATERIALIZED_VIEWS}
+
+
+def main():
+    for scale in SCALES:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = scaled_db(os.path.join(tmp, "pick_aging.db"), scale)
+            build_recon_tables(conn)
+            edit_sources(conn)
+
+            started = time.monotonic()
+            build_recon_tables(conn)
+            incremental_s = time.monotonic() - started
+            incremental = snapshot(conn)
+            mismatched = [v for v in MATERIALIZED_VIEWS if incremental[v] != read(conn, v, mat_columns(conn, v))]
+            lines = conn.execute(f"SELECT COUNT(*) FROM {CLASSIFIED_TABLE}").fetchone()[0]
+
+            started = time.monotonic()
+            build_recon_tables(conn)
+            unchanged_s = time.monotonic() - started
+
+            started = time.monotonic()
+            build_recon_tables(conn, incremental=False)
+            full_s = time.monotonic() - started
+            same_as_full = snapshot(conn) == incremental
+            conn.close()
+
+        ok = not mismatched and same_as_full
+        print(f"[{'✓' if ok else 'X'}] {lines:,} classified lines: incremental {incremental_s:.2f}s, "
+              f"nothing changed {unchanged_s:.2f}s, full rebuild {full_s:.2f}s; "
+              f"matches views: {not mismatched}, matches full rebuild: {same_as_full}"
+              f"{'' if not mismatched else ' (' + ', '.join(mismatched) + ')'}")
+
+
+if __name__ == "__main__":
+    main()
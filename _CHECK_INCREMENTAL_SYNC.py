@@ -0,0 +1,61 @@
+import os
+import json
+import sqlite3
+import tempfile
+import _OPEN_SHOPIFY_ORDERS as shop
+from _MOCK_SHOPIFY_SERVER import MockShopifyState, start_mock_server
+
+# === CONFIGURATION ===
+# Runs a full reconcile followed by an incremental sync against the local
+# Shopify stand-in. Between the two runs one order is cancelled and one line
+# is fulfilled; the delta run must only fetch those orders and drop the lines.
+SAMPLE_JSONL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bulk_unfulfilled_sample.jsonl")
+
+
+def load_sample_orders():
+    with open(SAMPLE_JSONL) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    orders = list(shop.assemble_bulk_orders(records))
+    for order in orders:
+        order["updatedAt"] = "2025-06-23T00:00:00Z"
+    return orders
+
+
+def line_count(where=""):
+    conn = sqlite3.connect(shop.DB_NAME)
+    count = conn.execute(f"SELECT COUNT(*) FROM unfulfilled_lines {where}").fetchone()[0]
+    conn.close()
+    return count
+
+
+def main():
+    orders = load_sample_orders()
+    server, state, endpoint = start_mock_server(MockShopifyState(latency=0, orders=orders))
+    shop.GRAPHQL_URL = endpoint
+    shop.SYNC_MODE = "incremental"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shop.DB_NAME = os.path.join(tmp, "open_shopify.db")
+        shop.CURSOR_FILE = os.path.join(tmp, "last_cursor.txt")
+
+        shop.main()
+        print(f"[✓] Full reconcile: {line_count()} lines, {state.orders_served} orders served")
+        served_before = state.orders_served
+
+        # Order #23459629 fulfils its gift card line; order #23460517 gets cancelled
+        first, last = orders[0], orders[-1]
+        first["fulfillmentOrders"]["edges"][0]["node"]["lineItems"]["edges"][0]["node"]["remainingQuantity"] = 0
+        last["cancelledAt"] = "2099-01-01T00:00:00Z"
+        first["updatedAt"] = last["updatedAt"] = "2099-01-01T00:00:00Z"
+        shop.save_sync_state(watermark="2098-12-31T00:00:00Z")
+
+        shop.main()
+        fetched = state.orders_served - served_before
+        print(f"[✓] Incremental sync fetched {fetched} orders; {line_count()} lines remain")
+        print(f"[{'✓' if fetched == 2 and line_count() == 1 else 'X'}] Only changed orders fetched, stale lines removed")
+        print(f"[✓] Watermark now {shop.load_sync_state()['watermark']}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import tempfile
+import _OPEN_SHOPIFY_ORDERS as shop
+from _MOCK_SHOPIFY_SERVER import MockShopifyState, start_mock_server
+
+# === CONFIGURATION ===
+# Adds a large B2B-style order (more fulfillment orders and line items than
+# the nested page sizes) to the canned sample and checks that a paged crawl
+# against the local Shopify stand-in still loads every open line. Filler
+# orders spread the crawl over several pages while the B2B order's follow-ups
+# are slowed down past page 3: the cursor may only be saved once they are in
+# (the crawl then waits for them before page 4, so one save happens). A second
+# B2B order deleted before its follow-ups run is kept as fetched, and the first
+# follow-up is throttled once and must be retried. A second crawl, with the B2B
+# order on page FAILED_PAGE and its follow-up failing, must stop without
+# publishing and without saving a cursor past the page before it.
+SAMPLE_JSONL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bulk_unfulfilled_sample.jsonl")
+B2B_FULFILLMENT_ORDERS = 13
+B2B_LINES_PER_FULFILLMENT_ORDER = 45
+FILLER_ORDERS = 1500
+FOLLOW_UP_DELAY = 0.5
+GATED_CURSOR = 750  # the page after this waits for the follow-ups
+FAILED_PAGE = 3
+PAGE_SIZE = 250
+THROTTLED_REPLY = {
+    "errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+    "extensions": {"cost": {"requestedQueryCost": 50, "actualQueryCost": None,
+                            "throttleStatus": {"maximumAvailable": 1000.0, "currentlyAvailable": 0,
+                                               "restoreRate": 500.0}}},
+}
+FAILED_REPLY = {"errors": [{"message": "Internal error. Looks like something went wrong on our end.",
+                            "extensions": {"code": "INTERNAL_SERVER_ERROR"}}]}
+
+
+def build_b2b_order(n=1001):
+    fulfillment_orders = []
+    for f in range(B2B_FULFILLMENT_ORDERS):
+        lines = [{"node": {
+            "id": f"gid://shopify/FulfillmentOrderLineItem/{n}85{f:02d}{i:04d}",
+            "lineItem": {"id": f"gid://shopify/LineItem/{n}95{f:02d}{i:04d}", "name": f"Wholesale SKU {i}",
+                         "sku": f"B2B{f:02d}{i:04d}", "quantity": 6},
+            "remainingQuantity": 6,
+        }} for i in range(B2B_LINES_PER_FULFILLMENT_ORDER)]
+        fulfillment_orders.append({"node": {
+            "id": f"gid://shopify/FulfillmentOrder/{n}75{f:04d}",
+            "assignedLocation": {"name": "AV Warehouse"},
+            "lineItems": {"edges": lines},
+        }})
+    return {
+        "id": f"gid://shopify/Order/640999999{n}", "name": f"#B2B-{n}", "createdAt": "2025-06-24T10:00:00Z",
+        "updatedAt": "2025-06-24T10:00:00Z", "cancelledAt": None, "closedAt": None,
+        "displayFinancialStatus": "PENDING", "metafield": {"value": "W9150001"},
+        "fulfillmentOrders": {"edges": fulfillment_orders},
+    }
+
+
+def filler_orders(sample):
+    return [dict(sample, id=f"gid://shopify/Order/7{i:012d}", name=f"#F{i}") for i in range(FILLER_ORDERS)]
+
+
+def b2b_lines(name, table="unfulfilled_lines"):
+    conn = sqlite3.connect(shop.DB_NAME)
+    count = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE order_name = ?", (name,)).fetchone()[0]
+    conn.close()
+    return count
+
+
+def table_rows(table):
+    conn = sqlite3.connect(shop.DB_NAME)
+    count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    conn.close()
+    return count
+
+
+def failed_follow_up_crawl(sample):
+    # #B2B-1003 sits on page FAILED_PAGE and every follow-up for it fails
+    fillers = filler_orders(sample)
+    before = PAGE_SIZE * (FAILED_PAGE - 1)
+    orders = fillers[:before] + [build_b2b_order(1003)] + fillers[before:]
+    server, state, endpoint = start_mock_server(MockShopifyState(latency=0, orders=orders))
+    shop.GRAPHQL_URL = endpoint
+    graphql_post = shop.graphql_post
+    shop.graphql_post = lambda query, *args, **kwargs: FAILED_REPLY
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            shop.DB_NAME = os.path.join(tmp, "open_shopify.db")
+            shop.CURSOR_FILE = os.path.join(tmp, "last_cursor.txt")
+            try:
+                shop.main()
+                raised = None
+            except RuntimeError as e:
+                raised = e
+            published = table_rows("unfulfilled_lines")
+            cursor = shop.load_cursor()
+    finally:
+        shop.graphql_post = graphql_post
+        server.shutdown()
+
+    kept_back = raised is not None and published == 0 and cursor is not None and int(cursor) <= before
+    print(f"[{'✓' if kept_back else 'X'}] Failed follow-up on page {FAILED_PAGE}: crawl raised {raised!r}, "
+          f"{published} rows published, cursor left at {cursor} (page {FAILED_PAGE} starts after {before})")
+    return kept_back
+
+
+def main():
+    ok = True
+    with open(SAMPLE_JSONL) as f:
+        sample = list(shop.assemble_bulk_orders(json.loads(line) for line in f if line.strip()))
+    orders = [build_b2b_order(1001), build_b2b_order(1002)] + sample + filler_orders(sample[0])
+
+    server, state, endpoint = start_mock_server(MockShopifyState(latency=0, orders=orders))
+    shop.GRAPHQL_URL = endpoint
+    complete_truncated_orders = shop.complete_truncated_orders
+    query_unfulfilled_lines = shop.query_unfulfilled_lines
+    save_cursor = shop.save_cursor
+    graphql_post = shop.graphql_post
+    saved = []
+    throttled = []
+    follow_ups_done = threading.Event()
+
+    def slow_follow_ups(truncated):
+        # #B2B-1002 is deleted after its page was served
+        state.orders = [o for o in state.orders if o["name"] != "#B2B-1002"]
+        time.sleep(FOLLOW_UP_DELAY)
+        try:
+            return complete_truncated_orders(truncated)
+        finally:
+            follow_ups_done.set()
+
+    def gated_query(cursor=None, *args):
+        if cursor and int(cursor) >= GATED_CURSOR:
+            follow_ups_done.wait(FOLLOW_UP_DELAY * 10)
+            time.sleep(0.1)  # the future completes right after the event
+        return query_unfulfilled_lines(cursor, *args)
+
+    def recording_save_cursor(cursor_value):
+        saved.append((cursor_value, b2b_lines("#B2B-1001", shop.STAGING_TABLE)))
+        save_cursor(cursor_value)
+
+    def throttled_once(query, *args, **kwargs):
+        if not throttled:
+            throttled.append(query)
+            return THROTTLED_REPLY
+        return graphql_post(query, *args, **kwargs)
+
+    shop.complete_truncated_orders = slow_follow_ups
+    shop.query_unfulfilled_lines = gated_query
+    shop.save_cursor = recording_save_cursor
+    shop.graphql_post = throttled_once
+    with tempfile.TemporaryDirectory() as tmp:
+        shop.DB_NAME = os.path.join(tmp, "open_shopify.db")
+        shop.CURSOR_FILE = os.path.join(tmp, "last_cursor.txt")
+        shop.main()
+        loaded = b2b_lines("#B2B-1001")
+        kept = b2b_lines("#B2B-1002")
+    server.shutdown()
+    shop.complete_truncated_orders = complete_truncated_orders
+    shop.query_unfulfilled_lines = query_unfulfilled_lines
+    shop.save_cursor = save_cursor
+    shop.graphql_post = graphql_post
+
+    expected = B2B_FULFILLMENT_ORDERS * B2B_LINES_PER_FULFILLMENT_ORDER
+    print(f"[{'✓' if loaded == expected else 'X'}] B2B order lines loaded: {loaded} of {expected} "
+          f"using {state.follow_up_requests} follow-up queries, {len(throttled)} throttled and retried")
+    ok &= loaded == expected and len(throttled) == 1
+    in_order = bool(saved) and all(lines == expected for _, lines in saved)
+    print(f"[{'✓' if in_order else 'X'}] Cursor saved {len(saved)} time(s), each with the B2B follow-ups in: {saved}")
+    ok &= in_order
+    print(f"[{'✓' if 0 < kept < expected else 'X'}] Order deleted before its follow-ups: crawl finished, "
+          f"{kept} lines kept as fetched")
+    ok &= 0 < kept < expected
+    ok &= failed_follow_up_crawl(sample[0])
+    print(f"[{'✓' if ok else 'X'}] Nested paging checked")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import _ERP_OPEN_ORDERS_SHOP as erp
+from _MOCK_SHOPIFY_SERVER import MockShopifyState, start_mock_server
+
+# === CONFIGURATION ===
+# Drives query_shopify_batch against the local Shopify stand-in with a mix of
+# valid, missing and malformed IDs (the kind the ERP report produces) and
+# reports how many round trips the batched nodes(ids:) fetcher needed. A second
+# run fails every FAIL_EVERY-th nodes() call with an internal error: each one
+# must cost exactly one more call, with the batch resent whole, not bisected.
+NUM_ORDERS = 12500
+MISSING_IDS = ["6000000000007", "6000000004242"]
+MALFORMED_IDS = ["6193266229428.0", "nan", "#19424237"]
+FAIL_EVERY = 10
+
+
+def fetch(order_ids, fail_every=0):
+    server, state, endpoint = start_mock_server(
+        MockShopifyState(bucket_max=20000.0, restore_rate=1000.0, latency=0.01, missing_ids=MISSING_IDS,
+                         nodes_fail_every=fail_every)
+    )
+    erp.SHOPIFY_ENDPOINT = endpoint
+    try:
+        return erp.query_shopify_batch(order_ids), state
+    finally:
+        server.shutdown()
+
+
+def main():
+    ok = True
+    order_ids = [str(6000000000000 + i) for i in range(NUM_ORDERS)]
+    for offset, bad_id in enumerate(MALFORMED_IDS):
+        order_ids.insert(1000 * (offset + 1), bad_id)
+
+    results, state = fetch(order_ids)
+    expected = NUM_ORDERS - len(MISSING_IDS)
+    print(f"[{'✓' if len(results) == expected else 'X'}] {len(results)} of {len(order_ids)} IDs resolved "
+          f"(expected {expected})")
+    print(f"[✓] {state.requests} charged round trips vs {len(order_ids)} with one request per order")
+    missing = [oid for oid in MISSING_IDS + MALFORMED_IDS if oid in results]
+    print(f"[{'✓' if not missing else 'X'}] Missing/malformed IDs absent from results: {not missing}")
+    ok &= len(results) == expected and not missing
+
+    erp.NODES_RETRY_DELAY = 0.05
+    flaky, flaky_state = fetch(order_ids, FAIL_EVERY)
+    failures = flaky_state.nodes_calls // FAIL_EVERY
+    retried = flaky == results and flaky_state.nodes_calls == state.nodes_calls + failures
+    print(f"[{'✓' if retried else 'X'}] {failures} internal errors cost {flaky_state.nodes_calls - state.nodes_calls} "
+          f"extra nodes calls ({flaky_state.nodes_calls} vs {state.nodes_calls}); {len(flaky)} IDs resolved")
+    ok &= retried
+    print(f"[{'✓' if ok else 'X'}] Nodes fetch checked")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import os
+import time
+import shutil
+import tempfile
+from _SQLITE_STORAGE import connect
+from _PICK_RECON_TABLES import MATERIALIZED_VIEWS, build_recon_tables, materialized_name
+
+# === CONFIGURATION ===
+# Builds the materialized reconciliation tables on a copy of the shipped
+# pick_aging.db and checks each one against the view it replaces: same columns,
+# same rows. Also times reading every dashboard bucket both ways.
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def mat_columns(conn, view_name):
+    # The views' p.*, e.* also carry the interned key ids, which mat_ tables leave out
+    names = [row[1] for row in conn.execute(f"PRAGMA table_info({materialized_name(view_name)})")]
+    return ", ".join(f'"{n}"' for n in names)
+
+
+def read(conn, name, columns="*"):
+    cursor = conn.execute(f"SELECT {columns} FROM {name}")
+    return [d[0] for d in cursor.description], sorted(map(repr, cursor.fetchall()))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "pick_aging.db")
+        shutil.copyfile(os.path.join(REPO_DIR, "pick_aging.db"), db_path)
+        conn = connect(db_path)
+
+        started = time.monotonic()
+        build_recon_tables(conn)
+        print(f"[✓] Built {len(MATERIALIZED_VIEWS)} tables in {time.monotonic() - started:.3f}s")
+
+        mismatched = []
+        view_time = table_time = 0.0
+        for view_name in MATERIALIZED_VIEWS:
+            started = time.monotonic()
+            expected = read(conn, view_name, mat_columns(conn, view_name))
+            view_time += time.monotonic() - started
+            started = time.monotonic()
+            actual = read(conn, materialized_name(view_name))
+            table_time += time.monotonic() - started
+            if expected != actual:
+                mismatched.append(view_name)
+        conn.close()
+
+    print(f"[{'✓' if not mismatched else 'X'}] Materialized tables match their views"
+          f"{'' if not mismatched else ': ' + ', '.join(mismatched)}")
+    print(f"[✓] Reading every bucket: views {view_time:.3f}s, materialized tables {table_time:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import os
+import time
+import tempfile
+import threading
+from _SQLITE_STORAGE import bump_snapshot, connect
+from _QUERY_CACHE import QueryCache
+from _EXPLORER_QUERIES import ERP_AGING, count_rows, fetch_page, distinct_values
+from _CHECK_EXPLORER_QUERIES import aging_db
+
+# === CONFIGURATION ===
+# Builds the explorer check's mad_recon.db, then plays dashboard reruns against
+# one QueryCache: a repeated rerun is answered from memory, a loader's
+# bump_snapshot makes the next rerun see newly written rows, a query that
+# waited out a snapshot refresh is cached under the snapshot it ran against,
+# the LRU stays within its bound, and sessions on several threads share the one
+# connection.
+RERUNS = 20
+THREADS = 8
+SMALL_CACHE = 4
+
+
+def rerun(cache, values):
+    # What one explorer rerun asks for: options, count and the first page
+    cache.refresh_snapshot()
+    options = cache.get(distinct_values, ERP_AGING, "warehouse")
+    total = cache.get(count_rows, ERP_AGING, values)
+    page, after = cache.get(fetch_page, ERP_AGING, values, None)
+    return options, total, page
+
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "mad_recon.db")
+        writer = aging_db(path)
+        bump_snapshot(writer, "check_query_cache")
+        cache = QueryCache(path)
+        values = {"warehouse": ["AV"]}
+
+        started = time.monotonic()
+        first = rerun(cache, values)
+        first_s = time.monotonic() - started
+        started = time.monotonic()
+        for _ in range(RERUNS):
+            again = rerun(cache, values)
+        cached_s = (time.monotonic() - started) / RERUNS
+        same = again[1] == first[1] and again[2] is first[2]
+        hits = cache.stats["hits"] == 3 * RERUNS and cache.stats["misses"] == 3
+        print(f"[{'✓' if same and hits else 'X'}] {RERUNS} repeated reruns: {cache.stats['hits']} hits, "
+              f"{cache.stats['misses']} misses; first rerun {first_s:.3f}s, cached {cached_s * 1000:.3f}ms")
+        ok &= same and hits
+
+        # A loader writes new rows; cached results hold until it publishes a snapshot
+        writer.execute("""INSERT INTO erp_aging_data ("order-number", warehouse, timestamp)
+                          SELECT "order-number" || '-new', warehouse, timestamp FROM erp_aging_data
+                          WHERE warehouse = 'AV'""")
+        writer.commit()
+        stale = rerun(cache, values)[1] == first[1]
+        bump_snapshot(writer, "check_query_cache")
+        fresh = rerun(cache, values)[1] == 2 * first[1]
+        print(f"[{'✓' if stale and fresh else 'X'}] Snapshot bump: {first[1]:,} rows before, "
+              f"{cache.get(count_rows, ERP_AGING, values):,} after; "
+              f"{cache.stats['invalidations']} invalidation(s)")
+        ok &= stale and fresh
+
+        # A session asks while another one's rerun holds the cache and moves it
+        # to a new snapshot; its result must be keyed on the new snapshot
+        waited = {}
+        with cache.lock:
+            asking = threading.Thread(target=lambda: waited.update(
+                total=cache.get(count_rows, ERP_AGING, {"warehouse": ["AS"]})))
+            asking.start()
+            time.sleep(0.2)
+            bump_snapshot(writer, "check_query_cache")
+            cache.refresh_snapshot()
+        asking.join()
+        keyed = {key[0] for key in cache.entries} == {cache.snapshot[0]}
+        keyed &= cache.get(count_rows, ERP_AGING, {"warehouse": ["AS"]}) == waited["total"]
+        print(f"[{'✓' if keyed else 'X'}] Query waiting on a refresh cached under snapshot {cache.snapshot[0]}; "
+              f"snapshot ids cached: {sorted({key[0] for key in cache.entries})}")
+        ok &= keyed
+
+        small = QueryCache(path, max_entries=SMALL_CACHE)
+        for age in range(SMALL_CACHE * 3):
+            small.get(count_rows, ERP_AGING, {"age": (age, None)})
+        bounded = len(small.entries) == SMALL_CACHE and small.stats["evictions"] == SMALL_CACHE * 2
+        small.get(count_rows, ERP_AGING, {"age": (SMALL_CACHE * 3 - 1, None)})
+        bounded = bounded and small.stats["hits"] == 1
+        print(f"[{'✓' if bounded else 'X'}] LRU bound: {len(small.entries)} of {SMALL_CACHE} entries after "
+              f"{SMALL_CACHE * 3} queries, {small.stats['evictions']} evicted")
+        ok &= bounded
+
+        results, errors = [], []
+
+        def session(warehouse):
+            try:
+                for _ in range(RERUNS):
+                    results.append(rerun(cache, {"warehouse": [warehouse]})[1])
+            except Exception as e:
+                errors.append(e)
+
+        expected = {w: count_rows(writer, ERP_AGING, {"warehouse": [w]}) for w in ("AV", "AS")}
+        threads = [threading.Thread(target=session, args=("AV" if i % 2 else "AS",)) for i in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        shared = not errors and sorted(set(results)) == sorted(set(expected.values()))
+        print(f"[{'✓' if shared else 'X'}] {THREADS} sessions on one connection: {len(results)} reruns, "
+              f"{len(errors)} errors; hit rate {cache.hit_rate() * 100:.1f}%")
+        ok &= shared
+        cache.conn.close()
+        small.conn.close()
+        writer.close()
+    print(f"[{'✓' if ok else 'X'}] Query cache checked")
+
+
+if __name__ == "__main__":
+    main()
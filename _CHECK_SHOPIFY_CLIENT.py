@@ -0,0 +1,31 @@
+import _ERP_OPEN_ORDERS_SHOP as erp
+from _MOCK_SHOPIFY_SERVER import MockShopifyState, start_mock_server
+from _SHOPIFY_CLIENT import get_client
+from _SHOPIFY_GRAPHQL_ENGINE import enrich_orders
+
+# === CONFIGURATION ===
+# Sends both the nodes(ids:) fetcher and the concurrent alias engine through
+# the shared client against a stand-in that answers every 7th POST with 429,
+# then prints the client's retry, latency, cost and connection counts.
+NUM_ORDERS = 3000
+HEADERS = {"Content-Type": "application/json"}
+
+
+def main():
+    order_ids = [str(6000000000000 + i) for i in range(NUM_ORDERS)]
+    server, state, endpoint = start_mock_server(
+        MockShopifyState(bucket_max=20000.0, restore_rate=1000.0, latency=0.02, http_429_every=7)
+    )
+
+    erp.SHOPIFY_ENDPOINT = endpoint
+    results = erp.query_shopify_batch(order_ids)
+    orders, stats = enrich_orders(order_ids, endpoint, HEADERS, concurrency=6, verbose=False)
+    server.shutdown()
+
+    print(f"[{'✓' if len(results) == NUM_ORDERS else 'X'}] nodes fetcher resolved {len(results)} of {NUM_ORDERS}")
+    print(f"[{'✓' if len(orders) == NUM_ORDERS else 'X'}] alias engine resolved {len(orders)} of {NUM_ORDERS}")
+    get_client().print_metrics()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from _SQLITE_STORAGE import connect, migrate
+from _DB_BUILDS import DatabaseBuild, builds_dir, current_db
+from _RECON_KEYS import order_gid
+from _SHOPIFY_ORDER_CACHE import ShopifyOrderCache, TS_FORMAT, copy_orders_into
+from _PARSE_SHOP_RESPONSE import PARSED_ORDERS_MIGRATIONS, reparse_orders
+
+# === CONFIGURATION ===
+# Plays enrichment runs the way _ERP_SHOP_GRAPHQL_BATCH does: orders go into
+# the response cache database, then a mad_recon.db build copies them in and
+# re-parses what changed. In the second run one order is unchanged, one
+# changes and one is gone from Shopify: only those two are re-parsed, and the
+# missing order's parsed rows drop out. A third run dies after the crawl; the
+# fetched orders stay cached, its build is discarded, and the next run
+# publishes them without asking Shopify again.
+ORDER_IDS = ["1001", "1002", "1003"]
+
+
+def order(order_id, status="PAID"):
+    return {"id": order_gid(order_id), "name": f"#{order_id}", "displayFinancialStatus": status, "fulfillments": []}
+
+
+def parsed(db_path):
+    conn = sqlite3.connect(current_db(db_path))
+    rows = dict(conn.execute("SELECT shopify_order_id, financial_status FROM shopify_parsed_orders").fetchall())
+    conn.close()
+    return rows
+
+
+def crawl(cache_path, now, orders):
+    # Returns the IDs that had to be fetched
+    conn = connect(cache_path)
+    cache = ShopifyOrderCache(conn, now=now)
+    due = cache.ids_to_refresh(ORDER_IDS)
+    cache.store(due, orders, now.strftime(TS_FORMAT))
+    conn.close()
+    return due
+
+
+def publish(db_path, cache_path, fail=False):
+    with DatabaseBuild(db_path, "check_shopify_order_cache", required_tables=["shopify_parsed_orders"]) as conn:
+        migrate(conn, PARSED_ORDERS_MIGRATIONS)
+        changed = copy_orders_into(conn, cache_path)
+        reparse_orders(conn, changed)
+        if fail:
+            raise RuntimeError("enrichment failed before publish")
+    return changed
+
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "mad_recon.db")
+        cache_path = os.path.join(tmp, "shopify_order_cache.db")
+        first = datetime(2026, 10, 1, 6, 30)
+        crawl(cache_path, first, [order(i) for i in ORDER_IDS])
+        publish(db_path, cache_path)
+        before = parsed(db_path)
+        print(f"[{'✓' if len(before) == 3 else 'X'}] First run parsed {sorted(before)}")
+        ok &= len(before) == 3
+
+        # Past every TTL, so all three are asked for again
+        crawl(cache_path, first + timedelta(days=40), [order("1001"), order("1002", "REFUNDED")])
+        changed = publish(db_path, cache_path)
+        after = parsed(db_path)
+        good = sorted(changed) == [order_gid("1002"), order_gid("1003")] \
+            and after == {"1001": "PAID", "1002": "REFUNDED"}
+        print(f"[{'✓' if good else 'X'}] Second run re-parsed {len(changed)} orders; parsed rows now {after}")
+        ok &= good
+
+        # The crawl lands, then the run dies: nothing is published
+        third = first + timedelta(days=80)
+        live = current_db(db_path)
+        fetched = crawl(cache_path, third, [order("1001", "VOIDED"), order("1002", "REFUNDED")])
+        try:
+            publish(db_path, cache_path, fail=True)
+        except RuntimeError:
+            pass
+        discarded = current_db(db_path) == live and parsed(db_path) == after \
+            and len([n for n in os.listdir(builds_dir(db_path)) if n.endswith(".db")]) == 2
+        refetched = crawl(cache_path, third + timedelta(minutes=5), [])
+        changed = publish(db_path, cache_path)
+        resumed = refetched == [] and order_gid("1001") in changed and parsed(db_path)["1001"] == "VOIDED"
+        print(f"[{'✓' if discarded and resumed else 'X'}] Failed run: {len(fetched)} fetched orders kept in the "
+              f"cache, build discarded; next run fetched {len(refetched)} and published them")
+        ok &= discarded and resumed
+    print(f"[{'✓' if ok else 'X'}] Shopify order cache checked")
+
+
+if __name__ == "__main__":
+    main()
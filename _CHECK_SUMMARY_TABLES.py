@@ -0,0 +1,104 @@
+import os
+import time
+import tempfile
+import pandas as pd
+from _SQLITE_STORAGE import connect
+from _ERP_OPEN_ORDERS_SHOP_V2 import AGING_COLUMNS, bulk_upsert_aging
+from _PICK_RECON_TABLES import build_recon_tables
+from _SUMMARY_TABLES import AGING_SUMMARY, RECON_SUMMARY, read_summary
+from _CHECK_EXPLORER_QUERIES import aging_db
+from _CHECK_INCREMENTAL_RECON import edit_sources
+from _BENCH_RECON_ENGINE import scaled_db
+
+# === CONFIGURATION ===
+# Loads two ERP aging reports and two pick/ERP builds the way the load steps
+# do, and checks after each that the summary tables, kept by folding changed
+# orders in and out, equal a GROUP BY over the whole source table. The second
+# aging report ages a slice of orders, changes holds, drops and adds orders.
+# A third report follows writes to erp_aging_data through another connection,
+# which the aging summary must pick up as well.
+# Reading a summary is timed against the pandas aggregation it replaces.
+AGING_SCALE = 10
+RECON_SCALE = 70
+AGED_DAYS = 35
+
+
+def expected(conn, spec):
+    dimensions = ", ".join(spec.dimension_sql())
+    measures = ", ".join(spec.measures.values())
+    return conn.execute(f"SELECT {dimensions}, {measures} FROM {spec.source} GROUP BY {dimensions}").fetchall()
+
+
+def check(conn, label, spec, legacy):
+    stored = conn.execute(f"SELECT * FROM {spec.table}").fetchall()
+    same = sorted(map(repr, [tuple(round(v, 6) if isinstance(v, float) else v for v in row) for row in stored])) \
+        == sorted(map(repr, [tuple(round(v, 6) if isinstance(v, float) else v for v in row)
+                             for row in expected(conn, spec)]))
+    started = time.monotonic()
+    read_summary(conn, spec)
+    summary_s = time.monotonic() - started
+    started = time.monotonic()
+    legacy(conn)
+    legacy_s = time.monotonic() - started
+    rows = conn.execute(f"SELECT COUNT(*) FROM {spec.source}").fetchone()[0]
+    print(f"[{'✓' if same else 'X'}] {label}: {len(stored)} summary rows over {rows:,} source rows match; "
+          f"summary read {summary_s * 1000:.2f}ms vs full pandas aggregation {legacy_s:.3f}s")
+    return same
+
+
+def legacy_aging(conn):
+    df = pd.read_sql_query("SELECT * FROM erp_aging_data", conn)
+    ages = pd.cut(df["iAge"], [-float("inf"), 30, 60, 90, float("inf")])
+    return df.groupby(["warehouse", ages, "hold-code"], dropna=False, observed=True).size()
+
+
+def legacy_recon(conn):
+    df = pd.read_sql_query("SELECT * FROM recon_classified", conn)
+    return df.groupby(["bucket", "location_id"], dropna=False)["order_shipment_line_units"].agg(["size", "sum"])
+
+
+def next_report(conn):
+    columns = ", ".join(f'"{c}"' for c in AGING_COLUMNS)
+    report = pd.read_sql_query(f"SELECT {columns} FROM erp_aging_data", conn).astype(str)
+    report = report.iloc[len(report) // 20:]  # shipped and gone
+    third = len(report) // 3
+    ages = pd.to_numeric(report["iAge"], errors="coerce")
+    report.loc[report.index[:third], "iAge"] = (ages.iloc[:third] + AGED_DAYS).astype("Int64").astype(str)
+    report.loc[report.index[third:third + 200], "hold-code"] = "CREDITHOLD"
+    added = report.iloc[:500].assign(**{"order-number": report["order-number"].iloc[:500] + "-late", "iAge": "0"})
+    return pd.concat([report, added], ignore_index=True)
+
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = aging_db(os.path.join(tmp, "mad_recon.db"))
+        ok &= check(conn, "erp aging, first report", AGING_SUMMARY, legacy_aging)
+        report = next_report(conn)
+        started = time.monotonic()
+        bulk_upsert_aging(conn, report, "20261019_063000")
+        apply_s = time.monotonic() - started
+        print(f"[→] Second report ({len(report):,} orders) applied in {apply_s:.2f}s")
+        ok &= check(conn, "erp aging, second report", AGING_SUMMARY, legacy_aging)
+
+        other = connect(os.path.join(tmp, "mad_recon.db"))
+        with other:
+            other.execute('UPDATE erp_aging_data SET "hold-code" = \'MANUAL\' WHERE rowid % 7 = 0')
+            other.execute('DELETE FROM erp_aging_data WHERE rowid % 11 = 0')
+        other.close()
+        bulk_upsert_aging(conn, next_report(conn), "20261020_063000")
+        ok &= check(conn, "erp aging, report after another connection's writes", AGING_SUMMARY, legacy_aging)
+        conn.close()
+
+        conn = scaled_db(os.path.join(tmp, "pick_aging.db"), RECON_SCALE)
+        build_recon_tables(conn)
+        ok &= check(conn, "recon, full build", RECON_SUMMARY, legacy_recon)
+        edit_sources(conn)
+        build_recon_tables(conn)
+        ok &= check(conn, "recon, incremental build", RECON_SUMMARY, legacy_recon)
+        conn.close()
+    print(f"[{'✓' if ok else 'X'}] Summary tables checked")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import csv
+import sys
+import time
+import tracemalloc
+import pandas as pd
+from _SQLITE_STORAGE import insert_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pandas' C parser in chunks does the same job, a little slower
+    pa = pa_csv = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# === CONFIGURATION ===
+# Every report CSV is read against an explicit schema: only the listed columns,
+# each with a fixed dtype, so an ID column never flips between float and object
+# depending on blanks. Files are streamed in chunks that go straight to SQLite,
+# so memory stays bounded by CHUNK_ROWS whatever the size of the report.
+CHUNK_ROWS = 50000
+CHUNK_BYTES = 8 * 1024 * 1024  # pyarrow block size; roughly CHUNK_ROWS of a wide report
+# Memory is reported as the process's peak RSS where the OS exposes it. With
+# TRACE_MEMORY the peak Python/NumPy allocation of the load itself is traced
+# instead; that is exact but makes the load several times slower.
+TRACE_MEMORY = False
+
+# Float64 columns get NUMERIC affinity, so whole values are stored as integers
+# and fractional ones as reals, like _RECON_KEYS.canonical_quantity does
+SQL_TYPES = {"string": "TEXT", "category": "TEXT", "Int64": "INTEGER", "Float64": "NUMERIC"}
+ARROW_TYPES = {"string": "string", "category": "dictionary", "Int64": "int64", "Float64": "float64"}
+
+
+class ReportSchema:
+    # columns: {column in the file: dtype}, in the order they should be stored.
+    # Headerless files list every column in file order under names. Optional
+    # columns may be absent from the file and are stored as NULL.
+    def __init__(self, name, columns, rename=None, names=None, optional=()):
+        self.name = name
+        self.columns = columns
+        self.rename = rename or {}
+        self.names = names
+        self.optional = set(optional)
+
+    def target_columns(self):
+        return [self.rename.get(c, c) for c in self.columns]
+
+    def target_dtypes(self):
+        return {self.rename.get(c, c): dtype for c, dtype in self.columns.items()}
+
+
+# === REPORT SCHEMAS ===
+PICK_REPORT = ReportSchema(
+    "pick aging report",
+    {
+        "Order Id": "string",
+        "Order Name": "string",
+        "Product Id": "string",
+        "Location Id": "category",
+        "Order Shipment Line Units in Status": "Float64",
+    },
+    rename={
+        "Order Id": "order_id",
+        "Order Name": "order_name",
+        "Product Id": "product_id",
+        "Location Id": "location_id",
+        "Order Shipment Line Units in Status": "order_shipment_line_units",
+    },
+)
+ERP_AGING_REPORT = ReportSchema(
+    "ERP aging report",
+    {
+        "order-number": "string",
+        "bo-number": "string",
+        "warehouse": "category",
+        "cShopifyOrderNumber": "string",
+        "cShopifyOrderID": "string",
+        "warehouse-status": "category",
+        "hold-code": "category",
+        "lHasFulfillment": "category",
+        "lHasShipment": "category",
+        "iAge": "Int64",
+    },
+    names=["order-number", "bo-number", "warehouse", "cShopifyOrderNumber", "cShopifyOrderID",
+           "warehouse-status", "hold-code", "lHasFulfillment", "lHasShipment", "iAge"],
+)
+ERP_ORDER_LINES = ReportSchema(
+    "ERP order lines",
+    {
+        "OrderNumber": "string",
+        "WarehouseStatus": "category",
+        "CustOrderNum": "string",
+        "ItemNumber": "string",
+        "Warehouse": "category",
+        "OrderQty": "Int64",
+        "ShippedQty": "Int64",
+        "CancelQty": "Int64",
+    },
+)
+ERP_PICK_LINES = ReportSchema(
+    "ERP pick lines",
+    dict(ERP_ORDER_LINES.columns, orderDate="string"),
+    optional=("orderDate",),
+)
+
+
+# === READING ===
+def conform(df, schema):
+    # Renames and casts a frame (a CSV chunk or rows from elsewhere, e.g. the
+    # ERP line cache) to the schema; schema columns missing from it are NULL
+    df = df.rename(columns=schema.rename)
+    for column, dtype in schema.target_dtypes().items():
+        if column not in df.columns:
+            df[column] = pd.Series(pd.NA, index=df.index, dtype=dtype)
+        elif dtype in ("Int64", "Float64"):
+            # Via Float64, so "1.0" in an integer column loads as 1
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("Float64").astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
+    return df[schema.target_columns()]
+
+
+def _file_columns(path, schema):
+    # Schema columns present in the file; a missing required column is an error
+    if schema.names:
+        header = schema.names
+    else:
+        with open(path, newline="") as f:
+            header = next(csv.reader(f), [])
+    present = {c: d for c, d in schema.columns.items() if c in header}
+    missing = set(schema.columns) - set(present) - schema.optional
+    if missing and header:
+        raise ValueError(f"{path} is missing {schema.name} columns: {', '.join(sorted(missing))}")
+    return present if header else {}
+
+
+def read_chunks(path, schema, chunk_rows=CHUNK_ROWS):
+    # Yields conformed DataFrames of at most chunk_rows rows (pyarrow: one per block)
+    columns = _file_columns(path, schema)
+    if not columns:
+        return
+    if pa_csv is not None:
+        yield from _read_chunks_arrow(path, schema, columns)
+        return
+    reader = pd.read_csv(
+        path,
+        header=None if schema.names else 0,
+        names=schema.names,
+        usecols=list(columns),
+        dtype={c: "Float64" if d == "Int64" else d for c, d in columns.items()},
+        chunksize=chunk_rows,
+    )
+    for chunk in reader:
+        yield conform(chunk, schema)
+
+
+def _read_chunks_arrow(path, schema, columns):
+    types = {}
+    for column, dtype in columns.items():
+        kind = ARROW_TYPES[dtype]
+        types[column] = pa.dictionary(pa.int32(), pa.string()) if kind == "dictionary" else getattr(pa, kind)()
+    reader = pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(block_size=CHUNK_BYTES, column_names=schema.names),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=list(columns),
+            column_types=types,
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        yield conform(batch.to_pandas(), schema)
+
+
+# === WRITING ===
+def _sql_type(dtype):
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(dtype):
+        return "TEXT"
+    if pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return ""
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB elsewhere
+
+
+def create_table(conn, table, columns):
+    # columns: {name: SQL type}
+    body = ", ".join(f'"{name}" {sql_type}'.strip() for name, sql_type in columns.items())
+    conn.execute(f"CREATE TABLE {table} ({body})")
+
+
+def replace_table(conn, table, staging):
+    # Swaps a fully loaded staging table in under the live name in one
+    # transaction. sqlite3 does not open one for DDL by itself, hence the
+    # explicit BEGIN. Legacy rename leaves views alone, so views on the live
+    # name keep working against the new table.
+    conn.commit()
+    conn.execute("PRAGMA legacy_alter_table=ON")
+    try:
+        conn.execute("BEGIN")
+        try:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"ALTER TABLE {staging} RENAME TO {table}")
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+    finally:
+        conn.execute("PRAGMA legacy_alter_table=OFF")
+
+
+def ingest_frames(conn, table, frames, schema, replace=True, label=None):
+    # Streams frames into table chunk by chunk. With replace the rows go into
+    # a staging table that replaces the live one only once everything is in,
+    # so readers see the old rows or the new ones, never a partial load.
+    # Returns {"rows", "seconds", "rows_per_sec", "peak_mb"}.
+    target = f"{table}_ingest" if replace else table
+    if replace:
+        conn.execute(f"DROP TABLE IF EXISTS {target}")
+        conn.commit()
+    tracing = TRACE_MEMORY and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    started = time.monotonic()
+    rows = 0
+    created = not replace
+    try:
+        for frame in frames:
+            if not created:
+                # The schema's types are authoritative; extra columns (interned
+                # ids, timestamps) take the type of their first chunk
+                declared = schema.target_dtypes()
+                create_table(conn, target, {c: SQL_TYPES[declared[c]] if c in declared else _sql_type(frame[c].dtype)
+                                            for c in frame.columns})
+                created = True
+            rows += insert_frame(conn, target, frame, batch_rows=max(len(frame), 1))
+        if not created:
+            create_table(conn, target, {c: SQL_TYPES[d] for c, d in schema.target_dtypes().items()})
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024 if tracing else _peak_rss_mb()
+    finally:
+        if tracing:
+            tracemalloc.stop()
+    if replace:
+        replace_table(conn, table, target)
+
+    seconds = time.monotonic() - started
+    stats = {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds if seconds else 0.0, "peak_mb": peak_mb}
+    memory = f", peak {'traced' if tracing else 'RSS'} {peak_mb:.1f} MB" if peak_mb is not None else ""
+    print(f"[✓] Ingested {rows:,} {label or schema.name} rows into {table} in {seconds:.2f}s "
+          f"({stats['rows_per_sec']:,.0f} rows/s{memory})")
+    return stats
+
+
+def ingest_csv(conn, path, schema, table, transform=None, replace=True, chunk_rows=CHUNK_ROWS):
+    # transform: optional callable applied to each conformed chunk before it is written
+    chunks = read_chunks(path, schema, chunk_rows)
+    if transform is not None:
+        chunks = (transform(chunk) for chunk in chunks)
+    return ingest_frames(conn, table, chunks, schema, replace=replace)
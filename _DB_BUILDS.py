@@ -0,0 +1,159 @@
+import os
+import sqlite3
+from datetime import datetime
+
+# === CONFIGURATION ===
+# Loaders never write the database the dashboards are reading. Each refresh
+# copies the current build to a new file next to it, loads into the copy with
+# fast unsafe pragmas (a failed build is just deleted), runs ANALYZE, checks
+# the result and only then moves the CURRENT pointer to it:
+#   pick_aging.db.builds/pick_aging_20261018_063000.db
+#   pick_aging.db.builds/CURRENT   -> "pick_aging_20261018_063000.db"
+# Readers resolve the pointer with current_db() when they connect, so they see
+# the previous build whole until the swap and the new one whole after it.
+# Replacing the pointer is atomic on Windows as well, where an open database
+# file cannot be replaced. The newest BUILD_KEEP builds are kept; an older one
+# still held open by a reader is removed by a later publish. Before the first
+# build, current_db() is the plain database path.
+BUILDS_SUFFIX = ".builds"
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = "build.lock"
+BUILD_KEEP = 3
+TS_FORMAT = "%Y%m%d_%H%M%S"
+# A second loader waits for the running build to be published, then copies it
+LOCK_TIMEOUT_S = 2 * 60 * 60
+BUILD_PRAGMAS = [
+    "journal_mode=MEMORY",  # rollback still works, nothing is journaled to disk
+    "synchronous=OFF",
+    "locking_mode=EXCLUSIVE",
+    "temp_store=MEMORY",
+    f"cache_size=-{256 * 1024}",
+]
+
+
+def builds_dir(db_path):
+    return f"{os.path.abspath(db_path)}{BUILDS_SUFFIX}"
+
+
+def current_db(db_path):
+    # The published build readers should open, or db_path before the first build
+    try:
+        with open(os.path.join(builds_dir(db_path), CURRENT_FILE), encoding="utf-8") as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return db_path
+    return os.path.join(builds_dir(db_path), name)
+
+
+def _point_to(db_path, build_path):
+    pointer = os.path.join(builds_dir(db_path), CURRENT_FILE)
+    with open(f"{pointer}.partial", "w", encoding="utf-8") as f:
+        f.write(os.path.basename(build_path))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f"{pointer}.partial", pointer)
+
+
+def prune_builds(db_path, keep=BUILD_KEEP):
+    # Keeps the current build and the keep - 1 before it. Newer files belong to
+    # a build still running. A build a reader still has open (Windows) stays
+    # until a later publish.
+    directory = builds_dir(db_path)
+    current = os.path.basename(current_db(db_path))
+    builds = sorted(name for name in os.listdir(directory) if name.endswith(".db") and name <= current)
+    for name in builds[:-keep]:
+        for suffix in ("", "-journal", "-wal", "-shm"):
+            try:
+                os.remove(os.path.join(directory, name + suffix))
+            except FileNotFoundError:
+                pass
+            except PermissionError:
+                print(f"[=] {name} is still open, removing it after a later build")
+                break
+
+
+class DatabaseBuild:
+    # open() copies the current build and returns a connection to the copy;
+    # publish() analyzes, validates and swaps it in; discard() throws it away.
+    # As a context manager, a clean exit publishes and an exception discards.
+    # required_tables must all exist in the build for it to be published.
+    def __init__(self, db_path, label, required_tables=()):
+        self.db_path = db_path
+        self.label = label
+        self.required_tables = list(required_tables)
+        self.path = None
+        self.conn = None
+        self.lock = None
+
+    def open(self):
+        directory = builds_dir(self.db_path)
+        os.makedirs(directory, exist_ok=True)
+        # Held until publish/discard; SQLite releases it if the process dies
+        self.lock = sqlite3.connect(os.path.join(directory, LOCK_FILE), timeout=LOCK_TIMEOUT_S)
+        self.lock.execute("BEGIN EXCLUSIVE")
+
+        source = current_db(self.db_path)
+        name = f"{os.path.splitext(os.path.basename(self.db_path))[0]}_{datetime.now().strftime(TS_FORMAT)}"
+        self.path = os.path.join(directory, f"{name}.db")
+        seq = 0
+        while os.path.exists(self.path):  # builds within one second sort in order
+            seq += 1
+            self.path = os.path.join(directory, f"{name}_{seq:03d}.db")
+        started = datetime.now()
+        self.conn = sqlite3.connect(self.path)
+        if os.path.exists(source):
+            live = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+            live.backup(self.conn)
+            live.close()
+        for pragma in BUILD_PRAGMAS:
+            self.conn.execute(f"PRAGMA {pragma}")
+        print(f"[→] Building {os.path.basename(self.path)} ({self.label}) from "
+              f"{os.path.basename(source)} in {(datetime.now() - started).total_seconds():.1f}s")
+        return self.conn
+
+    def validate(self):
+        problems = [row[0] for row in self.conn.execute("PRAGMA quick_check")]
+        if problems != ["ok"]:
+            raise RuntimeError(f"{self.path} failed quick_check: {'; '.join(problems[:5])}")
+        tables = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        missing = [t for t in self.required_tables if t not in tables]
+        if missing:
+            raise RuntimeError(f"{self.path} is missing tables: {', '.join(missing)}")
+
+    def publish(self):
+        try:
+            self.conn.commit()
+            self.conn.execute("ANALYZE")
+            self.validate()
+        except Exception:
+            self.discard()
+            raise
+        # A published build is a single self-contained file readers never write
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.close()
+        _point_to(self.db_path, self.path)
+        self._release()
+        prune_builds(self.db_path)
+        print(f"[✓] Published {os.path.basename(self.path)} ({self.label})")
+        return self.path
+
+    def discard(self):
+        self.conn.close()
+        os.remove(self.path)
+        self._release()
+        print(f"[X] Discarded build {os.path.basename(self.path)} ({self.label}); "
+              f"{os.path.basename(current_db(self.db_path))} stays live")
+
+    def _release(self):
+        self.lock.rollback()
+        self.lock.close()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.publish()
+        else:
+            self.discard()
+        return False
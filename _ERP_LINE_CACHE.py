@@ -0,0 +1,168 @@
+import json
+import pandas as pd
+from datetime import datetime, timedelta
+
+# === CONFIGURATION ===
+# How long a cached ERP answer for an (order, SKU) pair is trusted. Only pairs
+# whose every ERP line is terminal are cached for TTL_TERMINAL; open pairs and
+# pairs the ERP had no answer for are sent again on every run.
+TTL_TERMINAL = timedelta(days=30)
+TERMINAL_STATUSES = {"INVOICED", "SHIPPED", "CLOSED", "OE-CANCEL", "CANCEL"}
+CACHE_TABLE = "erp_line_cache"
+
+TS_FORMAT = "%Y%m%d_%H%M%S"
+KEY_COLUMNS = ("CustOrderNum", "ItemNumber")
+CHUNK_ROWS = 50000  # cached lines per DataFrame yielded by rows_for
+
+
+def line_keys(df, order_col, sku_col):
+    if df.empty:
+        return []
+    return list(zip(df[order_col].fillna("").astype(str), df[sku_col].fillna("").astype(str)))
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def is_terminal_line(row):
+    if str(row.get("WarehouseStatus") or "").strip().upper() in TERMINAL_STATUSES:
+        return True
+    ordered = _number(row.get("OrderQty"))
+    return ordered > 0 and _number(row.get("ShippedQty")) + _number(row.get("CancelQty")) >= ordered
+
+
+# === CACHE ===
+# One row per (CustOrderNum, ItemNumber) holding the ERP lines last returned for
+# it as JSON records, when they were fetched and whether they were all terminal.
+# The export step sends only the pairs keys_to_refresh returns; the load step
+# stores the fresh answers and fills in the pairs that were not sent from here.
+# Both sides work chunk by chunk, so neither holds a whole ERP output in memory.
+class ErpLineCache:
+    def __init__(self, conn, table=CACHE_TABLE, now=None):
+        self.conn = conn
+        self.table = table
+        self.now = now or datetime.now()
+        self.stats = {"hits": 0, "misses_new": 0, "misses_open": 0, "misses_stale": 0,
+                      "stored": 0, "terminal": 0, "unanswered": 0, "pruned": 0}
+        self.answered = {}  # pairs stored by add_answers since the last finish_store -> terminal
+        self.ensure_schema()
+
+    def ensure_schema(self):
+        self.conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {self.table} (
+            CustOrderNum TEXT,
+            ItemNumber TEXT,
+            rows_json TEXT,
+            terminal INTEGER,
+            fetched_at TEXT,
+            PRIMARY KEY (CustOrderNum, ItemNumber)
+        )
+        """)
+        self.conn.commit()
+
+    def keys_to_refresh(self, keys):
+        # keys: iterable of (order, sku); returns those the ERP must be asked about
+        cached = {
+            (row[0], row[1]): row[2:]
+            for row in self.conn.execute(f"SELECT CustOrderNum, ItemNumber, terminal, fetched_at FROM {self.table}")
+        }
+        due = []
+        for key in keys:
+            entry = cached.get(key)
+            if entry is None:
+                self.stats["misses_new"] += 1
+                due.append(key)
+            elif not entry[0]:
+                self.stats["misses_open"] += 1
+                due.append(key)
+            elif datetime.strptime(entry[1], TS_FORMAT) + TTL_TERMINAL <= self.now:
+                self.stats["misses_stale"] += 1
+                due.append(key)
+            else:
+                self.stats["hits"] += 1
+        return due
+
+    def store(self, requested_keys, answers):
+        # answers: DataFrame of ERP output lines for (a superset of) requested_keys
+        self.add_answers(answers)
+        self.finish_store(requested_keys)
+
+    def add_answers(self, answers):
+        # Stores one chunk of ERP output; a pair whose lines span several
+        # chunks accumulates them, so answers can be streamed from the CSV
+        if answers.empty:
+            return
+        grouped = {}
+        for record in json.loads(answers.to_json(orient="records")):
+            key = (str(record.get(KEY_COLUMNS[0])), str(record.get(KEY_COLUMNS[1])))
+            grouped.setdefault(key, []).append(record)
+        for key in set(grouped) & set(self.answered):
+            row = self.conn.execute(
+                f"SELECT rows_json FROM {self.table} WHERE CustOrderNum = ? AND ItemNumber = ?", key
+            ).fetchone()
+            grouped[key] = (json.loads(row[0]) if row else []) + grouped[key]
+        rows = []
+        for key, lines in grouped.items():
+            terminal = all(is_terminal_line(line) for line in lines)
+            self.answered[key] = terminal
+            rows.append((key[0], key[1], json.dumps(lines), int(terminal)))
+        self._upsert(rows)
+
+    def finish_store(self, requested_keys):
+        # Requested pairs the ERP returned nothing for are stored as unanswered
+        unanswered = set(requested_keys) - set(self.answered)
+        self._upsert([(key[0], key[1], "[]", 0) for key in unanswered])
+        self.stats["stored"] += len(self.answered) + len(unanswered)
+        self.stats["terminal"] += sum(self.answered.values())
+        self.stats["unanswered"] += len(unanswered)
+        self.answered = {}
+
+    def _upsert(self, rows):
+        now_ts = self.now.strftime(TS_FORMAT)
+        self.conn.executemany(f"""
+            INSERT INTO {self.table} (CustOrderNum, ItemNumber, rows_json, terminal, fetched_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(CustOrderNum, ItemNumber) DO UPDATE SET
+                rows_json = excluded.rows_json,
+                terminal = excluded.terminal,
+                fetched_at = excluded.fetched_at
+        """, [row + (now_ts,) for row in rows])
+        self.conn.commit()
+
+    def prune(self, keys):
+        # Drops cached pairs that are no longer being asked about
+        keep = set(keys)
+        stale = [key for key in self.conn.execute(f"SELECT CustOrderNum, ItemNumber FROM {self.table}")
+                 if tuple(key) not in keep]
+        self.conn.executemany(f"DELETE FROM {self.table} WHERE CustOrderNum = ? AND ItemNumber = ?", stale)
+        self.conn.commit()
+        self.stats["pruned"] += len(stale)
+
+    def rows_for(self, keys, chunk_rows=CHUNK_ROWS):
+        # Yields the cached ERP lines for keys as DataFrames of about chunk_rows lines
+        wanted = set(keys)
+        records = []
+        for order, sku, rows_json in self.conn.execute(f"SELECT CustOrderNum, ItemNumber, rows_json FROM {self.table}"):
+            if (order, sku) in wanted:
+                records.extend(json.loads(rows_json))
+                if len(records) >= chunk_rows:
+                    yield pd.DataFrame(records)
+                    records = []
+        if records:
+            yield pd.DataFrame(records)
+
+    def print_stats(self):
+        # The export step looks pairs up and the load step stores them, each
+        # with its own cache instance, so only the side that did work reports
+        s = self.stats
+        lookups = s["hits"] + s["misses_new"] + s["misses_open"] + s["misses_stale"]
+        if lookups:
+            print(f"[✓] ERP line cache: {s['hits']} hits, {s['misses_new']} new, {s['misses_open']} open, "
+                  f"{s['misses_stale']} stale ({s['hits'] / lookups * 100:.1f}% hit rate)")
+        if s["stored"] or s["pruned"]:
+            print(f"[✓] ERP line cache: {s['stored']} pairs stored ({s['terminal']} terminal, "
+                  f"{s['unanswered']} unanswered), {s['pruned']} pruned")
@@ -1,9 +1,12 @@
 import os
 import json
-import requests
-import paramiko
-from scp import SCPClient
+import time
+from collections import deque
 import pandas as pd
+import requests
+from _ERP_SESSION import get_session
+from _SHOPIFY_CLIENT import get_client, wait_for_budget
+from _RECON_KEYS import shopify_ids
 
 # === CONFIGURATION ===
 RUN_FULL_PROCESS = False  # <<< Set to True to run ERP program remotely
@@ -22,6 +25,17 @@ LOCAL_DIR = os.path.join(os.path.dirname(__file__), "aging_data")
 os.makedirs(LOCAL_DIR, exist_ok=True)
 LOCAL_CSV_PATH = os.path.join(LOCAL_DIR, ERP_OUTPUT_FILE)
 
+ERP_COLUMNS = [
+    "order-number", "bo-number", "warehouse", "cShopifyOrderNumber",
+    "cShopifyOrderID", "warehouse-status", "hold-code",
+    "lHasFulfillment", "lHasShipment", "iAge"
+]
+# Read as text: Shopify IDs are matched as strings, and a blank cell would
+# otherwise turn the whole column into floats ("6193266229428.0")
+ERP_DTYPES = {"cShopifyOrderNumber": "string", "cShopifyOrderID": "string"}
+SHOPIFY_COLUMNS = ["shopify_status", "shopify_location", "shopify_order_id"]
+NOT_FOUND = {"shopify_status": "NOT FOUND", "shopify_location": "", "shopify_order_id": ""}
+
 SHOPIFY_ENDPOINT = "https://alo-yoga.myshopify.com/admin/api/2023-10/graphql.json"
 SHOPIFY_HEADERS = {
     "Content-Type": "application/json",
@@ -29,96 +43,171 @@ SHOPIFY_HEADERS = {
 }
 
 
+# nodes(ids:) takes up to 250 IDs per call; Shopify rejects single queries
+# costing more than 1000 points, so batches are sized to stay under that.
+NODES_MAX_IDS = 250
+NODES_START_IDS = 50
+MAX_QUERY_COST = 1000
+COST_HEADROOM = 0.9
+# Only an invalid ID says anything about a batch's IDs; any other failure
+# (dropped connection, 5xx after the client's retries, internal error) retries
+# the batch as it is, NODES_ATTEMPTS times in all, NODES_RETRY_DELAY apart
+INVALID_ID_MESSAGE = "invalid global id"
+NODES_ATTEMPTS = 3
+NODES_RETRY_DELAY = 2.0
+
+NODES_QUERY = '''
+query getOrders($ids: [ID!]!) {
+  nodes(ids: $ids) {
+    ... on Order {
+      id
+      name
+      displayFinancialStatus
+      fulfillments {
+        status
+        location {
+          name
+        }
+      }
+    }
+  }
+}
+'''
+
+
+def next_batch_size(cost, per_id_cost):
+    # Scale the next batch from the requested cost per ID of the last one,
+    # capped by the single-query limit and the size of the bucket
+    if not per_id_cost:
+        return NODES_START_IDS
+    maximum = (cost.get("throttleStatus") or {}).get("maximumAvailable", MAX_QUERY_COST)
+    budget = min(MAX_QUERY_COST, float(maximum)) * COST_HEADROOM
+    return max(1, min(NODES_MAX_IDS, int(budget / per_id_cost)))
+
+
+def invalid_id_error(errors):
+    # Shopify fails the whole nodes() call with "Invalid global id '...'"
+    return any(INVALID_ID_MESSAGE in str(err.get("message", "")).lower() for err in errors)
+
+
 def query_shopify_batch(order_ids):
     results = {}
-    for shopify_id in order_ids:
-        gid = f"gid://shopify/Order/{shopify_id}"
-        query = '''
-        query getOrder($id: ID!) {
-          order(id: $id) {
-            id
-            name
-            displayFinancialStatus
-            fulfillments {
-              status
-              location {
-                name
-              }
-            }
-          }
-        }
-        '''
-        variables = {"id": gid}
-        response = requests.post(
-            SHOPIFY_ENDPOINT,
-            headers=SHOPIFY_HEADERS,
-            json={"query": query, "variables": variables}
-        )
-
-        print(f"[→] Shopify call for {shopify_id}: HTTP {response.status_code}")
-
-        if response.status_code != 200:
-            print(f"[!] Shopify API error for ID {shopify_id}: {response.status_code}")
+    pending = deque()
+    queue = list(order_ids)
+    batch_size = NODES_START_IDS
+    cost = {}
+    per_id_cost = None
+    round_trips = 0
+    failed_attempts = 0  # of the batch at the front, retried until it goes through
+
+    while queue or pending:
+        if pending:
+            batch = pending.popleft()
+        else:
+            batch, queue = queue[:batch_size], queue[batch_size:]
+
+        if per_id_cost:
+            wait_for_budget(cost, per_id_cost * len(batch))
+
+        gids = [f"gid://shopify/Order/{shopify_id}" for shopify_id in batch]
+        try:
+            response, data = get_client().graphql(SHOPIFY_ENDPOINT, SHOPIFY_HEADERS, NODES_QUERY, {"ids": gids})
+            status = response.status_code
+        except requests.RequestException as e:  # the client already retried the connection
+            data, status = None, e.__class__.__name__
+        round_trips += 1
+        print(f"[→] Shopify nodes call for {len(batch)} orders: HTTP {status}")
+
+        data = data if status == 200 and data else {}
+        errors = data.get("errors") or []
+        cost = (data.get("extensions") or {}).get("cost") or cost
+
+        if any((err.get("extensions") or {}).get("code") == "THROTTLED" for err in errors):
+            wait_for_budget(cost, float(cost.get("requestedQueryCost") or MAX_QUERY_COST))
+            pending.appendleft(batch)
             continue
 
-        data = response.json()
-        order_data = data.get("data", {}).get("order")
-        if order_data:
-            results[shopify_id] = {
-                "shopify_status": ", ".join(
-                    f.get("status", "") for f in order_data.get("fulfillments", [])
-                ),
-                "shopify_location": ", ".join(
-                    f.get("location", {}).get("name", "")
-                    for f in order_data.get("fulfillments", []) if f.get("location")
-                ),
-                "shopify_order_id": order_data.get("id")
-            }
-        else:
-            print(f"[!] Order not found for ID {shopify_id}")
+        if invalid_id_error(errors):
+            # One malformed ID fails the whole nodes() call, so bisect the
+            # batch until the bad IDs are isolated and the rest go through
+            failed_attempts = 0
+            if len(batch) == 1:
+                print(f"[!] Malformed Shopify ID {batch[0]}: {errors[0].get('message')}")
+            else:
+                middle = len(batch) // 2
+                pending.appendleft(batch[middle:])
+                pending.appendleft(batch[:middle])
+            continue
+
+        if status != 200 or errors or "data" not in data:
+            failed_attempts += 1
+            if failed_attempts >= NODES_ATTEMPTS:
+                raise RuntimeError(f"Shopify nodes call for {len(batch)} orders failed {failed_attempts} times: "
+                                   f"{status} {errors}")
+            print(f"[!] Shopify nodes call failed ({status} {errors}), retrying the batch in {NODES_RETRY_DELAY:.1f}s")
+            time.sleep(NODES_RETRY_DELAY)
+            pending.appendleft(batch)
+            continue
+        failed_attempts = 0
+
+        for shopify_id, order_data in zip(batch, data["data"]["nodes"]):
+            if order_data:
+                results[shopify_id] = {
+                    "shopify_status": ", ".join(
+                        f.get("status", "") for f in order_data.get("fulfillments", [])
+                    ),
+                    "shopify_location": ", ".join(
+                        f.get("location", {}).get("name", "")
+                        for f in order_data.get("fulfillments", []) if f.get("location")
+                    ),
+                    "shopify_order_id": order_data.get("id")
+                }
+            else:
+                print(f"[!] Order not found for ID {shopify_id}")
+
+        if cost.get("requestedQueryCost"):
+            per_id_cost = max(float(cost["requestedQueryCost"]) / len(batch), 0.01)
+        if not pending:
+            batch_size = next_batch_size(cost, per_id_cost)
+
+    print(f"[✓] Fetched {len(results)} of {len(order_ids)} Shopify orders in {round_trips} round trips")
     return results
 
 
-def chunk_list(lst, size):
-    for i in range(0, len(lst), size):
-        yield lst[i:i + size]
+def enrich_with_shopify(df, shopify_data):
+    # Left join of the ERP rows to the Shopify answers on the numeric
+    # cShopifyOrderID; rows with no answer get the NOT FOUND placeholders
+    shopify_df = pd.DataFrame.from_dict(shopify_data, orient="index", columns=SHOPIFY_COLUMNS, dtype="string")
+    shopify_df = shopify_df.rename_axis("_shopify_key").reset_index()
+    shopify_df["_shopify_key"] = shopify_df["_shopify_key"].astype("string")
+
+    keys = shopify_ids(df["cShopifyOrderID"])
+    enriched = df.assign(_shopify_key=keys).merge(shopify_df, on="_shopify_key", how="left", indicator=True)
+    missing = enriched["_merge"] == "left_only"
+    for column, value in NOT_FOUND.items():
+        enriched.loc[missing, column] = value
+    enriched.index = df.index
+    return enriched.drop(columns=["_shopify_key", "_merge"])
 
 
 def main():
-    # === SSH & SCP SETUP ===
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(ERP_HOST, port=ERP_PORT, username=ERP_USER, password=ERP_PASS)
-    scp = SCPClient(ssh.get_transport())
+    # === ERP SESSION ===
+    session = get_session(ERP_HOST, ERP_PORT, ERP_USER, ERP_PASS, ERP_REMOTE_DIR)
 
     if RUN_FULL_PROCESS:
-        erp_cmd = f"cd {ERP_REMOTE_DIR} && /usr/dlc117/bin/mpro -b -pf connect.pf -p {ERP_PROGRAM_DIR}/{ERP_PROGRAM}"
-        print("[→] Running:", erp_cmd)
-        stdin, stdout, stderr = ssh.exec_command(erp_cmd)
-        for line in stdout:
-            print(line.strip())
-        for err in stderr:
-            print("[!] Error:", err.strip())
+        session.run_program(ERP_PROGRAM_DIR, ERP_PROGRAM)
     else:
         print("[~] Skipping ERP execution. Pulling latest CSV only.")
 
     try:
-        scp.get(REMOTE_CSV_PATH, LOCAL_CSV_PATH)
+        session.fetch(REMOTE_CSV_PATH, LOCAL_CSV_PATH)
         print(f"[✓] Downloaded ERP CSV to: {LOCAL_CSV_PATH}")
     except Exception as e:
         print("[X] Could not download ERP report:", str(e))
         return
 
-    scp.close()
-    ssh.close()
-
     # === LOAD CSV ===
-    erp_columns = [
-        "order-number", "bo-number", "warehouse", "cShopifyOrderNumber",
-        "cShopifyOrderID", "warehouse-status", "hold-code",
-        "lHasFulfillment", "lHasShipment", "iAge"
-    ]
-    df = pd.read_csv(LOCAL_CSV_PATH, names=erp_columns, header=None)
+    df = pd.read_csv(LOCAL_CSV_PATH, names=ERP_COLUMNS, header=None, dtype=ERP_DTYPES)
     print("[DEBUG] Columns in ERP CSV:", df.columns.tolist())
 
     if "cShopifyOrderID" not in df.columns:
@@ -126,30 +215,13 @@ def main():
         return
 
     id_col = "cShopifyOrderID"
-    order_ids = df[id_col].dropna().astype(str).unique().tolist()
+    order_ids = shopify_ids(df[id_col]).dropna().unique().tolist()
     print(f"[→] Found {len(order_ids)} unique Shopify IDs")
 
-    shopify_data = {}
-    for i, batch in enumerate(chunk_list(order_ids, 50)):
-        print(f"[→] Processing batch {i+1}: {len(batch)} orders")
-        shopify_data.update(query_shopify_batch(batch))
+    shopify_data = query_shopify_batch(order_ids)
 
     # === ENRICH ===
-    enriched = []
-    for _, row in df.iterrows():
-        sid = str(row.get("cShopifyOrderID", "")).strip()
-        match = shopify_data.get(sid)
-        if match:
-            row["shopify_status"] = match.get("shopify_status")
-            row["shopify_location"] = match.get("shopify_location")
-            row["shopify_order_id"] = match.get("shopify_order_id")
-        else:
-            row["shopify_status"] = "NOT FOUND"
-            row["shopify_location"] = ""
-            row["shopify_order_id"] = ""
-        enriched.append(row)
-
-    enriched_df = pd.DataFrame(enriched)
+    enriched_df = enrich_with_shopify(df, shopify_data)
     output_file = os.path.join(LOCAL_DIR, "erp_aging_report_enriched.csv")
     enriched_df.to_csv(output_file, index=False)
     print(f"[✓] Enriched CSV written to: {output_file}")
@@ -157,3 +229,4 @@ def main():
 
 if __name__ == "__main__":
     main()
+    get_client().print_metrics()
@@ -1,10 +1,14 @@
 import os
 import time
-import sqlite3
-import pandas as pd
 from datetime import datetime
-import paramiko
-from scp import SCPClient
+from _ERP_SESSION import get_session
+from _SQLITE_STORAGE import bump_snapshot
+from _DB_BUILDS import DatabaseBuild
+from _RECON_KEYS import AGING_KEYS, canonicalize, shopify_ids
+from _CSV_INGEST import ERP_AGING_REPORT, read_chunks, ingest_frames
+from _AGING_SNAPSHOTS import TS_FORMAT, snapshot_aging_table
+from _EXPLORER_QUERIES import ERP_AGING, create_indexes
+from _SUMMARY_TABLES import AGING_SUMMARY, rebuild_summary
 
 # === CONFIGURATION ===
 CSV_FILENAME = "erpAgingReport.csv"
@@ -22,97 +26,136 @@ ERP_REMOTE_CSV_PATH = f"/home/cutsey/andrewb/python/local/shopify/reports/{CSV_F
 
 # === EXECUTE REMOTE ERP SCRIPT ===
 def run_erp_job_and_fetch_csv():
-    print("[→] Connecting to ERP server via SSH...")
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(ERP_HOST, port=ERP_PORT, username=ERP_USER, password=ERP_PASS)
-    scp = SCPClient(ssh.get_transport())
+    session = get_session(ERP_HOST, ERP_PORT, ERP_USER, ERP_PASS, ERP_REMOTE_DIR)
 
     print("[→] Executing ERP .p script remotely...")
-    erp_cmd = f"cd {ERP_REMOTE_DIR} && /usr/dlc117/bin/mpro -b -pf connect.pf -p {ERP_PROGRAM_DIR}/{ERP_PROGRAM}"
-    stdin, stdout, stderr = ssh.exec_command(erp_cmd)
-
-    for line in stdout:
-        print("[ERP]", line.strip())
-    for err in stderr:
-        print("[!] ERP Error:", err.strip())
+    session.run_program(ERP_PROGRAM_DIR, ERP_PROGRAM)
 
     print(f"[→] Fetching CSV file: {ERP_REMOTE_CSV_PATH}")
-    scp.get(ERP_REMOTE_CSV_PATH, LOCAL_CSV_PATH)
-
-    scp.close()
-    ssh.close()
+    session.fetch(ERP_REMOTE_CSV_PATH, LOCAL_CSV_PATH)
     print(f"[✓] Downloaded ERP report to: {LOCAL_CSV_PATH}")
 
 # === LOAD CSV INTO SQLITE ===
+AGING_COLUMNS = [
+    "order-number", "bo-number", "warehouse", "cShopifyOrderNumber",
+    "cShopifyOrderID", "warehouse-status", "hold-code",
+    "lHasFulfillment", "lHasShipment", "iAge"
+]
+AGING_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    timestamp TEXT,
+    "order-number" TEXT PRIMARY KEY,
+    "bo-number" TEXT,
+    "warehouse" TEXT,
+    "cShopifyOrderNumber" TEXT,
+    "cShopifyOrderID" TEXT,
+    "warehouse-status" TEXT,
+    "hold-code" TEXT,
+    "lHasFulfillment" TEXT,
+    "lHasShipment" TEXT,
+    "iAge" INTEGER
+)
+"""
+
+
+def ensure_aging_table(conn):
+    # Older databases created erp_aging_data without a key; rebuild those once
+    # with "order-number" as the primary key, keeping the latest row per order
+    conn.execute(AGING_TABLE_SQL.format(table="erp_aging_data"))
+    columns = {row[1]: row[5] for row in conn.execute("PRAGMA table_info(erp_aging_data)")}
+    if columns.get("order-number"):
+        # Sort key and sidebar filters of the ERP aging explorer
+        create_indexes(conn, ERP_AGING)
+        return
+    print("[→] Adding primary key on order-number to erp_aging_data...")
+    all_columns = ", ".join(f'"{c}"' for c in ["timestamp"] + AGING_COLUMNS)
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS erp_aging_data_keyed")
+        conn.execute(AGING_TABLE_SQL.format(table="erp_aging_data_keyed"))
+        conn.execute(f"""
+            INSERT INTO erp_aging_data_keyed ({all_columns})
+            SELECT {all_columns} FROM erp_aging_data
+            WHERE rowid IN (SELECT MAX(rowid) FROM erp_aging_data GROUP BY "order-number")
+        """)
+        conn.execute("DROP TABLE erp_aging_data")
+        conn.execute("ALTER TABLE erp_aging_data_keyed RENAME TO erp_aging_data")
+    create_indexes(conn, ERP_AGING)
+
+
+def stage_aging(conn, chunks, timestamp):
+    # Streams report chunks into the connection's temp staging table. Returns
+    # the ingest stats of _CSV_INGEST.ingest_frames.
+    ensure_aging_table(conn)
+    # Same column types as erp_aging_data, so staged rows compare like stored ones
+    typed = ", ".join(f'"{name}" {sql_type}' for _, name, sql_type, *_ in conn.execute("PRAGMA table_info(erp_aging_data)"))
+    with conn:
+        conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS erp_aging_stage ({typed})")
+        conn.execute("DELETE FROM erp_aging_stage")
+    staged = (chunk[AGING_COLUMNS].assign(timestamp=timestamp) for chunk in chunks)
+    return ingest_frames(conn, "erp_aging_stage", staged, ERP_AGING_REPORT, replace=False)
+
+
+def apply_aging_stage(conn):
+    # Applies the staged report with one upsert and one anti-join delete, and
+    # rebuilds summary_erp_aging from the result in the same transaction, so the
+    # KPI header always matches erp_aging_data whoever wrote it last.
+    # Returns (upserted, deleted).
+    all_columns = ["timestamp"] + AGING_COLUMNS
+    quoted = ", ".join(f'"{c}"' for c in all_columns)
+    updates = ", ".join(f'"{c}" = excluded."{c}"' for c in all_columns if c != "order-number")
+    with conn:
+        conn.execute('CREATE INDEX IF NOT EXISTS temp.idx_erp_aging_stage_order ON erp_aging_stage ("order-number")')
+        # A repeated order-number in the report keeps its last row, as the old
+        # delete-then-insert loop did
+        upserted = conn.execute(f"""
+            INSERT INTO erp_aging_data ({quoted})
+            SELECT {quoted} FROM erp_aging_stage
+            WHERE rowid IN (SELECT MAX(rowid) FROM erp_aging_stage GROUP BY "order-number")
+            ON CONFLICT("order-number") DO UPDATE SET {updates}
+        """).rowcount
+        deleted = conn.execute("""
+            DELETE FROM erp_aging_data
+            WHERE NOT EXISTS (
+                SELECT 1 FROM erp_aging_stage s WHERE s."order-number" = erp_aging_data."order-number"
+            )
+        """).rowcount
+        rebuild_summary(conn, AGING_SUMMARY)
+        conn.execute("DELETE FROM erp_aging_stage")
+    return upserted, deleted
+
+
+def bulk_upsert_aging(conn, df_new, timestamp):
+    # A whole report already in memory, staged as one chunk. Returns (upserted, deleted).
+    stage_aging(conn, [df_new], timestamp)
+    return apply_aging_stage(conn)
+
+
+def aging_chunks(path):
+    for chunk in read_chunks(path, ERP_AGING_REPORT):
+        chunk = canonicalize(chunk, AGING_KEYS)
+        chunk["cShopifyOrderID"] = shopify_ids(chunk["cShopifyOrderID"])
+        yield chunk
+
+
 def load_csv_to_sqlite():
     if not os.path.exists(LOCAL_CSV_PATH):
         print("[X] Local ERP CSV not found.")
         return
 
-    print("[→] Loading CSV into memory...")
-    df_new = pd.read_csv(LOCAL_CSV_PATH, header=None, names=[
-        "order-number", "bo-number", "warehouse", "cShopifyOrderNumber",
-        "cShopifyOrderID", "warehouse-status", "hold-code",
-        "lHasFulfillment", "lHasShipment", "iAge"
-    ])
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    df_new["timestamp"] = timestamp
-
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    # Ensure table exists
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS erp_aging_data (
-        timestamp TEXT,
-        "order-number" TEXT,
-        "bo-number" TEXT,
-        "warehouse" TEXT,
-        "cShopifyOrderNumber" TEXT,
-        "cShopifyOrderID" TEXT,
-        "warehouse-status" TEXT,
-        "hold-code" TEXT,
-        "lHasFulfillment" TEXT,
-        "lHasShipment" TEXT,
-        "iAge" INTEGER
-    )
-    """)
-
-    # Fetch all existing order-numbers in DB
-    existing_df = pd.read_sql_query("SELECT * FROM erp_aging_data", conn)
-    existing_orders = set(existing_df["order-number"].tolist())
-    new_orders = set(df_new["order-number"].tolist())
-
-    # 1. DELETE records no longer present in ERP report
-    orders_to_delete = existing_orders - new_orders
-    if orders_to_delete:
-        cursor.executemany(
-            "DELETE FROM erp_aging_data WHERE `order-number` = ?",
-            [(order,) for order in orders_to_delete]
-        )
-        print(f"[−] Deleted {len(orders_to_delete)} obsolete orders from DB")
-
-    # 2. UPSERT: insert new or update changed rows
-    for _, row in df_new.iterrows():
-        # Always delete + insert for simplicity
-        cursor.execute("DELETE FROM erp_aging_data WHERE `order-number` = ?", (row["order-number"],))
-        cursor.execute("""
-            INSERT INTO erp_aging_data (
-                timestamp, "order-number", "bo-number", "warehouse",
-                "cShopifyOrderNumber", "cShopifyOrderID", "warehouse-status",
-                "hold-code", "lHasFulfillment", "lHasShipment", "iAge"
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            row["timestamp"], row["order-number"], row["bo-number"], row["warehouse"],
-            row["cShopifyOrderNumber"], row["cShopifyOrderID"], row["warehouse-status"],
-            row["hold-code"], row["lHasFulfillment"], row["lHasShipment"], row["iAge"]
-        ))
-
-    conn.commit()
-    conn.close()
-    print(f"[✓] ERP data synced. Inserted/updated {len(df_new)} records.")
+    print("[→] Streaming CSV into the staging table...")
+    timestamp = datetime.now().strftime(TS_FORMAT)
+    # Loaded into a new build of mad_recon.db; the dashboards switch to it
+    # once it is complete and checked (see _DB_BUILDS)
+    with DatabaseBuild(DB_PATH, "erp_aging_report", required_tables=["erp_aging_data"]) as conn:
+        stage_aging(conn, aging_chunks(LOCAL_CSV_PATH), timestamp)
+        upserted, deleted = apply_aging_stage(conn)
+        if deleted:
+            print(f"[−] Deleted {deleted} obsolete orders from DB")
+        print(f"[✓] ERP data synced. Inserted/updated {upserted} records.")
+
+        # erp_aging_data now holds exactly this pull; keep it in the history
+        snapshot_aging_table(conn, datetime.strptime(timestamp, TS_FORMAT))
+        bump_snapshot(conn, "erp_aging_report")
 
 # === MAIN ===
 if __name__ == "__main__":
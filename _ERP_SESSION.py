@@ -0,0 +1,312 @@
+import os
+import gzip
+import json
+import zlib
+import atexit
+import hashlib
+import threading
+import paramiko
+from concurrent.futures import ThreadPoolExecutor
+
+# === CONFIGURATION ===
+ERP_MPRO = "/usr/dlc117/bin/mpro"
+ERP_REMOTE_DIR = "/u/live/code/"
+ERP_PF = "connect.pf"
+MAX_PARALLEL_PROGRAMS = 4
+TRANSFER_CHUNK = 256 * 1024
+TRANSFER_RETRIES = 3
+
+
+# === ERP SESSION ===
+# One authenticated SSH transport per ERP host/user. Every mpro run gets its
+# own exec channel on that transport (so several can run at once), and file
+# transfers share a single SFTP channel.
+class ErpSession:
+    def __init__(self, host, port, username, password, remote_dir=ERP_REMOTE_DIR):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.remote_dir = remote_dir
+        self.ssh = None
+        self.sftp = None
+        self.lock = threading.Lock()
+        self.sftp_lock = threading.Lock()
+        self.transfer_stats = {"files": 0, "skipped": 0, "source_bytes": 0, "transferred_bytes": 0}
+
+    def connect(self):
+        with self.lock:
+            transport = self.ssh.get_transport() if self.ssh else None
+            if transport is not None and transport.is_active():
+                return transport
+            print(f"[→] Connecting to ERP server via SSH ({self.username}@{self.host})...")
+            self.ssh = paramiko.SSHClient()
+            self.ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            self.ssh.connect(self.host, port=self.port, username=self.username, password=self.password)
+            transport = self.ssh.get_transport()
+            transport.set_keepalive(30)
+            self.sftp = None
+            return transport
+
+    def _sftp(self):
+        transport = self.connect()
+        if self.sftp is None or self.sftp.get_channel().closed:
+            self.sftp = paramiko.SFTPClient.from_transport(transport)
+        return self.sftp
+
+    # === REMOTE EXECUTION ===
+    def exec(self, command, echo=True, prefix="[ERP]"):
+        channel = self.connect().open_session()
+        channel.exec_command(command)
+        stdout_lines = []
+        stderr_lines = []
+        with channel.makefile("r") as stdout:
+            for line in stdout:
+                stdout_lines.append(line.rstrip("\n"))
+                if echo:
+                    print(prefix, line.strip())
+        with channel.makefile_stderr("r") as stderr:
+            for err in stderr:
+                stderr_lines.append(err.rstrip("\n"))
+                if echo:
+                    print(f"[!] {prefix.strip('[]')} Error:", err.strip())
+        exit_status = channel.recv_exit_status()
+        channel.close()
+        return exit_status, stdout_lines, stderr_lines
+
+    def program_command(self, program_dir, program, param=None):
+        command = f"cd {self.remote_dir} && {ERP_MPRO} -b -pf {ERP_PF} -p {program_dir}/{program}"
+        if param:
+            command += f' -param "{param}"'
+        return command
+
+    def run_program(self, program_dir, program, param=None, echo=True, prefix="[ERP]"):
+        command = self.program_command(program_dir, program, param)
+        print("[→] Running:", command)
+        return self.exec(command, echo=echo, prefix=prefix)
+
+    def run_programs(self, jobs, max_parallel=MAX_PARALLEL_PROGRAMS):
+        # jobs: list of (program_dir, program, param); each runs on its own
+        # channel over the shared transport, results come back in job order
+        self.connect()
+        with ThreadPoolExecutor(max_workers=max(1, max_parallel)) as executor:
+            futures = [
+                executor.submit(self.run_program, program_dir, program, param, True, f"[ERP {i + 1}]")
+                for i, (program_dir, program, param) in enumerate(jobs)
+            ]
+            return [future.result() for future in futures]
+
+    # === FILE TRANSFER ===
+    def put(self, local_path, remote_path):
+        with self.sftp_lock:
+            self._sftp().put(local_path, remote_path)
+
+    def get(self, remote_path, local_path):
+        with self.sftp_lock:
+            self._sftp().get(remote_path, local_path)
+
+    def stat(self, remote_path):
+        with self.sftp_lock:
+            return self._sftp().stat(remote_path)
+
+    def remove(self, *remote_paths):
+        removed = []
+        with self.sftp_lock:
+            sftp = self._sftp()
+            for remote_path in remote_paths:
+                try:
+                    sftp.remove(remote_path)
+                    removed.append(remote_path)
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    # === CHANGE-DETECTING COMPRESSED FETCH ===
+    # Skips the download when the remote file's size, mtime and md5 match the
+    # manifest kept next to the local copy. Otherwise the file is gzipped on
+    # the ERP box (gzip -n, so the archive is identical across runs of the same
+    # source) and streamed into a .gz.part file that survives dropped
+    # connections and interrupted runs. The result is md5-verified and swapped
+    # in with an atomic rename.
+    def remote_md5(self, remote_path):
+        status, out, err = self.exec(f"md5sum {remote_path}", echo=False)
+        return out[0].split()[0] if status == 0 and out else None
+
+    def fetch(self, remote_path, local_path):
+        attrs = self.stat(remote_path)
+        manifest_path = f"{local_path}.transfer.json"
+        manifest = _read_json(manifest_path)
+
+        if (os.path.exists(local_path) and manifest.get("size") == attrs.st_size
+                and manifest.get("mtime") == attrs.st_mtime):
+            if self.remote_md5(remote_path) == manifest.get("md5"):
+                self._record_transfer(attrs.st_size, 0, skipped=True)
+                print(f"[=] Unchanged on ERP, skipped download: {remote_path} ({attrs.st_size:,} bytes saved)")
+                return False
+
+        remote_gz = f"{remote_path}.xfer.gz"
+        status, out, err = self.exec(f"md5sum {remote_path} && gzip -n -1 -c {remote_path} > {remote_gz}", echo=False)
+        if status != 0 or not out:
+            print(f"[!] Remote gzip unavailable ({' '.join(err).strip()}), fetching uncompressed")
+            self._fetch_plain(remote_path, local_path)
+            self._record_transfer(attrs.st_size, attrs.st_size)
+            _write_json(manifest_path, {"size": attrs.st_size, "mtime": attrs.st_mtime, "md5": _file_md5(local_path)})
+            return True
+
+        source_md5 = out[0].split()[0]
+        gz_size = self.stat(remote_gz).st_size
+        part_path = f"{local_path}.gz.part"
+        part_meta_path = f"{part_path}.json"
+        if _read_json(part_meta_path).get("source_md5") != source_md5 or \
+                (os.path.exists(part_path) and os.path.getsize(part_path) > gz_size):
+            _remove_quietly(part_path)
+        _write_json(part_meta_path, {"source_md5": source_md5, "gz_size": gz_size})
+
+        resumed = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if resumed:
+            print(f"[↩] Resuming {remote_path} at {resumed:,} of {gz_size:,} compressed bytes")
+        self._stream_to_part(remote_gz, part_path, gz_size)
+
+        tmp_path = f"{local_path}.tmp"
+        actual_md5 = _gunzip_md5(part_path, tmp_path)
+        if actual_md5 != source_md5 and resumed:
+            # The partial file did not belong to this archive; start over once
+            print(f"[!] Resumed transfer of {remote_path} failed verification, downloading it again")
+            _remove_quietly(part_path)
+            resumed = 0
+            self._stream_to_part(remote_gz, part_path, gz_size)
+            actual_md5 = _gunzip_md5(part_path, tmp_path)
+        if actual_md5 != source_md5:
+            _remove_quietly(tmp_path)
+            _remove_quietly(part_path)
+            _remove_quietly(part_meta_path)
+            raise IOError(f"Checksum mismatch for {remote_path}: expected {source_md5}, got {actual_md5}")
+
+        os.replace(tmp_path, local_path)
+        _remove_quietly(part_path)
+        _remove_quietly(part_meta_path)
+        self.remove(remote_gz)
+        _write_json(manifest_path, {"size": attrs.st_size, "mtime": attrs.st_mtime, "md5": source_md5})
+
+        self._record_transfer(attrs.st_size, gz_size - resumed)
+        print(f"[✓] Fetched {remote_path}: {gz_size - resumed:,} bytes over the wire for "
+              f"{attrs.st_size:,} bytes of CSV ({attrs.st_size - (gz_size - resumed):,} saved)")
+        return True
+
+    def _stream_to_part(self, remote_gz, part_path, gz_size):
+        for attempt in range(TRANSFER_RETRIES + 1):
+            try:
+                with self.sftp_lock:
+                    with self._sftp().open(remote_gz, "rb") as f_in, open(part_path, "ab") as f_out:
+                        offset = os.path.getsize(part_path)
+                        f_in.seek(offset)
+                        f_in.prefetch(gz_size - offset)
+                        while offset < gz_size:
+                            chunk = f_in.read(min(TRANSFER_CHUNK, gz_size - offset))
+                            if not chunk:
+                                raise EOFError(f"Remote file ended at {offset} of {gz_size} bytes")
+                            f_out.write(chunk)
+                            offset += len(chunk)
+                return
+            except (OSError, EOFError, paramiko.SSHException) as e:
+                if attempt == TRANSFER_RETRIES:
+                    raise
+                print(f"[!] Transfer interrupted ({e}), reconnecting to resume...")
+                self.close()
+
+    def _fetch_plain(self, remote_path, local_path):
+        tmp_path = f"{local_path}.tmp"
+        self.get(remote_path, tmp_path)
+        os.replace(tmp_path, local_path)
+
+    def _record_transfer(self, source_bytes, transferred_bytes, skipped=False):
+        with self.lock:
+            self.transfer_stats["files"] += 1
+            self.transfer_stats["skipped"] += int(skipped)
+            self.transfer_stats["source_bytes"] += source_bytes
+            self.transfer_stats["transferred_bytes"] += transferred_bytes
+
+    def print_transfer_stats(self):
+        t = self.transfer_stats
+        if not t["files"]:
+            return
+        print(f"[✓] ERP transfers ({self.host}): {t['files']} files, {t['skipped']} unchanged, "
+              f"{t['transferred_bytes']:,} of {t['source_bytes']:,} bytes sent "
+              f"({t['source_bytes'] - t['transferred_bytes']:,} saved)")
+
+    def close(self):
+        with self.lock:
+            if self.sftp is not None:
+                self.sftp.close()
+                self.sftp = None
+            if self.ssh is not None:
+                self.ssh.close()
+                self.ssh = None
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(host, port, username, password, remote_dir=ERP_REMOTE_DIR):
+    # Scripts running in the same process share one session per host/user
+    key = (host, port, username)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = ErpSession(host, port, username, password, remote_dir)
+            _sessions[key] = session
+        return session
+
+
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.print_transfer_stats()
+            session.close()
+        _sessions.clear()
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _gunzip_md5(gz_path, out_path):
+    # Decompresses gz_path into out_path and returns the md5 of the output, or
+    # None when the archive is corrupt or truncated
+    digest = hashlib.md5()
+    try:
+        with gzip.open(gz_path, "rb") as gz_in, open(out_path, "wb") as f_out:
+            for chunk in iter(lambda: gz_in.read(TRANSFER_CHUNK), b""):
+                digest.update(chunk)
+                f_out.write(chunk)
+    except (OSError, EOFError, zlib.error):
+        return None
+    return digest.hexdigest()
+
+
+def _file_md5(path):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(TRANSFER_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+atexit.register(close_sessions)
@@ -1,7 +1,10 @@
-import sqlite3
+import os
 import pandas as pd
-import paramiko
-from scp import SCPClient
+from _ERP_SESSION import get_session
+from _ERP_LINE_CACHE import ErpLineCache, line_keys
+from _SQLITE_STORAGE import connect
+from _CSV_INGEST import ERP_ORDER_LINES, conform, read_chunks, ingest_frames
+from _RECON_KEYS import ERP_LINES_TEXT_KEYS, canonicalize
 
 # === CONFIGURATION ===
 SHOPIFY_DB_PATH = r"C:\Users\andrew.beattie\AppData\Local\Programs\Python\Python313\Lib\Projects_2\open_shopify.db"
@@ -14,69 +17,167 @@ ERP_PASS = "cuts1978"
 ERP_PROGRAM = "processShopifyLines.p"
 ERP_PROGRAM_DIR = "adb"
 ERP_REMOTE_DIR = "/u/live/code/"
-ERP_REMOTE_CSV_PATH = f"/home/cutsey/andrewb/python/local/shopify/reports/{LOCAL_SHOPIFY_CSV}"
-ERP_OUTPUT_CSV_PATH = f"/home/cutsey/andrewb/python/local/shopify/reports/erp_order_lines.csv"
+ERP_REPORTS_DIR = "/home/cutsey/andrewb/python/local/shopify/reports"
+ERP_REMOTE_CSV_PATH = f"{ERP_REPORTS_DIR}/{LOCAL_SHOPIFY_CSV}"
+ERP_OUTPUT_CSV_PATH = f"{ERP_REPORTS_DIR}/erp_order_lines.csv"
 LOCAL_OUTPUT_CSV = "erp_order_lines.csv"
+
+# Sharded mode: the export is split into ERP_SHARDS contiguous order_name
+# ranges, each uploaded under its own name and run as a separate mpro session
+# with -param "<input csv>|<output csv>". At most ERP_MAX_PARALLEL sessions run
+# at once so the ERP box is not swamped. Opt-in: only raise ERP_SHARDS once
+# processShopifyLines.p reads -param; a program that ignores it writes every
+# shard to the same output file. ERP_SHARDS = 1 keeps the single run.
+ERP_SHARDS = 1
+ERP_MAX_PARALLEL = 4
 LOCAL_DB_PATH = r"C:\Users\andrew.beattie\AppData\Local\Programs\Python\Python313\Lib\Projects_2\open_shopify.db"
 
 # === Export Shopify order lines to CSV ===
-def export_shopify_lines_to_csv():
-    conn = sqlite3.connect(SHOPIFY_DB_PATH)
+def current_shopify_lines():
+    # Read on a connection of its own, closed again before anything is written
+    conn = connect(SHOPIFY_DB_PATH, read_only=True)
     query = "SELECT DISTINCT order_name, sku FROM unfulfilled_lines"
     df = pd.read_sql_query(query, conn)
-    df.to_csv(LOCAL_SHOPIFY_CSV, index=False)
     conn.close()
-    print(f"[✓] Exported Shopify lines to CSV: {LOCAL_SHOPIFY_CSV}")
+    return df
+
+
+def export_shopify_lines_to_csv():
+    # Only pairs without a fresh terminal answer in the ERP line cache go out
+    df = current_shopify_lines()
+    conn = connect(LOCAL_DB_PATH)
+    cache = ErpLineCache(conn)
+    due = set(cache.keys_to_refresh(line_keys(df, "order_name", "sku")))
+    conn.close()
+    df = df[[key in due for key in line_keys(df, "order_name", "sku")]]
+    df.to_csv(LOCAL_SHOPIFY_CSV, index=False)
+    print(f"[✓] Exported {len(df)} Shopify lines needing an ERP lookup to CSV: {LOCAL_SHOPIFY_CSV}")
+    cache.print_stats()
 
 # === Push CSV to ERP and run program ===
 def push_csv_and_run_erp():
-    print("[→] Connecting to ERP server via SSH...")
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(ERP_HOST, port=ERP_PORT, username=ERP_USER, password=ERP_PASS)
-    scp = SCPClient(ssh.get_transport())
+    if pd.read_csv(LOCAL_SHOPIFY_CSV).empty:
+        print("[=] Every line was answered from the ERP line cache, skipping the ERP run")
+    elif ERP_SHARDS > 1:
+        push_shards_and_run_erp(ERP_SHARDS, ERP_MAX_PARALLEL)
+    else:
+        push_single_and_run_erp()
+
+
+def push_single_and_run_erp():
+    session = get_session(ERP_HOST, ERP_PORT, ERP_USER, ERP_PASS, ERP_REMOTE_DIR)
 
     # Upload CSV
     print(f"[→] Uploading CSV to ERP: {ERP_REMOTE_CSV_PATH}")
-    scp.put(LOCAL_SHOPIFY_CSV, ERP_REMOTE_CSV_PATH)
+    session.put(LOCAL_SHOPIFY_CSV, ERP_REMOTE_CSV_PATH)
 
     # Run ERP .p program
-    erp_cmd = f"cd {ERP_REMOTE_DIR} && /usr/dlc117/bin/mpro -b -pf connect.pf -p {ERP_PROGRAM_DIR}/{ERP_PROGRAM}"
     print("[→] Executing ERP .p script remotely...")
-    stdin, stdout, stderr = ssh.exec_command(erp_cmd)
-
-    for line in stdout:
-        print("[ERP]", line.strip())
-    for err in stderr:
-        print("[!] ERP Error:", err.strip())
+    session.run_program(ERP_PROGRAM_DIR, ERP_PROGRAM)
 
     # Download ERP output CSV
     print(f"[→] Fetching ERP output CSV: {ERP_OUTPUT_CSV_PATH}")
-    scp.get(ERP_OUTPUT_CSV_PATH, LOCAL_OUTPUT_CSV)
+    session.fetch(ERP_OUTPUT_CSV_PATH, LOCAL_OUTPUT_CSV)
 
     # Delete remote CSVs
-    ssh.exec_command(f"rm -f {ERP_REMOTE_CSV_PATH} {ERP_OUTPUT_CSV_PATH}")
+    session.remove(ERP_REMOTE_CSV_PATH, ERP_OUTPUT_CSV_PATH)
     print(f"[🗑️] Deleted remote CSVs: {ERP_REMOTE_CSV_PATH}, {ERP_OUTPUT_CSV_PATH}")
 
-    scp.close()
-    ssh.close()
     print(f"[✓] ERP output CSV downloaded: {LOCAL_OUTPUT_CSV}")
 
-# === Load ERP CSV into local DB ===
-def load_erp_csv_to_db():
-    df = pd.read_csv(LOCAL_OUTPUT_CSV)
-
-    conn = sqlite3.connect(LOCAL_DB_PATH)
-    cursor = conn.cursor()
+# === Sharded ERP run ===
+def split_key_ranges(df, shards):
+    # Contiguous order_name ranges of roughly equal row counts; an order never
+    # straddles two shards
+    df = df.sort_values(["order_name", "sku"], kind="stable").reset_index(drop=True)
+    if df.empty:
+        return []
+    target = -(-len(df) // shards)
+    order_starts = df.index[df["order_name"].ne(df["order_name"].shift())].tolist() + [len(df)]
+    parts = []
+    start = 0
+    for boundary in order_starts[1:]:
+        if boundary - start >= target or boundary == len(df):
+            parts.append(df.iloc[start:boundary])
+            start = boundary
+    return parts
+
+
+def shard_paths(index):
+    return {
+        "local_input": f"shopify_unfulfilled_lines_{index}.csv",
+        "remote_input": f"{ERP_REPORTS_DIR}/shopify_unfulfilled_lines_{index}.csv",
+        "remote_output": f"{ERP_REPORTS_DIR}/erp_order_lines_{index}.csv",
+        "local_output": f"erp_order_lines_{index}.csv",
+    }
+
+
+def push_shards_and_run_erp(shards, max_parallel):
+    session = get_session(ERP_HOST, ERP_PORT, ERP_USER, ERP_PASS, ERP_REMOTE_DIR)
+    parts = split_key_ranges(pd.read_csv(LOCAL_SHOPIFY_CSV, dtype=str), shards)
+    if len(parts) < 2:
+        push_single_and_run_erp()
+        return
+    paths = [shard_paths(i + 1) for i in range(len(parts))]
+
+    print(f"[→] Uploading {len(parts)} shards to ERP ({', '.join(str(len(p)) for p in parts)} lines)")
+    for part, shard in zip(parts, paths):
+        part.to_csv(shard["local_input"], index=False)
+        session.put(shard["local_input"], shard["remote_input"])
+
+    print(f"[→] Executing {len(parts)} ERP sessions, at most {max_parallel} at a time...")
+    jobs = [(ERP_PROGRAM_DIR, ERP_PROGRAM, f"{shard['remote_input']}|{shard['remote_output']}") for shard in paths]
+    results = session.run_programs(jobs, max_parallel=max_parallel)
+    failed = [i + 1 for i, (status, out, err) in enumerate(results) if status != 0]
+    if failed:
+        session.remove(*[p for shard in paths for p in (shard["remote_input"], shard["remote_output"])])
+        raise RuntimeError(f"ERP shards failed: {failed}")
+
+    frames = []
+    for shard in paths:
+        session.fetch(shard["remote_output"], shard["local_output"])
+        frames.append(pd.read_csv(shard["local_output"], dtype=str, keep_default_na=False))
+    pd.concat(frames, ignore_index=True).to_csv(LOCAL_OUTPUT_CSV, index=False)
+
+    session.remove(*[p for shard in paths for p in (shard["remote_input"], shard["remote_output"])])
+    for shard in paths:
+        for local_path in (shard["local_input"], shard["local_output"], f"{shard['local_output']}.transfer.json"):
+            if os.path.exists(local_path):
+                os.remove(local_path)
+    print(f"[🗑️] Deleted {len(paths)} remote and local shard CSVs")
+    print(f"[✓] ERP output CSV merged from {len(paths)} shards: {LOCAL_OUTPUT_CSV}")
 
-    # Delete all rows (keeps table structure)
-    cursor.execute("DELETE FROM erp_order_lines")
-    conn.commit()
+# === Load ERP CSV into local DB ===
+def erp_line_chunks(cache, requested, all_keys, counts):
+    # Fresh ERP answers streamed from the output CSV, then cached answers for
+    # every other pair of all_keys (the current Shopify lines)
+    if requested:
+        for chunk in read_chunks(LOCAL_OUTPUT_CSV, ERP_ORDER_LINES):
+            cache.add_answers(chunk)
+            counts["fresh"] += len(chunk)
+            yield chunk
+    cache.finish_store(requested)
+
+    for chunk in cache.rows_for(set(all_keys) - set(requested)):
+        counts["cached"] += len(chunk)
+        yield conform(chunk, ERP_ORDER_LINES)
+    cache.prune(all_keys)
 
-    # Insert new data
-    df.to_sql("erp_order_lines", conn, if_exists='append', index=False)
 
-    conn.commit()
+def load_erp_csv_to_db():
+    # The lines go into a staging table that replaces erp_order_lines in one
+    # transaction once every chunk is in, so readers never see it empty
+    all_keys = line_keys(current_shopify_lines(), "order_name", "sku")
+    conn = connect(LOCAL_DB_PATH)
+    cache = ErpLineCache(conn)
+    requested = line_keys(pd.read_csv(LOCAL_SHOPIFY_CSV, dtype=str), "order_name", "sku")
+
+    lines = {"fresh": 0, "cached": 0}
+    chunks = (canonicalize(chunk, ERP_LINES_TEXT_KEYS)
+              for chunk in erp_line_chunks(cache, requested, all_keys, lines))
+    ingest_frames(conn, "erp_order_lines", chunks, ERP_ORDER_LINES)
+    print(f"[✓] {lines['fresh']} fresh ERP lines + {lines['cached']} from the ERP line cache")
+    cache.print_stats()
     conn.close()
     print(f"[✓] ERP data loaded into table: erp_order_lines in {LOCAL_DB_PATH}")
 
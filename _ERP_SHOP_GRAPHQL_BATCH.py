@@ -1,178 +1,123 @@
 import os
-import json
-import time
-import sqlite3
 import pandas as pd
-import requests
 from datetime import datetime
+from _SHOPIFY_CLIENT import get_client
+from _SHOPIFY_GRAPHQL_ENGINE import enrich_orders
+from _SHOPIFY_ORDER_CACHE import ShopifyOrderCache, copy_orders_into
+from _SQLITE_STORAGE import bump_snapshot, connect, forget_migrations, migrate
+from _DB_BUILDS import DatabaseBuild, current_db
+from _PARSE_SHOP_RESPONSE import PARSED_ORDERS_MIGRATIONS, reparse_orders
 
 # === CONFIGURATION ===
 DB_PATH = "mad_recon.db"
+# The Shopify response cache lives in its own database outside the mad_recon.db
+# builds and is committed batch by batch, so a crawl that dies part way keeps
+# what it fetched; the next run only asks Shopify for the rest
+CACHE_DB_PATH = "shopify_order_cache.db"
 SHOPIFY_ENDPOINT = "https://alo-yoga.myshopify.com/admin/api/2023-10/graphql.json"
 SHOPIFY_HEADERS = {
     "Content-Type": "application/json",
     "X-Shopify-Access-Token": "7904b3cc654fa017c25b62f8c16bc6fc"
 }
 BATCH_SIZE = 50  # Shopify GraphQL safe batch size
-DEBUG_RESET = True  # Toggle to reset Shopify tables
+CONCURRENCY = 4  # Batches kept in flight; paced by Shopify's cost bucket
+DEBUG_RESET = False  # Toggle to drop the Shopify cache and parsed tables
 
 # === SETUP ===
 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-conn = sqlite3.connect(DB_PATH)
-cursor = conn.cursor()
+cache_conn = connect(CACHE_DB_PATH)
 
 # === RESET TABLES FOR CLEAN TEST RUN ===
 if DEBUG_RESET:
-    cursor.execute("DROP TABLE IF EXISTS shopify_orders")
-    cursor.execute("DROP TABLE IF EXISTS shopify_parsed_orders")
-    conn.commit()
-    print("[✓] Dropped Shopify tables for clean test run.")
+    cache_conn.execute("DROP TABLE IF EXISTS shopify_orders")
+    cache_conn.commit()
+    print("[✓] Dropped the Shopify cache for clean test run.")
 
 # === ENSURE TABLES EXIST ===
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS shopify_orders (
-    id TEXT PRIMARY KEY,
-    timestamp TEXT,
-    raw_json TEXT
-)
-""")
-
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS shopify_parsed_orders (
-    shopify_order_id TEXT,
-    order_name TEXT,
-    financial_status TEXT,
-    fulfillment_status TEXT,
-    fulfillment_location TEXT,
-    timestamp TEXT
-)
-''')
+cache = ShopifyOrderCache(cache_conn)
+if not DEBUG_RESET and os.path.exists(current_db(DB_PATH)):
+    cache.seed_from(current_db(DB_PATH))
 
 # === FETCH UNIQUE SHOPIFY ORDER IDS FROM LATEST ERP TIMESTAMP ===
+# Read from the published build; nothing is written to mad_recon.db until the
+# enrichment build below
+live = connect(current_db(DB_PATH), read_only=True)
 latest_ts_query = "SELECT MAX(timestamp) FROM erp_aging_data"
-latest_ts = cursor.execute(latest_ts_query).fetchone()[0]
+latest_ts = live.execute(latest_ts_query).fetchone()[0]
 
 if not latest_ts:
     print("[!] No ERP data found in database.")
-    conn.close()
+    live.close()
+    cache_conn.close()
     exit()
 
 print(f"[✓] Latest ERP timestamp: {latest_ts}")
 
 erp_query = """
-SELECT DISTINCT cShopifyOrderID
+SELECT cShopifyOrderID, MAX(CAST(iAge AS INTEGER))
 FROM erp_aging_data
 WHERE timestamp = ?
 AND cShopifyOrderID IS NOT NULL
+GROUP BY cShopifyOrderID
 """
-order_ids = [row[0] for row in cursor.execute(erp_query, (latest_ts,)).fetchall()]
+order_ages = {str(row[0]): row[1] for row in live.execute(erp_query, (latest_ts,)).fetchall()}
+live.close()
+order_ids = list(order_ages)
 print(f"[✓] Total unique Shopify Order IDs to query: {len(order_ids)}")
 
-# Skip IDs already processed
-cursor.execute("SELECT id FROM shopify_orders")
-processed_ids = set(row[0] for row in cursor.fetchall())
-unprocessed_ids = [oid for oid in order_ids if f"gid://shopify/Order/{oid}" not in processed_ids]
+# Serve fresh orders from the cache; only new or stale ones go to Shopify
+unprocessed_ids = cache.ids_to_refresh(order_ids, order_ages)
 
 print(f"[✓] Unprocessed IDs to enrich from Shopify: {len(unprocessed_ids)}")
 
-def chunk_list(lst, size):
-    for i in range(0, len(lst), size):
-        yield lst[i:i + size]
-
 # === FETCH FROM SHOPIFY ===
-for batch in chunk_list(unprocessed_ids, BATCH_SIZE):
-    query_parts = []
-    for i, oid in enumerate(batch):
-        alias = f"order_{i}"
-        gid = f"gid://shopify/Order/{oid}"
-        query_parts.append(f'''
-        {alias}: order(id: "{gid}") {{
-            id
-            name
-            displayFinancialStatus
-            fulfillments {{
-                status
-                location {{
-                    name
-                }}
-            }}
-        }}
-        ''')
-
-    query = f'''
-    query {{
-        {"".join(query_parts)}
-    }}
-    '''
-
-    try:
-        response = requests.post(
-            SHOPIFY_ENDPOINT,
-            headers=SHOPIFY_HEADERS,
-            json={"query": query},
-            timeout=20
-        )
-        print(f"[→] Shopify GraphQL batch call (IDs: {batch}) HTTP {response.status_code}")
-        data = response.json()
-
-        for alias, order_data in data.get("data", {}).items():
-            if order_data:
-                gid = order_data["id"]
-                cursor.execute("""
-                    INSERT OR REPLACE INTO shopify_orders (id, timestamp, raw_json)
-                    VALUES (?, ?, ?)
-                """, (gid, timestamp, json.dumps(order_data)))
-                print(f"[DEBUG] Inserted Shopify order: {gid}")
-        conn.commit()
-        time.sleep(1)
+# Batches run concurrently and pace themselves from extensions.cost instead of
+# a fixed sleep; rows are written from the event loop thread as batches land.
+def store_batch(batch, orders):
+    for gid in cache.store(batch, orders, timestamp):
+        print(f"[DEBUG] Inserted Shopify order: {gid}")
+
+orders, stats = enrich_orders(
+    unprocessed_ids,
+    SHOPIFY_ENDPOINT,
+    SHOPIFY_HEADERS,
+    on_batch=store_batch,
+    concurrency=CONCURRENCY,
+    batch_size=BATCH_SIZE
+)
+print(f"[✓] Enriched {stats['orders']} orders in {stats['elapsed']:.1f}s "
+      f"({stats['requests']} requests, {stats['throttled']} throttled, "
+      f"{stats['failed_batches']} failed batches, {stats['throttle_wait']:.1f}s throttle wait)")
+get_client().print_metrics()
 
-    except Exception as e:
-        print(f"[!] Shopify batch error: {e}")
-        continue
+# Keep the cache bounded; parsed rows for evicted orders go with them below
+cache.evict()
+cache.print_stats()
 
 print("[✓] Shopify enrichment complete.")
 
 # === DEBUG: Confirm what was written ===
-cursor.execute("SELECT COUNT(*) FROM shopify_orders")
-print(f"[DEBUG] Total shopify_orders in DB: {cursor.fetchone()[0]}")
-
-cursor.execute("SELECT DISTINCT timestamp FROM shopify_orders")
-print(f"[DEBUG] Timestamps found in shopify_orders: {[row[0] for row in cursor.fetchall()]}")
+print(f"[DEBUG] Total shopify_orders in cache: "
+      f"{cache_conn.execute('SELECT COUNT(*) FROM shopify_orders').fetchone()[0]}")
+timestamps = [row[0] for row in cache_conn.execute("SELECT DISTINCT timestamp FROM shopify_orders")]
+print(f"[DEBUG] Timestamps found in shopify_orders: {timestamps}")
+cache_conn.close()
 
 # === PARSE SHOPIFY JSON TO FLAT TABLE ===
-cursor.execute("SELECT id, timestamp, raw_json FROM shopify_orders WHERE timestamp = ?", (timestamp,))
-rows = cursor.fetchall()
-parsed_count = 0
-
-for shopify_id, ts, raw_json in rows:
-    try:
-        parsed = json.loads(raw_json)
-        gid = parsed.get("id", "")
-        order_id = gid.split("/")[-1] if "gid://" in gid else gid
-        order_name = parsed.get("name", "")
-        financial_status = parsed.get("displayFinancialStatus", "")
-        fulfillments = parsed.get("fulfillments", [])
-
-        if not fulfillments:
-            cursor.execute('''
-                INSERT INTO shopify_parsed_orders
-                (shopify_order_id, order_name, financial_status, fulfillment_status, fulfillment_location, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (order_id, order_name, financial_status, None, None, ts))
-        else:
-            for f in fulfillments:
-                status = f.get("status")
-                loc_name = f.get("location", {}).get("name", "")
-                cursor.execute('''
-                    INSERT INTO shopify_parsed_orders
-                    (shopify_order_id, order_name, financial_status, fulfillment_status, fulfillment_location, timestamp)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (order_id, order_name, financial_status, status, loc_name, ts))
-        parsed_count += 1
-
-    except Exception as e:
-        print(f"[!] Failed to parse row for {shopify_id}: {e}")
-
-conn.commit()
-conn.close()
-print(f"[✓] Parsed and inserted {parsed_count} Shopify orders into shopify_parsed_orders.")
+# Written into a copy of mad_recon.db that is swapped in at the end (see
+# _DB_BUILDS); the dashboards keep reading the previous build meanwhile, and a
+# failure here discards the copy. Orders that changed since the last published
+# build (this run or a crawl that died before publishing) are re-parsed.
+with DatabaseBuild(DB_PATH, "shopify_enrichment", required_tables=["shopify_orders", "shopify_parsed_orders"]) as conn:
+    if DEBUG_RESET:
+        conn.execute("DROP TABLE IF EXISTS shopify_orders")
+        conn.execute("DROP TABLE IF EXISTS shopify_parsed_orders")
+        conn.commit()
+        forget_migrations(conn, PARSED_ORDERS_MIGRATIONS)
+        print("[✓] Dropped Shopify tables for clean test run.")
+    migrate(conn, PARSED_ORDERS_MIGRATIONS)
+    changed = copy_orders_into(conn, CACHE_DB_PATH)
+    parsed_count = reparse_orders(conn, changed)
+    bump_snapshot(conn, "shopify_enrichment")
+print(f"[✓] Parsed and inserted {parsed_count} Shopify orders into shopify_parsed_orders "
+      f"({len(changed)} changed since the last build).")
@@ -1,7 +1,8 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
 import os
+from _DB_BUILDS import current_db
+from _EXPLORER_QUERIES import ERP_AGING, SHOPIFY_ORDERS
+from _EXPLORER_UI import open_cache, sidebar_filters, paged_table, cache_debug_panel, aging_kpi_header
 
 # Path to SQLite database
 DB_PATH = "../../mad_recon.db"
@@ -11,30 +12,33 @@ st.set_page_config(page_title="MAD Recon Viewer", layout="wide")
 st.title("🧮 MAD Recon Data Explorer")
 
 # Check database existence
-if not os.path.exists(DB_PATH):
+if not os.path.exists(current_db(DB_PATH)):
     st.error("Database file 'mad_recon.db' not found.")
     st.stop()
 
-# Connect to DB
-conn = sqlite3.connect(DB_PATH)
+# Shared read-only connection and result cache; reruns only re-query after a
+# loader has published a new snapshot
+cache = open_cache(DB_PATH)
 
-# Layout tabs
+# Layout tabs; filters, counts and pages are answered by SQLite (see
+# _EXPLORER_QUERIES), so only the visible page is loaded
 tab1, tab2 = st.tabs(["ERP Aging Report", "Shopify Data"])
 
 with tab1:
     st.header("ERP Aging Report")
     try:
-        erp_df = pd.read_sql_query("SELECT * FROM erp_aging_data ORDER BY timestamp DESC", conn)
-        st.dataframe(erp_df, use_container_width=True)
+        aging_kpi_header(cache)
+        values = sidebar_filters(cache, ERP_AGING, "erp_aging", "ERP Aging filters")
+        paged_table(cache, ERP_AGING, values, "erp_aging")
     except Exception as e:
         st.error(f"Failed to load ERP data: {e}")
 
 with tab2:
     st.header("Shopify Orders (Parsed)")
     try:
-        shopify_df = pd.read_sql_query("SELECT * FROM shopify_parsed_orders ORDER BY timestamp DESC", conn)
-        st.dataframe(shopify_df, use_container_width=True)
+        values = sidebar_filters(cache, SHOPIFY_ORDERS, "shopify_orders", "Shopify filters")
+        paged_table(cache, SHOPIFY_ORDERS, values, "shopify_orders")
     except Exception as e:
         st.error(f"Failed to load Shopify parsed data: {e}")
 
-conn.close()
+cache_debug_panel(cache)
@@ -1,8 +1,13 @@
-import sqlite3
 import pandas as pd
-import paramiko
-from scp import SCPClient
 import os
+from _ERP_SESSION import get_session
+from _ERP_LINE_CACHE import CACHE_TABLE, ErpLineCache, line_keys
+from _CSV_INGEST import ERP_PICK_LINES, conform, read_chunks, ingest_frames
+from _SQLITE_STORAGE import bump_snapshot, connect
+from _DB_BUILDS import DatabaseBuild, current_db
+from _PICK_RECON_TABLES import build_recon_tables, export_queries
+from _EXPORT_ARTIFACTS import write_exports
+from _RECON_KEYS import ERP_KEYS, KeyIds, normalize_lines
 
 # === CONFIGURATION ===
 PICK_AGING_DB_PATH = r"C:\Users\andrew.beattie\AppData\Local\Programs\Python\Python313\Lib\Projects_2\shop_erp_recon\aging_orders\pick_aging.db"
@@ -23,32 +28,34 @@ TARGET_TABLE = "erp_order_lines_oms_report"
 
 # === Initialize the DB if needed ===
 def initialize_db():
-    if not os.path.exists(PICK_AGING_DB_PATH):
+    # The published database is only read; a build adds whatever is missing
+    live = current_db(PICK_AGING_DB_PATH)
+    if not os.path.exists(live):
         print(f"[→] Creating new database: {PICK_AGING_DB_PATH}")
     else:
-        print(f"[✓] Database already exists: {PICK_AGING_DB_PATH}")
-
-    conn = sqlite3.connect(PICK_AGING_DB_PATH)
-    cursor = conn.cursor()
-
-    # Create picked_aging_report table if it doesn't exist
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS picked_aging_report (
-            order_id TEXT,
-            order_name TEXT,
-            product_id TEXT,
-            location_id TEXT,
-            order_shipment_line_units INTEGER
-        )
-    """)
-
-    conn.commit()
-    conn.close()
+        print(f"[✓] Database already exists: {live}")
+        conn = connect(live, read_only=True)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.close()
+        if {"picked_aging_report", CACHE_TABLE} <= tables:
+            return
+
+    with DatabaseBuild(PICK_AGING_DB_PATH, "initialize_db", required_tables=["picked_aging_report"]) as conn:
+        # Create picked_aging_report table if it doesn't exist
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS picked_aging_report (
+                order_id TEXT,
+                order_name TEXT,
+                product_id TEXT,
+                location_id TEXT,
+                order_shipment_line_units INTEGER
+            )
+        """)
+        ErpLineCache(conn)  # creates the ERP line cache table
     print("[✓] Database initialized with picked_aging_report table (if not already present)")
 
 # === Export picked aging lines to CSV ===
-def export_picked_lines_to_csv():
-    conn = sqlite3.connect(LOCAL_DB_PATH)
+def current_picked_lines(conn):
     query = """
         SELECT DISTINCT 
             order_name, 
@@ -57,69 +64,98 @@ def export_picked_lines_to_csv():
             order_shipment_line_units
         FROM picked_aging_report
     """
-    df = pd.read_sql_query(query, conn)
+    return pd.read_sql_query(query, conn)
+
+
+def export_picked_lines_to_csv():
+    # Only pairs without a fresh terminal answer in the ERP line cache go out
+    conn = connect(current_db(LOCAL_DB_PATH), read_only=True)
+    df = current_picked_lines(conn)
+    cache = ErpLineCache(conn)
+    due = set(cache.keys_to_refresh(line_keys(df, "order_name", "product_id")))
+    df = df[[key in due for key in line_keys(df, "order_name", "product_id")]]
     df.to_csv(LOCAL_PICKED_CSV, index=False)
     conn.close()
-    print(f"[✓] Exported picked aging lines to CSV: {LOCAL_PICKED_CSV}")
+    print(f"[✓] Exported {len(df)} picked aging lines needing an ERP lookup to CSV: {LOCAL_PICKED_CSV}")
+    cache.print_stats()
 
 # === Push CSV to ERP and run program ===
 def push_csv_and_run_erp():
-    print("[→] Connecting to ERP server via SSH...")
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(ERP_HOST, port=ERP_PORT, username=ERP_USER, password=ERP_PASS)
-    scp = SCPClient(ssh.get_transport())
+    if pd.read_csv(LOCAL_PICKED_CSV).empty:
+        print("[=] Every line was answered from the ERP line cache, skipping the ERP run")
+        return
+
+    session = get_session(ERP_HOST, ERP_PORT, ERP_USER, ERP_PASS, ERP_REMOTE_DIR)
 
     # Upload CSV
     print(f"[→] Uploading CSV to ERP: {ERP_REMOTE_CSV_PATH}")
-    scp.put(LOCAL_PICKED_CSV, ERP_REMOTE_CSV_PATH)
+    session.put(LOCAL_PICKED_CSV, ERP_REMOTE_CSV_PATH)
 
     # Run ERP .p program
-    erp_cmd = f"cd {ERP_REMOTE_DIR} && /usr/dlc117/bin/mpro -b -pf connect.pf -p {ERP_PROGRAM_DIR}/{ERP_PROGRAM}"
     print("[→] Executing ERP .p script remotely...")
-    stdin, stdout, stderr = ssh.exec_command(erp_cmd)
-
-    for line in stdout:
-        print("[ERP]", line.strip())
-    for err in stderr:
-        print("[!] ERP Error:", err.strip())
+    session.run_program(ERP_PROGRAM_DIR, ERP_PROGRAM)
 
     # Download ERP output CSV
     print(f"[→] Fetching ERP output CSV: {ERP_OUTPUT_CSV_PATH}")
-    scp.get(ERP_OUTPUT_CSV_PATH, LOCAL_OUTPUT_CSV)
+    session.fetch(ERP_OUTPUT_CSV_PATH, LOCAL_OUTPUT_CSV)
 
-    scp.close()
-    ssh.close()
     print(f"[✓] ERP output CSV downloaded: {LOCAL_OUTPUT_CSV}")
 
 # === Load ERP CSV into local DB with warehouse normalization and order-date ===
-def load_erp_csv_to_db():
-    df = pd.read_csv(LOCAL_OUTPUT_CSV)
+def erp_line_chunks(conn, cache, requested, counts):
+    # Fresh ERP answers streamed from the output CSV, then cached answers for
+    # every pair that was not sent this run; the cache holds the raw ERP lines,
+    # so normalization applies to both. counts gets "fresh", "cached" and
+    # "dated" (lines carrying an orderDate) as the chunks go by.
+    if requested:
+        for chunk in read_chunks(LOCAL_OUTPUT_CSV, ERP_PICK_LINES):
+            cache.add_answers(chunk)
+            counts["fresh"] += len(chunk)
+            counts["dated"] += int(chunk["orderDate"].notna().sum())
+            yield chunk
+    cache.finish_store(requested)
+
+    all_keys = line_keys(current_picked_lines(conn), "order_name", "product_id")
+    for chunk in cache.rows_for(set(all_keys) - set(requested)):
+        chunk = conform(chunk, ERP_PICK_LINES)
+        counts["cached"] += len(chunk)
+        counts["dated"] += int(chunk["orderDate"].notna().sum())
+        yield chunk
+    cache.prune(all_keys)
 
-    # Normalize Warehouse column if it exists
-    if 'Warehouse' in df.columns:
-        df['Warehouse'] = df['Warehouse'].astype(str).str.replace(r'^AYS', '10', regex=True)
-        print("[✓] Normalized Warehouse column (AYS → 10)")
 
-    # Check for OrderDate column
-    if 'orderDate' in df.columns or 'OrderDate' in df.columns:
-        print("[✓] OrderDate column found and will be stored.")
-    else:
-        print("[⚠️] OrderDate column NOT found — please verify CSV output from ERP.")
-
-    conn = sqlite3.connect(LOCAL_DB_PATH)
-    cursor = conn.cursor()
-
-    # Drop table if it exists
-    cursor.execute(f"DROP TABLE IF EXISTS {TARGET_TABLE}")
-    conn.commit()
-
-    # Save new data
-    df.to_sql(TARGET_TABLE, conn, if_exists='replace', index=False)
-
-    conn.commit()
-    conn.close()
-    print(f"[✓] ERP data (with OrderDate) loaded into table: {TARGET_TABLE} in {LOCAL_DB_PATH}")
+def load_erp_csv_to_db():
+    # Streams fresh and cached ERP lines chunk by chunk into a staging table
+    # that replaces the live one once every line is in, all inside a new build
+    # of pick_aging.db that is swapped in once complete (see _DB_BUILDS)
+    with DatabaseBuild(LOCAL_DB_PATH, "erp_vs_pick_report", required_tables=[TARGET_TABLE]) as conn:
+        cache = ErpLineCache(conn)
+        requested = line_keys(pd.read_csv(LOCAL_PICKED_CSV, dtype=str), "order_name", "product_id")
+
+        # Canonical order/SKU/warehouse (AYS → 10)/quantity values plus their interned ids
+        lines = {"fresh": 0, "cached": 0, "dated": 0}
+        key_ids = KeyIds(conn)
+        chunks = (normalize_lines(conn, chunk, ERP_KEYS, key_ids)
+                  for chunk in erp_line_chunks(conn, cache, requested, lines))
+        stats = ingest_frames(conn, TARGET_TABLE, chunks, ERP_PICK_LINES)
+        print(f"[✓] {lines['fresh']} fresh ERP lines + {lines['cached']} from the ERP line cache")
+        cache.print_stats()
+
+        # Check for OrderDate column
+        if lines["dated"]:
+            print("[✓] OrderDate column found and will be stored.")
+        else:
+            print("[⚠️] OrderDate column NOT found — please verify CSV output from ERP.")
+        print(f"[✓] ERP data (with OrderDate) loaded into table: {TARGET_TABLE} in {LOCAL_DB_PATH}")
+
+        # Index the join keys and materialize the reconciliation buckets the dashboard reads
+        if stats["rows"]:
+            counts = build_recon_tables(conn)
+            print(f"[✓] Materialized {len(counts)} reconciliation tables "
+                  f"({counts['mat_picked_aging_merged_with_erp']} merged rows)")
+        snapshot_id = bump_snapshot(conn, "erp_vs_pick_report")
+        if stats["rows"]:
+            write_exports(conn, LOCAL_DB_PATH, snapshot_id, export_queries(conn))
 
 # === Main execution ===
 def main():
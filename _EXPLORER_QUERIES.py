@@ -0,0 +1,200 @@
+import pandas as pd
+from _RECON_KEYS import canonical_order_number
+
+# === CONFIGURATION ===
+# The explorers never load a whole table. Sidebar filters become one WHERE
+# clause over indexed columns, the total is one COUNT(*), and rows arrive a
+# page at a time by keyset: a page starts after the sort key of the previous
+# page's last row, so page 50 costs what page 1 does. Loaders create each
+# source's indexes (create_indexes); the apps only read.
+PAGE_ROWS = 200
+OPTION_LIMIT = 500  # distinct values offered by a multiselect
+NULL_OPTION = "(none)"
+
+
+# === FILTERS ===
+# Each filter turns its sidebar value into (SQL, params), or (None, []) when unset
+class ValuesFilter:
+    # One of the chosen values; NULL_OPTION matches NULL
+    def __init__(self, label, column):
+        self.label = label
+        self.column = column
+
+    def clause(self, values):
+        if not values:
+            return None, []
+        present = [v for v in values if v != NULL_OPTION]
+        parts = [f'"{self.column}" IN ({", ".join("?" * len(present))})'] if present else []
+        if len(present) < len(values):
+            parts.append(f'"{self.column}" IS NULL')
+        return f"({' OR '.join(parts)})", present
+
+
+class RangeFilter:
+    # (low, high), both inclusive, either may be None; expression is SQL so
+    # it can match an index on the same expression
+    def __init__(self, label, expression):
+        self.label = label
+        self.expression = expression
+
+    def clause(self, bounds):
+        low, high = bounds if bounds else (None, None)
+        parts, params = [], []
+        if low is not None:
+            parts.append(f"{self.expression} >= ?")
+            params.append(low)
+        if high is not None:
+            parts.append(f"{self.expression} <= ?")
+            params.append(high)
+        return (f"({' AND '.join(parts)})" if parts else None), params
+
+
+class SearchFilter:
+    # Order-number prefix search on any of columns. The text is put in the
+    # loaders' canonical form and matched as a range, which the column's
+    # index answers directly (LIKE would scan).
+    def __init__(self, label, columns):
+        self.label = label
+        self.columns = columns
+
+    def clause(self, text):
+        if not text or not str(text).strip():
+            return None, []
+        prefix = canonical_order_number(pd.Series([str(text)])).iloc[0]
+        parts = [f'("{c}" >= ? AND "{c}" < ?)' for c in self.columns]
+        return f"({' OR '.join(parts)})", [prefix, prefix + "\uffff"] * len(self.columns)
+
+
+# === SOURCES ===
+class ExplorerSource:
+    # table: table read; order: SQL expressions that together are unique per
+    # row, read newest/oldest first (descending); columns: columns shown, None
+    # for all; filters: {name: filter}; indexes: CREATE INDEX statements that
+    # serve the order and the filters
+    def __init__(self, table, order, filters=None, columns=None, indexes=()):
+        self.table = table
+        self.order = list(order)
+        self.filters = filters or {}
+        self.columns = columns
+        self.indexes = list(indexes)
+
+    def __repr__(self):
+        # Identifies the query for _QUERY_CACHE
+        return (f"ExplorerSource({self.table!r}, order={self.order!r}, filters={list(self.filters)!r}, "
+                f"columns={self.columns!r})")
+
+
+ERP_AGING = ExplorerSource(
+    "erp_aging_data",
+    order=['COALESCE("iAge", -1)', '"order-number"'],
+    filters={
+        "warehouse": ValuesFilter("Warehouse", "warehouse"),
+        "hold_code": ValuesFilter("Hold code", "hold-code"),
+        "age": RangeFilter("Age (days)", 'COALESCE("iAge", -1)'),
+        "order": SearchFilter("Order search", ["order-number", "cShopifyOrderNumber"]),
+    },
+    indexes=[
+        'CREATE INDEX IF NOT EXISTS idx_erp_aging_data_age ON erp_aging_data (COALESCE("iAge", -1), "order-number")',
+        'CREATE INDEX IF NOT EXISTS idx_erp_aging_data_shopify_number ON erp_aging_data ("cShopifyOrderNumber")',
+        'CREATE INDEX IF NOT EXISTS idx_erp_aging_data_warehouse ON erp_aging_data ("warehouse")',
+        'CREATE INDEX IF NOT EXISTS idx_erp_aging_data_hold ON erp_aging_data ("hold-code")',
+    ],
+)
+SHOPIFY_ORDERS = ExplorerSource(
+    "shopify_parsed_orders",
+    order=["COALESCE(timestamp, '')", "rowid"],
+    filters={
+        "location": ValuesFilter("Fulfillment location", "fulfillment_location"),
+        "status": ValuesFilter("Fulfillment status", "fulfillment_status"),
+        "order": SearchFilter("Order search", ["order_name"]),
+    },
+    indexes=[
+        "CREATE INDEX IF NOT EXISTS idx_shopify_parsed_orders_ts ON shopify_parsed_orders (COALESCE(timestamp, ''))",
+        "CREATE INDEX IF NOT EXISTS idx_shopify_parsed_orders_name ON shopify_parsed_orders (order_name)",
+        "CREATE INDEX IF NOT EXISTS idx_shopify_parsed_orders_location ON shopify_parsed_orders (fulfillment_location)",
+    ],
+)
+
+
+def recon_source(table, columns=None, bucket=False):
+    # A pick_aging.db reconciliation table (mat_<view> or recon_classified);
+    # build_recon_tables already indexes order_name, and bucket on recon_classified
+    filters = {
+        "warehouse": ValuesFilter("Pick location", "location_id"),
+        "order": SearchFilter("Order search", ["order_name"]),
+    }
+    if bucket:
+        filters["bucket"] = ValuesFilter("Bucket", "bucket")
+    return ExplorerSource(table, order=["rowid"], filters=filters, columns=columns)
+
+
+def create_indexes(conn, source):
+    for sql in source.indexes:
+        conn.execute(sql)
+    conn.commit()
+
+
+# === QUERIES ===
+def where_clause(source, values):
+    # values: {filter name: sidebar value}; returns (" WHERE ...", params)
+    parts, params = [], []
+    for name, sql_filter in source.filters.items():
+        sql, filter_params = sql_filter.clause(values.get(name))
+        if sql:
+            parts.append(sql)
+            params.extend(filter_params)
+    return (f" WHERE {' AND '.join(parts)}" if parts else ""), params
+
+
+def count_rows(conn, source, values):
+    where, params = where_clause(source, values)
+    return conn.execute(f"SELECT COUNT(*) FROM {source.table}{where}", params).fetchone()[0]
+
+
+def fetch_page(conn, source, values, after=None, page_rows=PAGE_ROWS):
+    # One page in source order, starting after the sort key `after` (None for
+    # the first page). Returns (DataFrame, sort key to pass for the next page
+    # or None on the last page).
+    where, params = where_clause(source, values)
+    if after is not None:
+        keyset = f"({', '.join(source.order)}) < ({', '.join('?' * len(after))})"
+        where = f"{where} AND {keyset}" if where else f" WHERE {keyset}"
+        params = params + list(after)
+    columns = ", ".join(f'"{c}"' for c in source.columns) if source.columns else "*"
+    keys = ", ".join(f"{expression} AS _key{i}" for i, expression in enumerate(source.order))
+    order_by = ", ".join(f"{expression} DESC" for expression in source.order)
+    cursor = conn.execute(
+        f"SELECT {columns}, {keys} FROM {source.table}{where} ORDER BY {order_by} LIMIT ?",
+        params + [page_rows + 1],
+    )
+    names = [d[0] for d in cursor.description]
+    rows = cursor.fetchall()
+    key_count = len(source.order)
+    next_after = tuple(rows[page_rows - 1][-key_count:]) if len(rows) > page_rows else None
+    page = pd.DataFrame.from_records([row[:-key_count] for row in rows[:page_rows]], columns=names[:-key_count])
+    return page, next_after
+
+
+def filtered_cursor(conn, source, values):
+    # Every filtered row in source order as one cursor, for streamed exports
+    where, params = where_clause(source, values)
+    columns = ", ".join(f'"{c}"' for c in source.columns) if source.columns else "*"
+    order_by = ", ".join(f"{expression} DESC" for expression in source.order)
+    return conn.execute(f"SELECT {columns} FROM {source.table}{where} ORDER BY {order_by}", params)
+
+
+def iter_pages(conn, source, values, page_rows=PAGE_ROWS):
+    # Every filtered row, page by page, for exports
+    after = None
+    while True:
+        page, after = fetch_page(conn, source, values, after, page_rows)
+        if not page.empty:
+            yield page
+        if after is None:
+            return
+
+
+def distinct_values(conn, source, column, limit=OPTION_LIMIT):
+    # Options for a ValuesFilter, NULL shown as NULL_OPTION
+    rows = conn.execute(f'SELECT DISTINCT "{column}" FROM {source.table} ORDER BY 1 LIMIT ?', (limit,)).fetchall()
+    return [NULL_OPTION if value is None else value for (value,) in rows]
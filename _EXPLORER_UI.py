@@ -0,0 +1,169 @@
+import streamlit as st
+import tempfile
+from datetime import datetime
+from _SQLITE_STORAGE import connect
+from _QUERY_CACHE import QueryCache
+from _EXPLORER_QUERIES import (PAGE_ROWS, NULL_OPTION, ValuesFilter, RangeFilter, where_clause, count_rows,
+                               fetch_page, filtered_cursor, distinct_values)
+from _EXPORT_ARTIFACTS import CSV_SUFFIX, PARQUET_SUFFIX, artifact_path, write_csv_gz
+from _SUMMARY_TABLES import AGING_BUCKETS, UNKNOWN_AGE, AGING_SUMMARY, RECON_SUMMARY, read_summary
+
+# === CONFIGURATION ===
+# Streamlit side of _EXPLORER_QUERIES: sidebar widgets for a source's filters
+# and a paged table. Pages are remembered per explorer in session_state as the
+# sort keys they start after, so Previous is a pop and Next a push; changing a
+# filter starts again from page 1. Every query goes through the process-wide
+# QueryCache of its database (see _QUERY_CACHE). KPI headers and charts read
+# the load steps' summary tables (see _SUMMARY_TABLES), a few dozen rows each.
+AGE_ORDER = [label for _, label in reversed(AGING_BUCKETS)] + [UNKNOWN_AGE]
+
+
+@st.cache_resource
+def shared_cache(db_path):
+    return QueryCache(db_path)
+
+
+def open_cache(db_path):
+    # The database's shared cache, checked against the latest pipeline snapshot
+    cache = shared_cache(db_path)
+    cache.refresh_snapshot()
+    return cache
+
+
+def sidebar_filters(cache, source, key, title):
+    st.sidebar.subheader(title)
+    values = {}
+    for name, sql_filter in source.filters.items():
+        widget_key = f"{key}_{name}"
+        if isinstance(sql_filter, ValuesFilter):
+            options = cache.get(distinct_values, source, sql_filter.column)
+            values[name] = st.sidebar.multiselect(sql_filter.label, options, key=widget_key)
+        elif isinstance(sql_filter, RangeFilter):
+            low, high = st.sidebar.columns(2)
+            values[name] = (low.number_input(f"{sql_filter.label} from", min_value=0, value=None, step=1,
+                                             key=f"{widget_key}_low"),
+                            high.number_input("to", min_value=0, value=None, step=1, key=f"{widget_key}_high"))
+        else:
+            values[name] = st.sidebar.text_input(sql_filter.label, key=widget_key)
+    return values
+
+
+def paged_table(cache, source, values, key):
+    pages = st.session_state.setdefault(f"{key}_pages", {"filters": None, "starts": [None]})
+    # A new snapshot can move rows, so page keys from older data are dropped too
+    signature = repr((cache.snapshot[0], sorted(values.items())))
+    if pages["filters"] != signature:
+        pages.update(filters=signature, starts=[None])
+
+    total = cache.get(count_rows, source, values)
+    page, next_after = cache.get(fetch_page, source, values, pages["starts"][-1])
+    first = (len(pages["starts"]) - 1) * PAGE_ROWS
+
+    previous_col, position_col, next_col = st.columns([1, 4, 1])
+    if previous_col.button("◀ Previous", key=f"{key}_previous", disabled=len(pages["starts"]) == 1):
+        pages["starts"].pop()
+        st.rerun()
+    if next_col.button("Next ▶", key=f"{key}_next", disabled=next_after is None):
+        pages["starts"].append(next_after)
+        st.rerun()
+    position_col.write(f"**Matching rows:** {total:,} — showing {first + 1 if len(page) else 0:,}"
+                       f"–{first + len(page):,}")
+    st.dataframe(page, use_container_width=True)
+    return total
+
+
+def export_downloads(cache, source, values, key, view_name):
+    # Files are only opened or written once asked for. Without filters the
+    # load step's artifacts for the current snapshot are served as they are
+    # (see _EXPORT_ARTIFACTS); filtered rows stream from their own read-only
+    # connection into a temporary gzip CSV.
+    snapshot_id = cache.snapshot[0]
+    csv_path = artifact_path(cache.db_path, snapshot_id, view_name, CSV_SUFFIX)
+    if not where_clause(source, values)[0] and csv_path:
+        if st.button("Prepare download", key=f"{key}_prepare"):
+            with open(csv_path, "rb") as f:
+                st.download_button("Download CSV (gzip)", f, f"{view_name}{CSV_SUFFIX}", "application/gzip",
+                                   key=f"{key}_download_csv")
+            parquet_path = artifact_path(cache.db_path, snapshot_id, view_name, PARQUET_SUFFIX)
+            if parquet_path:
+                with open(parquet_path, "rb") as f:
+                    st.download_button("Download Parquet", f, f"{view_name}{PARQUET_SUFFIX}",
+                                       "application/vnd.apache.parquet", key=f"{key}_download_parquet")
+        return
+    if st.button("Prepare filtered CSV download", key=f"{key}_prepare"):
+        conn = connect(cache.path, read_only=True)
+        try:
+            with tempfile.TemporaryFile() as f:
+                write_csv_gz(filtered_cursor(conn, source, values), f)
+                f.seek(0)
+                st.download_button("Download filtered CSV (gzip)", f, f"{view_name}_filtered{CSV_SUFFIX}",
+                                   "application/gzip", key=f"{key}_download_csv")
+        finally:
+            conn.close()
+
+
+def cache_debug_panel(cache):
+    snapshot_id, loader, committed_at = cache.snapshot
+    with st.sidebar.expander("Cache debug"):
+        if snapshot_id:
+            st.write(f"**Snapshot:** {snapshot_id} from {loader}, "
+                     f"{datetime.strptime(committed_at, '%Y%m%d_%H%M%S'):%Y-%m-%d %H:%M:%S}")
+        else:
+            st.write("**Snapshot:** none published yet; results are kept until the process restarts")
+        s = cache.stats
+        st.write(f"**Hits / misses:** {s['hits']:,} / {s['misses']:,} ({cache.hit_rate() * 100:.1f}% hit rate)")
+        st.write(f"**Entries:** {len(cache.entries)} of {cache.max_entries} — "
+                 f"{s['evictions']:,} evicted, {s['invalidations']:,} snapshot changes")
+
+
+# === SUMMARY HEADERS ===
+def _summary(cache, spec):
+    # '' dimension values shown as the filters show NULLs
+    return cache.get(read_summary, spec).replace({name: {"": NULL_OPTION} for name in spec.dimensions})
+
+
+def aging_kpi_header(cache):
+    summary = _summary(cache, AGING_SUMMARY)
+    if summary.empty:
+        st.info("No ERP aging summary yet — it is built by the next ERP aging load.")
+        return
+    orders_by_age = summary.groupby("age_bucket")["orders"].sum()
+    columns = st.columns(len(AGING_BUCKETS) + 1)
+    columns[0].metric("Open orders", f"{int(summary['orders'].sum()):,}")
+    for column, (low, _) in zip(columns[1:], reversed(AGING_BUCKETS[:-1])):
+        over = [label for bound, label in AGING_BUCKETS if bound >= low]
+        column.metric(f"Over {low - 1} days", f"{int(orders_by_age.reindex(over).sum()):,}")
+    columns[-1].metric("On hold", f"{int(summary.loc[summary['hold_code'] != NULL_OPTION, 'orders'].sum()):,}")
+
+    ages = [label for label in AGE_ORDER if label in orders_by_age.index]
+    by_warehouse, by_hold = st.columns(2)
+    by_warehouse.caption("Orders by warehouse and age (days)")
+    by_warehouse.bar_chart(summary.pivot_table(index="warehouse", columns="age_bucket", values="orders",
+                                               aggfunc="sum", fill_value=0)[ages])
+    by_hold.caption("Orders by hold code and age (days)")
+    by_hold.dataframe(summary.pivot_table(index="hold_code", columns="age_bucket", values="orders", aggfunc="sum",
+                                          fill_value=0, margins=True, margins_name="Total")[ages + ["Total"]]
+                      .sort_values("Total", ascending=False), use_container_width=True)
+
+
+def recon_kpi_header(cache):
+    summary = _summary(cache, RECON_SUMMARY)
+    if summary.empty:
+        st.info("No reconciliation summary yet — it is built with the reconciliation tables.")
+        return
+    by_bucket = summary.groupby("bucket")[["lines", "orders", "pick_units", "erp_open_units"]].sum()
+    lines = int(by_bucket["lines"].sum())
+    bucket = by_bucket.reindex(["missing_in_erp", "fully_matched", "remaining_open"], fill_value=0)
+    columns = st.columns(4)
+    columns[0].metric("Pick lines", f"{lines:,}")
+    columns[1].metric("Fully matched", f"{bucket.loc['fully_matched', 'lines'] / lines * 100 if lines else 0:.1f}%")
+    columns[2].metric("Missing in ERP", f"{int(bucket.loc['missing_in_erp', 'lines']):,} lines")
+    columns[3].metric("Open ERP units", f"{int(bucket.loc['remaining_open', 'erp_open_units']):,}",
+                      help="Ordered − shipped − canceled units on remaining-open lines")
+
+    units, open_units = st.columns(2)
+    units.caption("Picked units by recon bucket and location")
+    units.bar_chart(summary.pivot_table(index="bucket", columns="location", values="pick_units", aggfunc="sum",
+                                        fill_value=0))
+    open_units.caption("Open ERP units and orders by recon bucket")
+    open_units.dataframe(by_bucket.astype(int).sort_values("lines", ascending=False), use_container_width=True)
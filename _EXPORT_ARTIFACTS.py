@@ -0,0 +1,143 @@
+import io
+import os
+import csv
+import gzip
+import shutil
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet artifacts need pyarrow; the gzip CSVs are written without
+    pa = pq = None
+
+# === CONFIGURATION ===
+# Download files for the dashboards, written by the load steps once a snapshot
+# is published (see _SQLITE_STORAGE.bump_snapshot), one folder per snapshot
+# next to the database:
+#   exports/pick_aging/snapshot_42/picked_aging_remaining_open.csv.gz
+#   exports/pick_aging/snapshot_42/picked_aging_remaining_open.parquet
+# Rows go from a SQLite cursor to the files EXPORT_CHUNK_ROWS at a time, so
+# neither the pipeline nor the dashboard holds a whole view in memory. Filtered
+# downloads use the same cursor-to-gzip path into a temporary file.
+EXPORT_DIR = "exports"
+EXPORT_KEEP = 2  # the snapshot a dashboard is still showing keeps its files
+EXPORT_CHUNK_ROWS = 20000
+CSV_SUFFIX = ".csv.gz"
+PARQUET_SUFFIX = ".parquet"
+COMPRESSION = "zstd"
+
+
+def export_root(db_path):
+    name = os.path.splitext(os.path.basename(db_path))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), EXPORT_DIR, name)
+
+
+def export_dir(db_path, snapshot_id):
+    return os.path.join(export_root(db_path), f"snapshot_{snapshot_id}")
+
+
+def artifact_path(db_path, snapshot_id, view_name, suffix):
+    # Path of a published artifact, or None when it was not written
+    path = os.path.join(export_dir(db_path, snapshot_id), f"{view_name}{suffix}")
+    return path if os.path.exists(path) else None
+
+
+def _chunks(cursor):
+    while True:
+        rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+        if not rows:
+            return
+        yield rows
+
+
+def write_csv_gz(cursor, fileobj):
+    # The cursor's rows as gzip CSV with a header row; returns the row count
+    rows = 0
+    with gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=6) as gz:
+        with io.TextIOWrapper(gz, encoding="utf-8", newline="") as text:
+            writer = csv.writer(text)
+            writer.writerow([d[0] for d in cursor.description])
+            for chunk in _chunks(cursor):
+                writer.writerows(chunk)
+                rows += len(chunk)
+    return rows
+
+
+def _arrow_schema(conn, sql, params, names):
+    # SQLite columns can mix storage classes, so types come from one pass over
+    # the values: any text -> string, else any real -> float64, else int64
+    probes = ", ".join(
+        f"MAX(typeof(\"{n}\") IN ('text', 'blob')), MAX(typeof(\"{n}\") = 'real'), MAX(typeof(\"{n}\") = 'integer')"
+        for n in names
+    )
+    flags = conn.execute(f"SELECT {probes} FROM ({sql})", params).fetchone()
+    fields = []
+    for i, name in enumerate(names):
+        text, real, integer = flags[3 * i:3 * i + 3]
+        kind = pa.string() if text or not (real or integer) else pa.float64() if real else pa.int64()
+        fields.append((name, kind))
+    return pa.schema(fields)
+
+
+def write_parquet(conn, sql, params, path):
+    # The query's rows as one Parquet file, a row group per chunk; returns the row count
+    cursor = conn.execute(sql, params)
+    schema = _arrow_schema(conn, sql, params, [d[0] for d in cursor.description])
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression=COMPRESSION) as writer:
+        for chunk in _chunks(cursor):
+            columns = list(zip(*chunk))
+            arrays = [
+                pa.array([None if v is None else str(v) for v in values] if field.type == pa.string() else values,
+                         type=field.type)
+                for field, values in zip(schema, columns)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows += len(chunk)
+    return rows
+
+
+def _csv_file(conn, sql, path):
+    with open(path, "wb") as f:
+        return write_csv_gz(conn.execute(sql), f)
+
+
+def _publish(path, write):
+    # Writes to a temporary name first, so a reader never opens a partial file
+    partial = f"{path}.partial"
+    try:
+        rows = write(partial)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return rows
+
+
+def write_exports(conn, db_path, snapshot_id, queries):
+    # One gzip CSV (and Parquet, with pyarrow) per {view name: SELECT} for the
+    # snapshot, then drops the artifacts of all but the EXPORT_KEEP newest
+    # snapshots. Returns {view name: rows}.
+    directory = export_dir(db_path, snapshot_id)
+    os.makedirs(directory, exist_ok=True)
+    if pa is None:
+        print("[!] pyarrow is not installed; writing gzip CSV exports only")
+    counts = {}
+    for view_name, sql in queries.items():
+        base = os.path.join(directory, view_name)
+        counts[view_name] = _publish(base + CSV_SUFFIX, lambda path: _csv_file(conn, sql, path))
+        if pa is not None:
+            _publish(base + PARQUET_SUFFIX, lambda path: write_parquet(conn, sql, (), path))
+    prune_exports(db_path)
+    print(f"[✓] Wrote export artifacts for {len(counts)} views to {directory}")
+    return counts
+
+
+def prune_exports(db_path, keep=EXPORT_KEEP):
+    root = export_root(db_path)
+    if not os.path.isdir(root):
+        return
+    snapshots = sorted((int(name.split("_", 1)[1]), name) for name in os.listdir(root)
+                       if name.startswith("snapshot_") and name.split("_", 1)[1].isdigit())
+    for _, name in snapshots[:-keep]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
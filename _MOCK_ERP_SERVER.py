@@ -0,0 +1,194 @@
+import os
+import re
+import shlex
+import socket
+import threading
+import subprocess
+import paramiko
+from paramiko import SFTPAttributes, SFTPHandle, SFTPServer, SFTPServerInterface
+from paramiko.sftp import SFTP_OK
+
+# === CONFIGURATION ===
+# Local stand-in for the ERP box: password SSH, an SFTP subsystem and exec
+# channels, all rooted in a local directory so remote absolute paths such as
+# /home/cutsey/... land under <root>/home/cutsey/.... `mpro` invocations are
+# answered by Python handlers registered per .p program; any other command
+# runs through the local shell with its absolute paths mapped under the root.
+MPRO_PATTERN = re.compile(r"mpro\s.*?-p\s+(\S+)(?:\s+-param\s+\"([^\"]*)\")?")
+SHELL_OPERATORS = {"&&", "||", ";", "|", ">", ">>", "<", "2>&1"}
+
+
+class MockErpState:
+    def __init__(self, root, username="cutsey", password="cuts1978"):
+        self.root = root
+        self.username = username
+        self.password = password
+        self.programs = {}
+        self.handshakes = 0
+        self.commands = []
+        self.lock = threading.Lock()
+
+    def local_path(self, remote_path):
+        return os.path.join(self.root, remote_path.lstrip("/"))
+
+    def register_program(self, name, handler):
+        # handler(state, param) -> (stdout_text, stderr_text, exit_status)
+        self.programs[name] = handler
+
+    def run_command(self, command):
+        with self.lock:
+            self.commands.append(command)
+        match = MPRO_PATTERN.search(command)
+        if match:
+            program = os.path.basename(match.group(1))
+            handler = self.programs.get(program)
+            if handler is None:
+                return "", f"** {program} was not found. (293)\n", 1
+            return handler(self, match.group(2))
+
+        tokens = []
+        for token in shlex.split(command):
+            if token in SHELL_OPERATORS:
+                tokens.append(token)
+            else:
+                tokens.append(shlex.quote(self.local_path(token) if token.startswith("/") else token))
+        result = subprocess.run(" ".join(tokens), shell=True, cwd=self.root, capture_output=True, text=True)
+        return result.stdout, result.stderr, result.returncode
+
+
+class _Server(paramiko.ServerInterface):
+    def __init__(self, state):
+        self.state = state
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        if username == self.state.username and password == self.state.password:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        command = command.decode("utf-8") if isinstance(command, bytes) else command
+
+        def run():
+            stdout, stderr, status = self.state.run_command(command)
+            if stdout:
+                channel.sendall(stdout.encode("utf-8"))
+            if stderr:
+                channel.sendall_stderr(stderr.encode("utf-8"))
+            channel.send_exit_status(status)
+            channel.close()
+
+        threading.Thread(target=run, daemon=True).start()
+        return True
+
+
+class _SFTPHandle(SFTPHandle):
+    def stat(self):
+        try:
+            return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+
+class _SFTPServer(SFTPServerInterface):
+    def __init__(self, server, *args, **kwargs):
+        self.state = server.state
+        super().__init__(server, *args, **kwargs)
+
+    def _local(self, path):
+        return self.state.local_path(self.canonicalize(path))
+
+    def list_folder(self, path):
+        try:
+            folder = self._local(path)
+            return [
+                SFTPAttributes.from_stat(os.stat(os.path.join(folder, name)), name)
+                for name in os.listdir(folder)
+            ]
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    def stat(self, path):
+        try:
+            return SFTPAttributes.from_stat(os.stat(self._local(path)))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        local = self._local(path)
+        try:
+            if flags & os.O_CREAT:
+                os.makedirs(os.path.dirname(local), exist_ok=True)
+            fd = os.open(local, flags, 0o666)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            mode = "rb"
+        handle = _SFTPHandle(flags)
+        handle.filename = local
+        handle.readfile = handle.writefile = os.fdopen(fd, mode)
+        return handle
+
+    def remove(self, path):
+        try:
+            os.remove(self._local(path))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def rename(self, oldpath, newpath):
+        try:
+            os.replace(self._local(oldpath), self._local(newpath))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    posix_rename = rename
+
+    def mkdir(self, path, attr):
+        try:
+            os.makedirs(self._local(path), exist_ok=True)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def chattr(self, path, attr):
+        return SFTP_OK
+
+
+def start_mock_erp(state, host="127.0.0.1", port=0):
+    host_key = paramiko.RSAKey.generate(2048)
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(16)
+
+    def serve():
+        while True:
+            try:
+                client, _ = listener.accept()
+            except OSError:
+                return
+            with state.lock:
+                state.handshakes += 1
+            transport = paramiko.Transport(client)
+            transport.add_server_key(host_key)
+            transport.set_subsystem_handler("sftp", SFTPServer, _SFTPServer)
+            server = _Server(state)
+            transport.start_server(server=server)
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener, listener.getsockname()[1]
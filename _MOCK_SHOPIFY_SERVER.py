@@ -0,0 +1,332 @@
+import os
+import re
+import json
+import shutil
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# === CONFIGURATION ===
+# Local stand-in for the Shopify Admin GraphQL endpoint. It models the leaky
+# bucket (maximumAvailable / restoreRate), charges a per-order cost and adds a
+# fixed latency so concurrency effects are visible in benchmarks.
+BUCKET_MAX = 1000.0
+RESTORE_RATE = 50.0
+COST_PER_ORDER = 2
+LATENCY_SECONDS = 0.25
+
+ALIAS_PATTERN = re.compile(r'(\w+):\s*order\(id:\s*"([^"]+)"\)')
+ORDER_GID_PATTERN = re.compile(r"^gid://shopify/Order/\d+$")
+ORDERS_FIRST_PATTERN = re.compile(r"orders\(first:\s*(\d+)")
+UPDATED_SINCE_PATTERN = re.compile(r"updated_at:>'([^']+)'")
+NESTED_FO_FIRST_PATTERN = re.compile(r"fulfillmentOrders\(first:\s*(\d+)\)")
+NESTED_LI_FIRST_PATTERN = re.compile(r"lineItems\(first:\s*(\d+)\)")
+FOLLOW_UP_ORDER_PATTERN = re.compile(
+    r'(\w+):\s*order\(id:\s*"([^"]+)"\)\s*\{\s*id\s*fulfillmentOrders\(first:\s*(\d+),\s*after:\s*"([^"]*)"\)')
+FOLLOW_UP_FO_PATTERN = re.compile(
+    r'(\w+):\s*fulfillmentOrder\(id:\s*"([^"]+)"\)\s*\{\s*id\s*lineItems\(first:\s*(\d+),\s*after:\s*"([^"]*)"\)')
+
+
+def page_edges(edges, first, after):
+    start = int(after) if after else 0
+    page = edges[start:start + first]
+    return page, {
+        "hasNextPage": start + first < len(edges),
+        "endCursor": str(start + len(page)) if page else after,
+    }
+
+
+class MockShopifyState:
+    def __init__(self, bucket_max=BUCKET_MAX, restore_rate=RESTORE_RATE,
+                 cost_per_order=COST_PER_ORDER, latency=LATENCY_SECONDS, missing_ids=(),
+                 bulk_jsonl_path=None, bulk_polls_until_done=2, orders=None, http_429_every=0,
+                 nodes_fail_every=0):
+        self.bucket_max = bucket_max
+        self.restore_rate = restore_rate
+        self.cost_per_order = cost_per_order
+        self.latency = latency
+        self.missing_ids = set(str(m) for m in missing_ids)
+        self.available = bucket_max
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.bulk_jsonl_path = bulk_jsonl_path
+        self.bulk_polls_until_done = bulk_polls_until_done
+        self.bulk_operation = None
+        self.orders = list(orders or [])
+        self.orders_served = 0
+        self.follow_up_requests = 0
+        self.http_429_every = http_429_every
+        self.posts = 0
+        self.nodes_fail_every = nodes_fail_every
+        self.nodes_calls = 0
+
+    def charge(self, cost):
+        with self.lock:
+            now = time.monotonic()
+            self.available = min(self.bucket_max, self.available + (now - self.updated_at) * self.restore_rate)
+            self.updated_at = now
+            self.requests += 1
+            if cost > self.available:
+                self.throttled += 1
+                return False, self.available
+            self.available -= cost
+            return True, self.available
+
+    def cost_extension(self, requested, actual, available):
+        return {
+            "cost": {
+                "requestedQueryCost": requested,
+                "actualQueryCost": actual,
+                "throttleStatus": {
+                    "maximumAvailable": self.bucket_max,
+                    "currentlyAvailable": round(available, 1),
+                    "restoreRate": self.restore_rate,
+                },
+            }
+        }
+
+    def fake_order(self, gid):
+        numeric_id = gid.split("/")[-1]
+        if numeric_id in self.missing_ids:
+            return None
+        return {
+            "id": gid,
+            "name": f"#{numeric_id[-8:]}",
+            "displayFinancialStatus": "PAID",
+            "fulfillments": [{"status": "SUCCESS", "location": {"name": "Mock Warehouse"}}],
+        }
+
+    # orders(first:, after:, query:) over the in-memory order list; only the
+    # updated_at:> and unfulfilled/partial parts of the search syntax are honoured
+    # Nested connections are sliced to the page sizes the query asked for and
+    # carry pageInfo, so truncated orders look the way Shopify returns them
+    def fulfillment_order_view(self, fo, li_first, li_after=None):
+        edges, page_info = page_edges(fo["lineItems"]["edges"], li_first, li_after)
+        return dict(fo, lineItems={"edges": edges, "pageInfo": page_info})
+
+    def order_view(self, order, fo_first, li_first, fo_after=None):
+        edges, page_info = page_edges(order["fulfillmentOrders"]["edges"], fo_first, fo_after)
+        edges = [{"node": self.fulfillment_order_view(edge["node"], li_first)} for edge in edges]
+        return dict(order, fulfillmentOrders={"edges": edges, "pageInfo": page_info})
+
+    def follow_up(self, query, li_first):
+        orders_by_id = {order["id"]: order for order in self.orders}
+        fos_by_id = {
+            edge["node"]["id"]: edge["node"]
+            for order in self.orders for edge in order["fulfillmentOrders"]["edges"]
+        }
+        data = {}
+        # Like Shopify, an ID that no longer exists comes back as null
+        for alias, gid, first, after in FOLLOW_UP_ORDER_PATTERN.findall(query):
+            if gid not in orders_by_id:
+                data[alias] = None
+                continue
+            view = self.order_view(orders_by_id[gid], int(first), li_first, after)
+            data[alias] = {"id": gid, "fulfillmentOrders": view["fulfillmentOrders"]}
+        for alias, gid, first, after in FOLLOW_UP_FO_PATTERN.findall(query):
+            if gid not in fos_by_id:
+                data[alias] = None
+                continue
+            view = self.fulfillment_order_view(fos_by_id[gid], int(first), after)
+            data[alias] = {"id": gid, "lineItems": view["lineItems"]}
+        return data
+
+    def orders_page(self, first, cursor, order_filter, fo_first=250, li_first=250):
+        matches = self.orders
+        since = UPDATED_SINCE_PATTERN.search(order_filter or "")
+        if since:
+            matches = [o for o in matches if o.get("updatedAt", "") > since.group(1)]
+        if "fulfillment_status:unfulfilled" in (order_filter or ""):
+            matches = [
+                o for o in matches
+                if any(li["node"]["remainingQuantity"] > 0
+                       for fo in o["fulfillmentOrders"]["edges"]
+                       for li in fo["node"]["lineItems"]["edges"])
+            ]
+        start = int(cursor) if cursor else 0
+        page = matches[start:start + first]
+        self.orders_served += len(page)
+        return {"orders": {
+            "edges": [
+                {"cursor": str(start + i + 1), "node": self.order_view(node, fo_first, li_first)}
+                for i, node in enumerate(page)
+            ],
+            "pageInfo": {"hasNextPage": start + first < len(matches)},
+        }}
+
+    # Every Nth POST is rejected with 429 + Retry-After to exercise client retries
+    def should_reject(self):
+        with self.lock:
+            self.posts += 1
+            return bool(self.http_429_every) and self.posts % self.http_429_every == 0
+
+    # Every Nth nodes() call fails with Shopify's internal error, whatever its IDs
+    def should_fail_nodes(self):
+        with self.lock:
+            self.nodes_calls += 1
+            return bool(self.nodes_fail_every) and self.nodes_calls % self.nodes_fail_every == 0
+
+    # Bulk Operations: a submitted export reports RUNNING for a few polls and
+    # then COMPLETED with a url pointing at the canned JSONL file
+    def submit_bulk(self):
+        self.bulk_operation = {"id": "gid://shopify/BulkOperation/1", "polls": 0}
+        return {"bulkOperationRunQuery": {
+            "bulkOperation": {"id": self.bulk_operation["id"], "status": "CREATED"},
+            "userErrors": [],
+        }}
+
+    def current_bulk(self, base_url):
+        operation = self.bulk_operation
+        if operation is None:
+            return {"currentBulkOperation": None}
+        operation["polls"] += 1
+        done = operation["polls"] >= self.bulk_polls_until_done
+        object_count = 0
+        if done and self.bulk_jsonl_path:
+            with open(self.bulk_jsonl_path, "rb") as f:
+                object_count = sum(1 for line in f if line.strip())
+        return {"currentBulkOperation": {
+            "id": operation["id"],
+            "status": "COMPLETED" if done else "RUNNING",
+            "errorCode": None,
+            "objectCount": str(object_count),
+            "url": f"{base_url}/bulk/result.jsonl" if done and self.bulk_jsonl_path else None,
+            "partialDataUrl": None,
+        }}
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            query = request.get("query", "")
+            base_url = f"http://{self.headers.get('Host')}"
+
+            if state.should_reject():
+                body = b'{"errors": "Exceeded 2 calls per second for api client."}'
+                self.send_response(429)
+                self.send_header("Retry-After", "0.2")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            if "bulkOperationRunQuery" in query:
+                self._reply(200, {"data": state.submit_bulk()})
+                return
+            if "currentBulkOperation" in query:
+                self._reply(200, {"data": state.current_bulk(base_url)})
+                return
+
+            fo_first = NESTED_FO_FIRST_PATTERN.search(query)
+            li_first = NESTED_LI_FIRST_PATTERN.search(query)
+            fo_first = int(fo_first.group(1)) if fo_first else 250
+            li_first = int(li_first.group(1)) if li_first else 250
+
+            if FOLLOW_UP_ORDER_PATTERN.search(query) or FOLLOW_UP_FO_PATTERN.search(query):
+                data = state.follow_up(query, li_first)
+                state.follow_up_requests += 1
+                ok, available = state.charge(1 + len(data))
+                self._reply(200, {"data": data, "extensions": state.cost_extension(1 + len(data), 1 + len(data), available)})
+                return
+
+            first = ORDERS_FIRST_PATTERN.search(query)
+            if first:
+                variables = request.get("variables") or {}
+                page = state.orders_page(int(first.group(1)), variables.get("cursor"), variables.get("filter"),
+                                         fo_first, li_first)
+                cost = 1 + state.cost_per_order * len(page["orders"]["edges"])
+                ok, available = state.charge(cost)
+                self._reply(200, {"data": page, "extensions": state.cost_extension(cost, cost, available)})
+                return
+
+            if "nodes(ids:" in query:
+                self._reply_nodes((request.get("variables") or {}).get("ids") or [])
+                return
+
+            aliases = ALIAS_PATTERN.findall(query)
+            cost = 1 + state.cost_per_order * len(aliases)
+            time.sleep(state.latency)
+
+            ok, available = state.charge(cost)
+            if not ok:
+                self._reply(200, {
+                    "errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+                    "extensions": state.cost_extension(cost, 0, available),
+                })
+                return
+
+            data = {alias: state.fake_order(gid) for alias, gid in aliases}
+            self._reply(200, {"data": data, "extensions": state.cost_extension(cost, cost, available)})
+
+        def _reply_nodes(self, ids):
+            # Like Shopify, one malformed global ID fails the whole call
+            if state.should_fail_nodes():
+                self._reply(200, {"errors": [{"message": "Internal error. Looks like something went wrong on our end.",
+                                              "extensions": {"code": "INTERNAL_SERVER_ERROR"}}]})
+                return
+            bad = [gid for gid in ids if not ORDER_GID_PATTERN.match(str(gid))]
+            if bad:
+                self._reply(200, {"errors": [{"message": f"Invalid global id '{bad[0]}'",
+                                              "extensions": {"code": "argumentLiteralsIncompatible"}}]})
+                return
+
+            cost = 1 + state.cost_per_order * len(ids)
+            time.sleep(state.latency)
+            ok, available = state.charge(cost)
+            if not ok:
+                self._reply(200, {
+                    "errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+                    "extensions": state.cost_extension(cost, 0, available),
+                })
+                return
+
+            nodes = [state.fake_order(gid) for gid in ids]
+            self._reply(200, {"data": {"nodes": nodes}, "extensions": state.cost_extension(cost, cost, available)})
+
+        def do_GET(self):
+            if self.path != "/bulk/result.jsonl" or not state.bulk_jsonl_path:
+                self._reply(404, {"errors": "Not Found"})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/jsonl")
+            self.send_header("Content-Length", str(os.path.getsize(state.bulk_jsonl_path)))
+            self.end_headers()
+            with open(state.bulk_jsonl_path, "rb") as f:
+                shutil.copyfileobj(f, self.wfile)
+
+    return Handler
+
+
+def start_mock_server(state=None, host="127.0.0.1", port=0):
+    state = state or MockShopifyState()
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    endpoint = f"http://{host}:{server.server_address[1]}/admin/api/2023-10/graphql.json"
+    return server, state, endpoint
+
+
+if __name__ == "__main__":
+    server, state, endpoint = start_mock_server(port=8765)
+    print(f"[✓] Mock Shopify GraphQL listening on {endpoint}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,6 +1,12 @@
-import requests
-import sqlite3
+import json
+import time
 import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from _SHOPIFY_CLIENT import get_client, wait_for_budget
+from _SQLITE_STORAGE import BatchWriter, get_connection, insert_sql, migrate
+from _CSV_INGEST import replace_table
+from _RECON_KEYS import shopify_id
 
 # --- CONFIGURATION ---
 SHOP_NAME = "alo-yoga"
@@ -14,34 +20,62 @@ HEADERS = {
 }
 
 DB_NAME = "open_shopify.db"
+# Full crawls fill a staging table, resumable across runs with the cursor
+# file, that replaces unfulfilled_lines in one transaction once the last page
+# is in; readers of unfulfilled_lines never see it empty or half loaded.
+# open_shopify.db is not built off to the side (_DB_BUILDS): no dashboard reads
+# it, and a build would throw away a crawl that has to resume.
+STAGING_TABLE = "unfulfilled_lines_crawl"
 CURSOR_FILE = "last_cursor.txt"
 RESET_CURSOR = False  # Set True to start fresh
 
+SYNC_MODE = "paged"  # "paged" walks orders(first: 250); "bulk" runs a bulkOperationRunQuery export;
+                     # "incremental" pulls only orders updated since the last run's watermark
+ORDER_CREATED_FILTER = "created_at:>=2025-01-01"
+ORDER_FILTER = f"{ORDER_CREATED_FILTER} (fulfillment_status:unfulfilled OR fulfillment_status:partial)"
+FULL_RECONCILE_DAYS = 7  # incremental mode falls back to a full crawl this often to correct drift
+WATERMARK_OVERLAP_MINUTES = 5  # re-read a small window before the watermark; upserts are idempotent
+BULK_POLL_SECONDS = 5
+BULK_INSERT_CHUNK = 2000
+
+# Nested connections stay small on the 250-order page; orders that overflow
+# them are completed by follow-up queries running beside the main crawl
+FULFILLMENT_ORDERS_PAGE = 10
+LINE_ITEMS_PAGE = 20
+FOLLOW_UP_LINE_ITEMS_PAGE = 100
+FOLLOW_UP_BATCH = 25  # connections continued per follow-up query
+FOLLOW_UP_WORKERS = 2
+# A throttled follow-up waits for the bucket and goes again, this many times in
+# all; any other failure raises, so no cursor past its page is saved, the
+# staging table is not published and the incremental watermark stays put
+FOLLOW_UP_ATTEMPTS = 5
+
 # --- GraphQL query function ---
-def query_unfulfilled_lines(cursor=None):
+def query_unfulfilled_lines(cursor=None, order_filter=ORDER_FILTER):
     query = """
-    query ($cursor: String) {
-      orders(first: 250, after: $cursor, query: "created_at:>=2025-01-01 (fulfillment_status:unfulfilled OR fulfillment_status:partial)") {
+    query ($cursor: String, $filter: String) {
+      orders(first: 250, after: $cursor, query: $filter) {
         edges {
           cursor
           node {
             id
             name
             createdAt
+            updatedAt
             cancelledAt
             closedAt
             displayFinancialStatus
             metafield(namespace: "FDM4", key: "fdm4_order_number") {
               value
             }
-            fulfillmentOrders(first: 10) {
+            fulfillmentOrders(first: %d) {
               edges {
                 node {
                   id
                   assignedLocation {
                     name
                   }
-                  lineItems(first: 20) {
+                  lineItems(first: %d) {
                     edges {
                       node {
                         id
@@ -54,9 +88,17 @@ def query_unfulfilled_lines(cursor=None):
                         remainingQuantity
                       }
                     }
+                    pageInfo {
+                      hasNextPage
+                      endCursor
+                    }
                   }
                 }
               }
+              pageInfo {
+                hasNextPage
+                endCursor
+              }
             }
           }
         }
@@ -65,24 +107,25 @@ def query_unfulfilled_lines(cursor=None):
         }
       }
     }
-    """
-    variables = {"cursor": cursor}
-    response = requests.post(GRAPHQL_URL, headers=HEADERS, json={"query": query, "variables": variables}, timeout=20)
+    """ % (FULFILLMENT_ORDERS_PAGE, LINE_ITEMS_PAGE)
+    variables = {"cursor": cursor, "filter": order_filter}
+    response, data = get_client().graphql(GRAPHQL_URL, HEADERS, query, variables)
     
     if response.status_code != 200:
         print("Error:", response.text)
         return None
 
-    return response.json()
+    return data
 
 # --- Setup database ---
-def setup_db():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    # Create table if it doesn't exist — no DROP
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS unfulfilled_lines (
+UNFULFILLED_COLUMNS = [
+    "order_name", "order_id", "created_at", "fdm4_order_number",
+    "fulfillment_order_id", "assigned_location",
+    "line_item_id", "line_item_name", "sku",
+    "ordered_quantity", "quantity_assigned"
+]
+UNFULFILLED_TABLE_SQL = """
+        CREATE TABLE IF NOT EXISTS {table} (
             order_name TEXT,
             order_id TEXT,
             created_at TEXT,
@@ -95,51 +138,537 @@ def setup_db():
             ordered_quantity INTEGER,
             quantity_assigned INTEGER,
             PRIMARY KEY (order_id, line_item_id)
-        )
-    """)
-    conn.commit()
-    conn.close()
+        );
+"""
+MIGRATIONS = [
+    ("unfulfilled_lines_v1", UNFULFILLED_TABLE_SQL.format(table="unfulfilled_lines")),
+    ("sync_state_v1", """
+        CREATE TABLE IF NOT EXISTS sync_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """),
+]
 
-def clear_existing_data():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM unfulfilled_lines")
-    conn.commit()
-    conn.close()
-
-def insert_data(lines):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    for line in lines:
-        cursor.execute("""
-            INSERT OR REPLACE INTO unfulfilled_lines (
-                order_name, order_id, created_at, fdm4_order_number,
-                fulfillment_order_id, assigned_location,
-                line_item_id, line_item_name, sku,
-                ordered_quantity, quantity_assigned
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            line["Order Name"],
-            line["Order ID"],
-            line["Created At"],
-            line["FDM4 Order Number"],
-            line["Fulfillment Order ID"],
-            line["Assigned Location"],
-            line["Line Item ID"],
-            line["Line Item Name"],
-            line["SKU"],
-            line["Ordered Quantity"],
-            line["Quantity Assigned to Fulfillment"]
-        ))
+def setup_db():
+    # Create tables if they don't exist — no DROP
+    migrate(get_connection(DB_NAME), MIGRATIONS)
+
+def line_row(line):
+    return (
+        line["Order Name"],
+        line["Order ID"],
+        line["Created At"],
+        line["FDM4 Order Number"],
+        line["Fulfillment Order ID"],
+        line["Assigned Location"],
+        line["Line Item ID"],
+        line["Line Item Name"],
+        line["SKU"],
+        line["Ordered Quantity"],
+        line["Quantity Assigned to Fulfillment"]
+    )
+
+def insert_data(lines, table="unfulfilled_lines"):
+    conn = get_connection(DB_NAME)
+    with BatchWriter(conn, insert_sql(table, UNFULFILLED_COLUMNS, "INSERT OR REPLACE")) as writer:
+        writer.extend(line_row(line) for line in lines)
+
+def replace_order_lines(order_ids, lines):
+    # Delta upsert: every changed order's rows are rewritten as a unit, in one
+    # transaction, so lines that became fulfilled, cancelled, closed or
+    # refunded simply drop out and readers never see an order half written
+    conn = get_connection(DB_NAME)
+    with conn:
+        conn.executemany("DELETE FROM unfulfilled_lines WHERE order_id = ?", [(oid,) for oid in order_ids])
+        conn.executemany(insert_sql("unfulfilled_lines", UNFULFILLED_COLUMNS, "INSERT OR REPLACE"),
+                         [line_row(line) for line in lines])
+
+# --- Full crawl staging ---
+def start_staging():
+    conn = get_connection(DB_NAME)
+    conn.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+    conn.execute(UNFULFILLED_TABLE_SQL.format(table=STAGING_TABLE))
     conn.commit()
-    conn.close()
+
+def staging_exists():
+    conn = get_connection(DB_NAME)
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                        (STAGING_TABLE,)).fetchone() is not None
+
+def publish_staging():
+    replace_table(get_connection(DB_NAME), "unfulfilled_lines", STAGING_TABLE)
+
+# --- Sync watermark ---
+def load_sync_state():
+    conn = get_connection(DB_NAME)
+    return dict(conn.execute("SELECT key, value FROM sync_state").fetchall())
+
+def save_sync_state(**values):
+    conn = get_connection(DB_NAME)
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+            [(key, value) for key, value in values.items()]
+        )
+
+def utc_now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def full_reconcile_due(state):
+    if not state.get("watermark") or not state.get("last_full_sync"):
+        return True
+    last_full = datetime.strptime(state["last_full_sync"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - last_full >= timedelta(days=FULL_RECONCILE_DAYS)
+
+def run_incremental_sync(watermark):
+    since = datetime.strptime(watermark, "%Y-%m-%dT%H:%M:%SZ") - timedelta(minutes=WATERMARK_OVERLAP_MINUTES)
+    # No fulfillment_status filter here: orders that were just fulfilled or
+    # cancelled have to come back so their lines can be removed
+    order_filter = f"{ORDER_CREATED_FILTER} updated_at:>'{since.strftime('%Y-%m-%dT%H:%M:%SZ')}'"
+    print(f"[↩] Incremental sync since {watermark} (filter: {order_filter})")
+
+    started_at = utc_now()
+    high_water = watermark
+    cursor = None
+    total_orders = 0
+    total_lines = 0
+    has_next = True
+
+    while has_next:
+        data = query_unfulfilled_lines(cursor, order_filter)
+        if not data or "errors" in data or "data" not in data:
+            print("Incremental sync stopped, watermark left at", watermark, "-", (data or {}).get("errors"))
+            return False
+
+        orders = data["data"]["orders"]["edges"]
+        complete_truncated_orders([edge["node"] for edge in orders if is_truncated(edge["node"])])
+        changed_ids = []
+        batch_lines = []
+        for order_edge in orders:
+            order = order_edge["node"]
+            changed_ids.append(shopify_id(order["id"]))
+            batch_lines.extend(extract_order_lines(order))
+            high_water = max(high_water, order.get("updatedAt") or high_water)
+
+        replace_order_lines(changed_ids, batch_lines)
+        total_orders += len(orders)
+        total_lines += len(batch_lines)
+
+        has_next = data["data"]["orders"]["pageInfo"]["hasNextPage"]
+        if has_next:
+            cursor = orders[-1]["cursor"]
+
+    # Never move the mark past the moment this run started
+    save_sync_state(watermark=min(high_water, started_at) if total_orders else watermark)
+    print(f"[✓] Incremental sync: {total_orders} changed orders, {total_lines} open lines rewritten.")
+    return True
+
+# --- Order → unfulfilled line rows ---
+def extract_order_lines(order):
+    # Skip voided financial status
+    if order["displayFinancialStatus"].lower() == "voided":
+        return []
+
+    # Skip canceled orders
+    if order["cancelledAt"]:
+        return []
+
+    # Skip archived (closed) orders
+    if order["closedAt"]:
+        return []
+
+    # Skip fully or partially refunded orders
+    if order["displayFinancialStatus"].lower() in ["refunded", "partially_refunded"]:
+        return []
+
+    fdm4_order_number = None
+    meta = order.get("metafield")
+    if meta and meta.get("value"):
+        fdm4_order_number = meta["value"]
+
+    lines = []
+    gid_order = shopify_id(order["id"])
+    for fo_edge in order["fulfillmentOrders"]["edges"]:
+        fo = fo_edge["node"]
+        fo_id = shopify_id(fo["id"])
+        location = fo["assignedLocation"]
+        for li_edge in fo["lineItems"]["edges"]:
+            li = li_edge["node"]
+
+            # Skip fully fulfilled or removed lines
+            if li["remainingQuantity"] == 0:
+                continue
+
+            line_item = li["lineItem"]
+            line_item_id = shopify_id(line_item["id"])
+            lines.append({
+                "Order Name": order["name"],
+                "Order ID": gid_order,
+                "Created At": order["createdAt"],
+                "FDM4 Order Number": fdm4_order_number,
+                "Fulfillment Order ID": fo_id,
+                "Assigned Location": location["name"] if location else "N/A",
+                "Line Item ID": line_item_id,
+                "Line Item Name": line_item["name"],
+                "SKU": line_item["sku"],
+                "Ordered Quantity": line_item["quantity"],
+                "Quantity Assigned to Fulfillment": li["remainingQuantity"],
+            })
+    return lines
+
+# --- Follow-up paging for truncated nested connections ---
+LINE_ITEM_SELECTION = """
+          edges {
+            node {
+              id
+              lineItem {
+                id
+                name
+                sku
+                quantity
+              }
+              remainingQuantity
+            }
+          }
+          pageInfo {
+            hasNextPage
+            endCursor
+          }
+"""
+
+FULFILLMENT_ORDER_SELECTION = """
+      edges {
+        node {
+          id
+          assignedLocation {
+            name
+          }
+          lineItems(first: %d) {%s}
+        }
+      }
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+""" % (LINE_ITEMS_PAGE, LINE_ITEM_SELECTION)
+
+def is_truncated(order):
+    fulfillment_orders = order["fulfillmentOrders"]
+    if (fulfillment_orders.get("pageInfo") or {}).get("hasNextPage"):
+        return True
+    return any(
+        (fo_edge["node"]["lineItems"].get("pageInfo") or {}).get("hasNextPage")
+        for fo_edge in fulfillment_orders["edges"]
+    )
+
+def build_follow_up_query(requests_batch):
+    parts = []
+    for i, (kind, gid, after) in enumerate(requests_batch):
+        if kind == "order":
+            parts.append(f'''
+    o{i}: order(id: "{gid}") {{
+      id
+      fulfillmentOrders(first: {FULFILLMENT_ORDERS_PAGE}, after: "{after}") {{{FULFILLMENT_ORDER_SELECTION}}}
+    }}''')
+        else:
+            parts.append(f'''
+    f{i}: fulfillmentOrder(id: "{gid}") {{
+      id
+      lineItems(first: {FOLLOW_UP_LINE_ITEMS_PAGE}, after: "{after}") {{{LINE_ITEM_SELECTION}}}
+    }}''')
+    return "query {%s\n}" % "".join(parts)
+
+def is_throttled(errors):
+    return any((err.get("extensions") or {}).get("code") == "THROTTLED" for err in errors)
+
+def follow_up_page(query):
+    for attempt in range(FOLLOW_UP_ATTEMPTS):
+        data = graphql_post(query)
+        errors = (data or {}).get("errors") or []
+        if data and not errors and "data" in data:
+            return data
+        if not is_throttled(errors) or attempt == FOLLOW_UP_ATTEMPTS - 1:
+            break
+        cost = (data.get("extensions") or {}).get("cost") or {}
+        wait_for_budget(cost, float(cost.get("requestedQueryCost") or 0))
+    raise RuntimeError(f"Follow-up paging failed after {attempt + 1} attempt(s): "
+                       f"{errors or 'no data returned'}")
+
+def complete_truncated_orders(orders):
+    # Keep paging each overflowing connection from its own endCursor until
+    # nothing reports hasNextPage; the orders are extended in place
+    while True:
+        orders_by_id = {order["id"]: order for order in orders}
+        fulfillment_orders = {
+            fo_edge["node"]["id"]: fo_edge["node"]
+            for order in orders for fo_edge in order["fulfillmentOrders"]["edges"]
+        }
+        pending = [
+            ("order", order["id"], order["fulfillmentOrders"]["pageInfo"]["endCursor"])
+            for order in orders if (order["fulfillmentOrders"].get("pageInfo") or {}).get("hasNextPage")
+        ] + [
+            ("fulfillment_order", fo["id"], fo["lineItems"]["pageInfo"]["endCursor"])
+            for fo in fulfillment_orders.values() if (fo["lineItems"].get("pageInfo") or {}).get("hasNextPage")
+        ]
+        if not pending:
+            return orders
+
+        for start in range(0, len(pending), FOLLOW_UP_BATCH):
+            requests_batch = pending[start:start + FOLLOW_UP_BATCH]
+            data = follow_up_page(build_follow_up_query(requests_batch))
+            for i, (kind, gid, after) in enumerate(requests_batch):
+                if kind == "order":
+                    node = data["data"].get(f"o{i}")
+                    target = orders_by_id[gid]["fulfillmentOrders"]
+                else:
+                    node = data["data"].get(f"f{i}")
+                    target = fulfillment_orders[gid]["lineItems"]
+                if node is None:
+                    # Deleted since its page was fetched; keep what we have
+                    print(f"[!] {gid} no longer exists in Shopify, keeping it as fetched")
+                    target["pageInfo"] = {"hasNextPage": False, "endCursor": None}
+                    continue
+                page = node["fulfillmentOrders" if kind == "order" else "lineItems"]
+                target["edges"].extend(page["edges"])
+                target["pageInfo"] = page["pageInfo"]
+
+def collect_follow_ups(follow_ups, wait=False, table="unfulfilled_lines"):
+    # Insert lines for follow-up batches that have finished; with wait=True
+    # block until every outstanding batch is done. A failed batch raises here,
+    # before the caller saves a cursor past its page.
+    remaining = []
+    inserted = 0
+    for future in follow_ups:
+        if not wait and not future.done():
+            remaining.append(future)
+            continue
+        lines = [line for order in future.result() for line in extract_order_lines(order)]
+        insert_data(lines, table)
+        inserted += len(lines)
+    return remaining, inserted
+
+# --- Bulk Operations export ---
+# Same selection as query_unfulfilled_lines, without page sizes: Shopify runs it
+# server-side and hands back one JSONL file where each nested node is its own
+# line tagged with the __parentId of the node above it.
+BULK_ORDERS_QUERY = """
+{
+  orders(query: "%s") {
+    edges {
+      node {
+        id
+        name
+        createdAt
+        updatedAt
+        cancelledAt
+        closedAt
+        displayFinancialStatus
+        metafield(namespace: "FDM4", key: "fdm4_order_number") {
+          value
+        }
+        fulfillmentOrders {
+          edges {
+            node {
+              id
+              assignedLocation {
+                name
+              }
+              lineItems {
+                edges {
+                  node {
+                    id
+                    lineItem {
+                      id
+                      name
+                      sku
+                      quantity
+                    }
+                    remainingQuantity
+                  }
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+def graphql_post(query, variables=None, endpoint=None):
+    response, data = get_client().graphql(endpoint or GRAPHQL_URL, HEADERS, query, variables or {})
+    if response.status_code != 200:
+        print("Error:", response.text)
+        return None
+    return data
+
+def submit_bulk_query(order_filter=ORDER_FILTER, endpoint=None):
+    mutation = """
+    mutation ($query: String!) {
+      bulkOperationRunQuery(query: $query) {
+        bulkOperation {
+          id
+          status
+        }
+        userErrors {
+          field
+          message
+        }
+      }
+    }
+    """
+    bulk_query = BULK_ORDERS_QUERY % order_filter.replace('"', '\\"')
+    data = graphql_post(mutation, {"query": bulk_query}, endpoint)
+    if not data or "errors" in data:
+        print("Bulk submit failed:", data)
+        return None
+
+    result = data["data"]["bulkOperationRunQuery"]
+    if result["userErrors"]:
+        print("Bulk submit user errors:", result["userErrors"])
+        return None
+
+    operation = result["bulkOperation"]
+    print(f"[→] Bulk operation submitted: {operation['id']} ({operation['status']})")
+    return operation["id"]
+
+def poll_bulk_operation(endpoint=None, poll_seconds=BULK_POLL_SECONDS):
+    query = """
+    query {
+      currentBulkOperation {
+        id
+        status
+        errorCode
+        objectCount
+        url
+        partialDataUrl
+      }
+    }
+    """
+    while True:
+        data = graphql_post(query, endpoint=endpoint)
+        operation = (data or {}).get("data", {}).get("currentBulkOperation")
+        if not operation:
+            print("No bulk operation found:", data)
+            return None
+
+        print(f"[…] Bulk operation {operation['status']}: {operation['objectCount']} objects")
+        if operation["status"] == "COMPLETED":
+            return operation
+        if operation["status"] in ("FAILED", "CANCELED", "EXPIRED"):
+            print(f"[X] Bulk operation ended {operation['status']} ({operation['errorCode']})")
+            return None
+        time.sleep(poll_seconds)
+
+def stream_bulk_lines(url):
+    with get_client().get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        for raw in response.iter_lines():
+            if raw:
+                yield json.loads(raw)
+
+def assemble_bulk_orders(records, stats=None):
+    # Bulk JSONL lists every child after its parent, and in practice finishes
+    # an order's subtree before the next order starts, so only the order being
+    # assembled is held whole. Shopify only promises parent-before-child,
+    # though: every order and fulfillment order seen keeps a small header, and
+    # a child that arrives after its order was yielded comes out as a partial
+    # order holding just that child (its line rows upsert like any other).
+    # Records whose parent never appeared are counted in stats["orphans"].
+    # The rebuilt dict matches the paged response shape.
+    if stats is None:
+        stats = {}
+    stats.update(orders=0, late=0, orphans=0)
+    order = None
+    fulfillment_orders = {}  # the current order's, with their line items
+    order_headers = {}       # every order: its fields without children
+    fo_headers = {}          # every fulfillment order: (order id, fields without children)
+    for record in records:
+        parent_id = record.pop("__parentId", None)
+        if parent_id is None:
+            if order is not None:
+                yield order
+            order = record
+            order_headers[order["id"]] = dict(order)
+            order["fulfillmentOrders"] = {"edges": []}
+            fulfillment_orders = {}
+            stats["orders"] += 1
+        elif parent_id in fulfillment_orders:
+            fulfillment_orders[parent_id]["lineItems"]["edges"].append({"node": record})
+        elif order is not None and parent_id == order["id"]:
+            fo_headers[record["id"]] = (parent_id, dict(record))
+            record["lineItems"] = {"edges": []}
+            fulfillment_orders[record["id"]] = record
+            order["fulfillmentOrders"]["edges"].append({"node": record})
+        elif parent_id in fo_headers:
+            order_id, fo = fo_headers[parent_id]
+            stats["late"] += 1
+            yield dict(order_headers[order_id], fulfillmentOrders={"edges": [
+                {"node": dict(fo, lineItems={"edges": [{"node": record}]})}
+            ]})
+        elif parent_id in order_headers:
+            fo_headers[record["id"]] = (parent_id, dict(record))
+            stats["late"] += 1
+        else:
+            print(f"[!] Orphan bulk record {record.get('id')} (parent {parent_id})")
+            stats["orphans"] += 1
+    if order is not None:
+        yield order
+
+def run_bulk_export(endpoint=None, poll_seconds=BULK_POLL_SECONDS):
+    if not submit_bulk_query(endpoint=endpoint):
+        return False
+
+    operation = poll_bulk_operation(endpoint, poll_seconds)
+    if not operation:
+        return False
+
+    # Loaded into the staging table and swapped in only once the whole result
+    # is parsed, so a failed download leaves unfulfilled_lines as it was
+    start_staging()
+    if not operation["url"]:
+        publish_staging()
+        print("[✓] Bulk operation returned no orders.")
+        return True
+
+    total_lines = 0
+    pending = []
+    stats = {}
+    for order in assemble_bulk_orders(stream_bulk_lines(operation["url"]), stats):
+        pending.extend(extract_order_lines(order))
+        if len(pending) >= BULK_INSERT_CHUNK:
+            insert_data(pending, STAGING_TABLE)
+            total_lines += len(pending)
+            pending = []
+    if pending:
+        insert_data(pending, STAGING_TABLE)
+        total_lines += len(pending)
+
+    if stats["orphans"]:
+        print(f"[X] {stats['orphans']} bulk records had no parent in the result; unfulfilled_lines left as it was.")
+        return False
+    publish_staging()
+
+    print(f"\n[✓] Inserted total of {total_lines} line items into DB.")
+    print(f"[✓] Total orders processed: {stats['orders']} ({stats['late']} records arrived after their order)")
+    return True
 
 # --- Cursor file management ---
 def save_cursor(cursor_value):
     with open(CURSOR_FILE, "w") as f:
         f.write(cursor_value)
 
+def save_completed_cursor(unsaved_cursors, outstanding):
+    # Saves the newest cursor whose page and earlier pages have no follow-up
+    # still outstanding, and drops it and the ones before it from the list
+    saved = None
+    while unsaved_cursors and unsaved_cursors[0][1] not in outstanding:
+        saved = unsaved_cursors.pop(0)[0]
+    if saved:
+        save_cursor(saved)
+
 def load_cursor():
     if os.path.exists(CURSOR_FILE):
         with open(CURSOR_FILE, "r") as f:
@@ -155,17 +684,35 @@ def clear_cursor():
 def main():
     setup_db()
 
-    cursor = load_cursor()
-    if not cursor:
-        print("[↩] No existing cursor — starting fresh and clearing table.")
-        clear_existing_data()
-    else:
-        print(f"[↩] Existing cursor found: {cursor} — continuing without clearing existing rows.")
+    if SYNC_MODE == "bulk":
+        print("[↩] Bulk export mode — cursor file not used.")
+        started_at = utc_now()
+        if run_bulk_export():
+            save_sync_state(watermark=started_at, last_full_sync=started_at)
+        return
+
+    if SYNC_MODE == "incremental":
+        state = load_sync_state()
+        if not full_reconcile_due(state) and not load_cursor():
+            run_incremental_sync(state["watermark"])
+            return
+        print(f"[↩] Full reconcile due (last full sync: {state.get('last_full_sync') or 'never'}).")
 
     if RESET_CURSOR:
+        clear_cursor()
+        print("[↩] Cursor reset requested — starting from the beginning.")
+
+    cursor = load_cursor()
+    if cursor and not staging_exists():
+        print(f"[!] Cursor {cursor} has no {STAGING_TABLE} table to resume into — starting fresh.")
         clear_cursor()
         cursor = None
-        print("[↩] Cursor reset requested — table cleared and starting from beginning.")
+    if not cursor:
+        print(f"[↩] No existing cursor — starting fresh into {STAGING_TABLE}.")
+        start_staging()
+        save_sync_state(full_started_at=utc_now())
+    else:
+        print(f"[↩] Existing cursor found: {cursor} — continuing the crawl in {STAGING_TABLE}.")
 
     if cursor:
         print(f"[↩] Resuming from saved cursor: {cursor}")
@@ -176,6 +723,13 @@ def main():
     total_orders = 0
     total_lines = 0
     has_next = True
+    completed = False
+    executor = ThreadPoolExecutor(max_workers=FOLLOW_UP_WORKERS)
+    follow_ups = []
+    # (cursor after a page, that page's follow-up batch or None); a cursor is
+    # only saved once its page and every page before it are fully inserted,
+    # so a resumed crawl never skips lines still being paged in the background
+    unsaved_cursors = []
 
     while has_next:
         print(f"\n[Batch {page_count}] Fetching orders...")
@@ -199,80 +753,59 @@ def main():
 
         lines_in_batch = 0
         batch_lines = []
+        truncated = []
 
         for order_edge in orders:
-            order = order_edge["node"]
-
-            # Skip voided financial status
-            if order["displayFinancialStatus"].lower() == "voided":
-                continue
-
-            # Skip canceled orders
-            if order["cancelledAt"]:
+            if is_truncated(order_edge["node"]):
+                truncated.append(order_edge["node"])
                 continue
+            order_lines = extract_order_lines(order_edge["node"])
+            batch_lines.extend(order_lines)
+            lines_in_batch += len(order_lines)
 
-            # Skip archived (closed) orders
-            if order["closedAt"]:
-                continue
-
-            # Skip fully or partially refunded orders
-            if order["displayFinancialStatus"].lower() in ["refunded", "partially_refunded"]:
-                continue
-
-            fdm4_order_number = None
-            meta = order.get("metafield")
-            if meta and meta.get("value"):
-                fdm4_order_number = meta["value"]
-
-            gid_order = order["id"].split("/")[-1]
-            for fo_edge in order["fulfillmentOrders"]["edges"]:
-                fo = fo_edge["node"]
-                fo_id = fo["id"].split("/")[-1]
-                location = fo["assignedLocation"]
-                for li_edge in fo["lineItems"]["edges"]:
-                    li = li_edge["node"]
-
-                    # Skip fully fulfilled or removed lines
-                    if li["remainingQuantity"] == 0:
-                        continue
-
-                    line_item = li["lineItem"]
-                    line_item_id = line_item["id"].split("/")[-1]
-                    batch_lines.append({
-                        "Order Name": order["name"],
-                        "Order ID": gid_order,
-                        "Created At": order["createdAt"],
-                        "FDM4 Order Number": fdm4_order_number,
-                        "Fulfillment Order ID": fo_id,
-                        "Assigned Location": location["name"] if location else "N/A",
-                        "Line Item ID": line_item_id,
-                        "Line Item Name": line_item["name"],
-                        "SKU": line_item["sku"],
-                        "Ordered Quantity": line_item["quantity"],
-                        "Quantity Assigned to Fulfillment": li["remainingQuantity"],
-                    })
-                    lines_in_batch += 1
+        # Overflowing orders finish in the background while the next page loads
+        page_follow_up = executor.submit(complete_truncated_orders, truncated) if truncated else None
+        if page_follow_up:
+            follow_ups.append(page_follow_up)
+        follow_ups, follow_up_lines = collect_follow_ups(follow_ups, table=STAGING_TABLE)
+        lines_in_batch += follow_up_lines
 
         total_lines += lines_in_batch
 
         # Insert batch immediately
-        insert_data(batch_lines)
+        insert_data(batch_lines, STAGING_TABLE)
 
-        print(f"[Batch {page_count}] Orders: {num_orders_in_batch}, Lines this batch: {lines_in_batch}, Total lines so far: {total_lines}")
+        print(f"[Batch {page_count}] Orders: {num_orders_in_batch}, Truncated: {len(truncated)}, Lines this batch: {lines_in_batch}, Total lines so far: {total_lines}")
 
         has_next = data["data"]["orders"]["pageInfo"]["hasNextPage"]
         if has_next:
             cursor = orders[-1]["cursor"]
-            save_cursor(cursor)
+            unsaved_cursors.append((cursor, page_follow_up))
+            save_completed_cursor(unsaved_cursors, follow_ups)
             page_count += 1
         else:
             # Remove cursor file on completion
             if os.path.exists(CURSOR_FILE):
                 os.remove(CURSOR_FILE)
             print("\n[✓] All pages completed. Cursor file cleared.")
+            completed = True
+
+    follow_ups, follow_up_lines = collect_follow_ups(follow_ups, wait=True, table=STAGING_TABLE)
+    executor.shutdown()
+    total_lines += follow_up_lines
+    if not completed:
+        save_completed_cursor(unsaved_cursors, follow_ups)
+
+    if completed:
+        publish_staging()
+        print(f"[✓] {STAGING_TABLE} swapped in as unfulfilled_lines.")
+        # A completed crawl reflects Shopify as of when it started
+        started_at = load_sync_state().get("full_started_at") or utc_now()
+        save_sync_state(watermark=started_at, last_full_sync=started_at)
 
     print(f"\n[✓] Inserted total of {total_lines} line items into DB.")
     print(f"[✓] Total orders processed: {total_orders}")
 
 if __name__ == "__main__":
     main()
+    get_client().print_metrics()
@@ -1,14 +1,18 @@
-import sqlite3
 import json
+from _SQLITE_STORAGE import BatchWriter, bump_snapshot, insert_sql, migrate
+from _DB_BUILDS import DatabaseBuild
+from _RECON_KEYS import shopify_id
+from _EXPLORER_QUERIES import SHOPIFY_ORDERS, create_indexes
 
 DB_PATH = r"C:\Users\andrew.beattie\AppData\Local\Programs\Python\Python313\Lib\Projects_2\mad_recon.db"
 
-def parse_and_store_shopify_json():
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    # Create parsed table (one row per location per order)
-    cur.execute('''
+PARSED_COLUMNS = [
+    "shopify_order_id", "order_name", "financial_status",
+    "fulfillment_status", "fulfillment_location", "timestamp"
+]
+PARSED_ORDERS_MIGRATIONS = [
+    # Parsed table (one row per location per order)
+    ("shopify_parsed_orders_v1", '''
     CREATE TABLE IF NOT EXISTS shopify_parsed_orders (
         shopify_order_id TEXT,
         order_name TEXT,
@@ -16,44 +20,77 @@ def parse_and_store_shopify_json():
         fulfillment_status TEXT,
         fulfillment_location TEXT,
         timestamp TEXT
-    )
-    ''')
-
-    # Read from raw shopify table
-    cur.execute("SELECT id, timestamp, raw_json FROM shopify_orders")
-    rows = cur.fetchall()
-
-    for shopify_id, timestamp, json_data in rows:
-        try:
-            parsed = json.loads(json_data)
-            gid = parsed.get("id", "")
-            order_id = gid.split("/")[-1] if "gid://" in gid else gid
-            order_name = parsed.get("name", "")
-            financial_status = parsed.get("displayFinancialStatus", "")
-            fulfillments = parsed.get("fulfillments", [])
-
-            if not fulfillments:
-                # Insert a single row if no fulfillments exist
-                cur.execute('''
-                    INSERT INTO shopify_parsed_orders
-                    (shopify_order_id, order_name, financial_status, fulfillment_status, fulfillment_location, timestamp)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (order_id, order_name, financial_status, None, None, timestamp))
-            else:
-                for f in fulfillments:
-                    fulfillment_status = f.get("status")
-                    location_name = f.get("location", {}).get("name", "")
-                    cur.execute('''
-                        INSERT INTO shopify_parsed_orders
-                        (shopify_order_id, order_name, financial_status, fulfillment_status, fulfillment_location, timestamp)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (order_id, order_name, financial_status, fulfillment_status, location_name, timestamp))
-
-        except Exception as e:
-            print(f"[!] Failed to parse row for {shopify_id}: {e}")
-
-    conn.commit()
-    conn.close()
+    );
+    '''),
+    # Re-parsing deletes per order; without this every delete scans the table
+    ("shopify_parsed_orders_order_idx", '''
+    CREATE INDEX IF NOT EXISTS idx_shopify_parsed_orders_order ON shopify_parsed_orders (shopify_order_id);
+    '''),
+    # Sort key and sidebar filters of the Shopify explorer tab
+    ("shopify_parsed_orders_explorer_idx", lambda conn: create_indexes(conn, SHOPIFY_ORDERS)),
+]
+INSERT_PARSED_SQL = insert_sql("shopify_parsed_orders", PARSED_COLUMNS)
+
+
+def parsed_order_rows(json_data, timestamp):
+    parsed = json.loads(json_data)
+    order_id = shopify_id(parsed.get("id", ""))
+    order_name = parsed.get("name", "")
+    financial_status = parsed.get("displayFinancialStatus", "")
+    fulfillments = parsed.get("fulfillments", [])
+
+    if not fulfillments:
+        # A single row if no fulfillments exist
+        return [(order_id, order_name, financial_status, None, None, timestamp)]
+    return [
+        (order_id, order_name, financial_status, f.get("status"), f.get("location", {}).get("name", ""), timestamp)
+        for f in fulfillments
+    ]
+
+
+def reparse_orders(conn, gids):
+    # Replaces the parsed rows of the given orders from shopify_orders; orders
+    # without a payload (missing in Shopify, or evicted) just lose theirs.
+    # Returns the number of orders parsed.
+    with conn:
+        conn.executemany(
+            "DELETE FROM shopify_parsed_orders WHERE shopify_order_id = ?",
+            [(shopify_id(gid),) for gid in gids]
+        )
+    rows = conn.execute(
+        "SELECT id, timestamp, raw_json FROM shopify_orders WHERE raw_json IS NOT NULL "
+        "AND id IN (SELECT value FROM json_each(?))",
+        (json.dumps(list(gids)),)
+    ).fetchall()
+
+    parsed_count = 0
+    with BatchWriter(conn, INSERT_PARSED_SQL) as writer:
+        for gid, ts, raw_json in rows:
+            try:
+                writer.extend(parsed_order_rows(raw_json, ts))
+                parsed_count += 1
+            except Exception as e:
+                print(f"[!] Failed to parse row for {gid}: {e}")
+    return parsed_count
+
+
+def parse_and_store_shopify_json():
+    # Written into a new build of the database, swapped in once complete
+    with DatabaseBuild(DB_PATH, "parse_shop_response", required_tables=["shopify_parsed_orders"]) as conn:
+        migrate(conn, PARSED_ORDERS_MIGRATIONS)
+
+        # Read from raw shopify table
+        # Rows cached as missing in Shopify carry no payload
+        rows = conn.execute("SELECT id, timestamp, raw_json FROM shopify_orders WHERE raw_json IS NOT NULL")
+
+        with BatchWriter(conn, INSERT_PARSED_SQL) as writer:
+            for shopify_id, timestamp, json_data in rows:
+                try:
+                    writer.extend(parsed_order_rows(json_data, timestamp))
+                except Exception as e:
+                    print(f"[!] Failed to parse row for {shopify_id}: {e}")
+
+        bump_snapshot(conn, "parse_shop_response")
     print("[✓] Parsed Shopify data saved to shopify_parsed_orders table.")
 
 if __name__ == "__main__":
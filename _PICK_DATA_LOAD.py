@@ -1,42 +1,35 @@
-import sqlite3
-import pandas as pd
+from _SQLITE_STORAGE import bump_snapshot
+from _DB_BUILDS import DatabaseBuild
+from _CSV_INGEST import PICK_REPORT, ingest_csv
+from _PICK_RECON_TABLES import ERP_TABLE, build_recon_tables, export_queries
+from _EXPORT_ARTIFACTS import write_exports
+from _RECON_KEYS import PICKED_KEYS, KeyIds, normalize_lines
 
 # === CONFIG ===
 CSV_PATH = r"C:\Users\andrew.beattie\AppData\Local\Programs\Python\Python313\Lib\Projects_2\shop_erp_recon\aging_orders\pick_aging_report.csv"
 DB_PATH = r"C:\Users\andrew.beattie\AppData\Local\Programs\Python\Python313\Lib\Projects_2\shop_erp_recon\aging_orders\pick_aging.db"
 TABLE_NAME = "picked_aging_report"
 
-# === Load and prepare data ===
-df = pd.read_csv(CSV_PATH)
-
-# Select and rename columns
-df = df[[ 
-    "Order Id", 
-    "Order Name", 
-    "Product Id", 
-    "Location Id", 
-    "Order Shipment Line Units in Status"
-]].copy()
-
-df.rename(columns={
-    "Order Id": "order_id",
-    "Order Name": "order_name",
-    "Product Id": "product_id",
-    "Location Id": "location_id",
-    "Order Shipment Line Units in Status": "order_shipment_line_units"
-}, inplace=True)
-
 # === Load into SQLite ===
-conn = sqlite3.connect(DB_PATH)
-cursor = conn.cursor()
-
-# Drop table if exists
-cursor.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
-
-# Save new table
-df.to_sql(TABLE_NAME, conn, index=False)
-
-conn.commit()
-conn.close()
-
-print(f"[✓] Loaded data into table: {TABLE_NAME}")
+# Everything goes into a new build of pick_aging.db that replaces the one
+# app.py reads only once it is complete and checked (see _DB_BUILDS)
+with DatabaseBuild(DB_PATH, "pick_data_load", required_tables=[TABLE_NAME]) as conn:
+    # Streamed in typed chunks (see _CSV_INGEST.PICK_REPORT) with canonical
+    # order/SKU/location/quantity values plus their interned ids
+    cursor = conn.cursor()
+    key_ids = KeyIds(conn)
+    ingest_csv(conn, CSV_PATH, PICK_REPORT, TABLE_NAME,
+               transform=lambda chunk: normalize_lines(conn, chunk, PICKED_KEYS, key_ids))
+    print(f"[✓] Loaded data into table: {TABLE_NAME}")
+
+    # Rebuild the materialized reconciliation tables against the new picked lines
+    built = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (ERP_TABLE,)).fetchone()
+    if built:
+        counts = build_recon_tables(conn)
+        print(f"[✓] Materialized {len(counts)} reconciliation tables")
+
+    # Tell the dashboards their cached results are stale, then write the new
+    # snapshot's download files
+    snapshot_id = bump_snapshot(conn, "pick_data_load")
+    if built:
+        write_exports(conn, DB_PATH, snapshot_id, export_queries(conn))
@@ -0,0 +1,253 @@
+import sqlite3
+import pandas as pd
+from datetime import datetime
+from _RECON_ENGINE import (PICKED_TABLE, ERP_TABLE, CLASSIFIED_TABLE, ORDER_COLUMNS, load_inputs, classify,
+                           write_classified, order_keys, order_digests)
+from _RECON_KEYS import KEY_COLUMNS, PICKED_KEYS, ERP_KEYS, fill_missing_keys
+from _SUMMARY_TABLES import RECON_SUMMARY, fold_into_summary, rebuild_summary
+
+# === CONFIGURATION ===
+# The pick_aging.db views stack on each other (..._remaining_open ->
+# ..._not_fully_matched -> ..._exists_in_erp -> ..._merged_with_erp), so every
+# read re-runs the whole LEFT JOIN. After each load _RECON_ENGINE classifies
+# every pick line into all buckets in one pass and writes recon_classified;
+# every view is then written out from it as a plain table named mat_<view>
+# with identical columns and rows. Later loads only reclassify the orders whose
+# pick or ERP lines changed since the last build. summary_recon (lines, orders
+# and units per bucket and location, see _SUMMARY_TABLES) moves with them.
+REFRESH_TABLE = "materialized_refresh"
+# Per-order content digests of the lines the tables were last built from
+DIGEST_TABLE = "recon_order_digests"
+DELTA_TABLE = "recon_classified_delta"
+TS_FORMAT = "%Y%m%d_%H%M%S"
+
+# view name -> recon_classified flag column (None for every row)
+MATERIALIZED_VIEWS = {
+    "picked_aging_merged_with_erp": None,
+    "picked_aging_merged_exists_in_erp": "flag_exists_in_erp",
+    "picked_aging_merged_missing_in_erp": "flag_missing_in_erp",
+    "picked_aging_merged_fully_matched": "flag_fully_matched",
+    "picked_aging_merged_not_fully_matched": "flag_not_fully_matched",
+    "picked_aging_partial_shipped_only": "flag_partial_shipped_only",
+    "picked_aging_fully_canceled": "flag_fully_canceled",
+    "picked_aging_shipped_plus_canceled_matches": "flag_shipped_plus_canceled_matches",
+    "picked_aging_remaining_open": "flag_remaining_open",
+    "matching_erp_lines": "flag_fully_matched",
+    "missing_erp_lines": "flag_missing_exact_pick",
+    "missing_erp_lines_relaxed": "flag_relaxed",
+    "missing_erp_lines_fully_shipped": "flag_relaxed_fully_shipped",
+    "missing_erp_lines_partial_shipped": "flag_relaxed_partial_shipped",
+    "missing_erp_lines_fully_canceled": "flag_relaxed_fully_canceled",
+    "missing_erp_lines_still_open": "flag_relaxed_still_open",
+}
+# Views that only carry the picked line's columns
+PICKED_ONLY_VIEWS = {"missing_erp_lines"}
+
+INDEXES = [
+    f"CREATE INDEX IF NOT EXISTS idx_{ERP_TABLE}_order_item_wh ON {ERP_TABLE} (CustOrderNum, ItemNumber, Warehouse)",
+    f"CREATE INDEX IF NOT EXISTS idx_{PICKED_TABLE}_order_item_loc ON {PICKED_TABLE} (order_name, product_id, location_id)",
+]
+
+
+def materialized_name(view_name):
+    return f"mat_{view_name}"
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _line_columns(conn, table):
+    # Source columns shown in the mat_ tables; interned ids stay internal
+    return [c for c in _columns(conn, table) if c not in KEY_COLUMNS.values()]
+
+
+def _ensure_state_tables(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {REFRESH_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            source_view TEXT,
+            refreshed_at TEXT,
+            row_count INTEGER
+        )
+    """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DIGEST_TABLE} (
+            source TEXT,
+            order_key TEXT,
+            digest INTEGER,
+            PRIMARY KEY (source, order_key)
+        )
+    """)
+
+
+def _stored_digests(conn, source):
+    return pd.read_sql_query(
+        f"SELECT order_key, digest FROM {DIGEST_TABLE} WHERE source = ?", conn, params=(source,), index_col="order_key"
+    )["digest"]
+
+
+def changed_orders(conn, picked, erp):
+    # Order numbers whose pick or ERP lines differ from the last build, plus
+    # the current per-source digests to record once the build is committed
+    current = {table: order_digests(df, ORDER_COLUMNS[table])
+               for table, df in ((PICKED_TABLE, picked), (ERP_TABLE, erp))}
+    changed = set()
+    for table, digests in current.items():
+        both = pd.concat([digests.astype("Int64").rename("current"),
+                          _stored_digests(conn, table).astype("Int64").rename("stored")], axis=1)
+        changed.update(both.index[both["current"].ne(both["stored"]).fillna(True).to_numpy(dtype=bool)])
+    return changed, current
+
+
+def _order_filter(changed, column="order_name"):
+    clause = f"{column} IN (SELECT order_key FROM temp.recon_changed_orders)"
+    return f"({clause} OR {column} IS NULL)" if "" in changed else clause
+
+
+def _record_digests(conn, current, changed=None):
+    for table, digests in current.items():
+        if changed is None:
+            conn.execute(f"DELETE FROM {DIGEST_TABLE} WHERE source = ?", (table,))
+        else:
+            conn.executemany(f"DELETE FROM {DIGEST_TABLE} WHERE source = ? AND order_key = ?",
+                             [(table, key) for key in changed])
+            digests = digests[digests.index.isin(changed)]
+        conn.executemany(f"INSERT INTO {DIGEST_TABLE} (source, order_key, digest) VALUES (?, ?, ?)",
+                         zip([table] * len(digests), digests.index, digests.tolist()))
+
+
+def _record_refresh(conn, table, view_name, refreshed_at, row_count):
+    conn.execute(
+        f"INSERT OR REPLACE INTO {REFRESH_TABLE} (table_name, source_view, refreshed_at, row_count) "
+        "VALUES (?, ?, ?, ?)",
+        (table, view_name, refreshed_at, row_count)
+    )
+
+
+def _is_built(conn, picked, erp):
+    # Every table exists and recon_classified was built from the sources' current columns
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    needed = {CLASSIFIED_TABLE, REFRESH_TABLE, DIGEST_TABLE, RECON_SUMMARY.table} \
+        | {materialized_name(v) for v in MATERIALIZED_VIEWS}
+    if not needed <= names or conn.execute(f"SELECT 1 FROM {DIGEST_TABLE} LIMIT 1").fetchone() is None:
+        return False
+    expected = set(picked.columns) | {f"erp_{c}" if c in KEY_COLUMNS.values() else c for c in erp.columns}
+    built = {c for c in _columns(conn, CLASSIFIED_TABLE)
+             if c not in ("pick_line_id", "bucket") and not c.startswith("flag_")}
+    return built == expected
+
+
+def build_recon_tables(conn, refreshed_at=None, incremental=True):
+    # Brings recon_classified and every mat_ table up to date in one
+    # transaction, so readers on WAL see either the previous refresh or this
+    # one, never a mix. After the first build only orders whose lines changed
+    # are reclassified and swapped; incremental=False rebuilds everything.
+    # Returns {table: rows}.
+    refreshed_at = refreshed_at or datetime.now().strftime(TS_FORMAT)
+    fill_missing_keys(conn, PICKED_TABLE, PICKED_KEYS)
+    fill_missing_keys(conn, ERP_TABLE, ERP_KEYS)
+    for sql in INDEXES:
+        conn.execute(sql)
+    _ensure_state_tables(conn)
+    conn.commit()
+
+    picked, erp = load_inputs(conn)
+    changed, current = changed_orders(conn, picked, erp)
+    if incremental and _is_built(conn, picked, erp):
+        return _apply_changes(conn, picked, erp, changed, current, refreshed_at)
+
+    write_classified(conn, classify(picked, erp))
+    picked_columns = _line_columns(conn, PICKED_TABLE)
+    line_columns = picked_columns + _line_columns(conn, ERP_TABLE)
+
+    counts = {}
+    conn.execute("BEGIN")
+    try:
+        for view_name, flag in MATERIALIZED_VIEWS.items():
+            table = materialized_name(view_name)
+            wanted = picked_columns if view_name in PICKED_ONLY_VIEWS else line_columns
+            columns = ", ".join(f'"{c}"' for c in wanted)
+            where = f"WHERE {flag} = 1" if flag else ""
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"CREATE TABLE {table} AS SELECT {columns} FROM {CLASSIFIED_TABLE} {where}")
+            conn.execute(f"CREATE INDEX idx_{table}_order ON {table} (order_name)")
+            counts[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            _record_refresh(conn, table, view_name, refreshed_at, counts[table])
+        rebuild_summary(conn, RECON_SUMMARY)
+        _record_digests(conn, current)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    print(f"[✓] Reconciliation rebuilt from scratch ({len(picked)} pick lines, {len(erp)} ERP lines)")
+    return counts
+
+
+def _apply_changes(conn, picked, erp, changed, current, refreshed_at):
+    # Reclassifies only the changed orders into a staging table, then swaps
+    # their rows in recon_classified and every mat_ table
+    picked = picked[order_keys(picked, ORDER_COLUMNS[PICKED_TABLE]).isin(changed).to_numpy()]
+    erp = erp[order_keys(erp, ORDER_COLUMNS[ERP_TABLE]).isin(changed).to_numpy()]
+    first_line_id = conn.execute(f"SELECT COALESCE(MAX(pick_line_id), -1) + 1 FROM {CLASSIFIED_TABLE}").fetchone()[0]
+    delta = classify(picked, erp, first_line_id)
+    delta.to_sql(DELTA_TABLE, conn, if_exists="replace", index=False)
+
+    conn.execute("DROP TABLE IF EXISTS temp.recon_changed_orders")
+    conn.execute("CREATE TEMP TABLE recon_changed_orders (order_key TEXT PRIMARY KEY)")
+    conn.executemany("INSERT INTO temp.recon_changed_orders (order_key) VALUES (?)", [(key,) for key in changed])
+    conn.commit()
+
+    picked_columns = _line_columns(conn, PICKED_TABLE)
+    line_columns = picked_columns + _line_columns(conn, ERP_TABLE)
+    classified_columns = ", ".join(f'"{c}"' for c in _columns(conn, CLASSIFIED_TABLE))
+
+    counts = {}
+    conn.execute("BEGIN")
+    try:
+        fold_into_summary(conn, RECON_SUMMARY, _order_filter(changed), sign=-1)
+        conn.execute(f"DELETE FROM {CLASSIFIED_TABLE} WHERE {_order_filter(changed)}")
+        conn.execute(f"INSERT INTO {CLASSIFIED_TABLE} ({classified_columns}) SELECT {classified_columns} FROM {DELTA_TABLE}")
+        fold_into_summary(conn, RECON_SUMMARY, source=DELTA_TABLE)
+        for view_name, flag in MATERIALIZED_VIEWS.items():
+            table = materialized_name(view_name)
+            wanted = picked_columns if view_name in PICKED_ONLY_VIEWS else line_columns
+            columns = ", ".join(f'"{c}"' for c in wanted)
+            where = f"WHERE {flag} = 1" if flag else ""
+            deleted = conn.execute(f"DELETE FROM {table} WHERE {_order_filter(changed)}").rowcount
+            inserted = conn.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {DELTA_TABLE} {where}").rowcount
+            previous = refresh_info(conn, table)[1]
+            counts[table] = previous - deleted + inserted
+            _record_refresh(conn, table, view_name, refreshed_at, counts[table])
+        _record_digests(conn, current, changed)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute(f"DROP TABLE IF EXISTS {DELTA_TABLE}")
+        conn.execute("DROP TABLE IF EXISTS temp.recon_changed_orders")
+        conn.commit()
+    print(f"[✓] Reconciliation updated for {len(changed)} changed orders ({len(delta)} lines reclassified)")
+    return counts
+
+
+def export_queries(conn):
+    # view name -> SELECT of the rows the dashboard downloads for it; the view
+    # of every pick line is read from recon_classified to carry the bucket
+    queries = {view_name: f"SELECT * FROM {materialized_name(view_name)}" for view_name in MATERIALIZED_VIEWS}
+    for view_name, flag in MATERIALIZED_VIEWS.items():
+        if flag is None:
+            columns = ", ".join(f'"{c}"' for c in _columns(conn, materialized_name(view_name)))
+            queries[view_name] = f"SELECT {columns}, bucket FROM {CLASSIFIED_TABLE}"
+    return queries
+
+
+def refresh_info(conn, table):
+    # (refreshed_at, row_count) for a mat_ table, or None before the first build
+    try:
+        return conn.execute(
+            f"SELECT refreshed_at, row_count FROM {REFRESH_TABLE} WHERE table_name = ?", (table,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+from _SQLITE_STORAGE import connect, current_snapshot
+from _DB_BUILDS import current_db
+
+# === CONFIGURATION ===
+# A dashboard process holds one QueryCache per database: a single read-only
+# connection shared by every session, and an LRU of query results keyed on
+# (pipeline snapshot id, query, arguments). Reruns that repeat a query are
+# answered from memory; a loader's bump_snapshot makes the next rerun drop
+# every result, so new data shows up right after a load. When a loader
+# publishes a new build (see _DB_BUILDS) the connection moves to it.
+CACHE_ENTRIES = 256
+
+
+class QueryCache:
+    def __init__(self, db_path, max_entries=CACHE_ENTRIES):
+        self.db_path = db_path
+        self.path = current_db(db_path)  # the build the connection is on
+        self.conn = connect(self.path, read_only=True, shared=True)
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()  # sessions run in their own threads
+        self.snapshot = current_snapshot(self.conn)
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def refresh_snapshot(self):
+        # Once per rerun: a pointer read and one indexed lookup; a new build or
+        # snapshot empties the cache
+        with self.lock:
+            path = current_db(self.db_path)
+            moved = path != self.path
+            if moved:
+                # Closing lets the loader prune the old build file
+                self.conn.close()
+                self.conn = connect(path, read_only=True, shared=True)
+                self.path = path
+            snapshot = current_snapshot(self.conn)
+            if moved or snapshot[0] != self.snapshot[0]:
+                self.entries.clear()
+                self.stats["invalidations"] += 1
+            self.snapshot = snapshot
+        return snapshot
+
+    def get(self, query, *args):
+        # query(conn, *args), cached. Arguments are keyed by repr, so they must
+        # repr the same for the same query (sources, filter dicts, tuples).
+        # Results are shared between sessions and must not be modified.
+        with self.lock:
+            # Under the lock, so a result is never stored under a snapshot id
+            # that refresh_snapshot moved to after it was computed
+            key = (self.snapshot[0], query.__module__, query.__qualname__, repr(args))
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return self.entries[key]
+            self.stats["misses"] += 1
+            result = query(self.conn, *args)
+            self.entries[key] = result
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            return result
+
+    def hit_rate(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+from _RECON_KEYS import KEY_COLUMNS
+
+# === CONFIGURATION ===
+# Loads picked_aging_report and erp_order_lines_oms_report once, combines their
+# interned order and SKU ids into one int64 join key, does one hash join and
+# assigns every
+# joined line all of its bucket flags with vectorized predicates. Columns are
+# read with nullable dtypes so a NULL on either side of a comparison is "no
+# match", exactly as in the SQL views this replaces.
+PICKED_TABLE = "picked_aging_report"
+ERP_TABLE = "erp_order_lines_oms_report"
+CLASSIFIED_TABLE = "recon_classified"
+# Lines reconcile within one order, so the order is the unit of change
+ORDER_COLUMNS = {PICKED_TABLE: "order_name", ERP_TABLE: "CustOrderNum"}
+
+# Single label per line for the dashboard; first matching bucket wins
+BUCKET_ORDER = [
+    "missing_in_erp",
+    "fully_matched",
+    "fully_canceled",
+    "partial_shipped_only",
+    "shipped_plus_canceled_matches",
+    "remaining_open",
+]
+UNCLASSIFIED = "unclassified"
+
+
+def load_inputs(conn):
+    picked = pd.read_sql_query(f"SELECT * FROM {PICKED_TABLE}", conn, dtype_backend="numpy_nullable")
+    erp = pd.read_sql_query(f"SELECT * FROM {ERP_TABLE}", conn, dtype_backend="numpy_nullable")
+    return picked, erp
+
+
+def join_keys(df, stride):
+    # order_key * stride + sku_key; -1 where either id is NULL
+    order_ids = df[KEY_COLUMNS["order"]].to_numpy(dtype=np.int64, na_value=-1)
+    sku_ids = df[KEY_COLUMNS["sku"]].to_numpy(dtype=np.int64, na_value=-1)
+    keys = order_ids * stride + sku_ids
+    keys[(order_ids < 0) | (sku_ids < 0)] = -1
+    return keys
+
+
+def _true(mask):
+    # Nullable comparison -> plain bool array, NULL counting as False
+    return mask.fillna(False).to_numpy(dtype=bool)
+
+
+def order_keys(df, order_col):
+    # NULL order numbers are grouped under ""
+    return df[order_col].fillna("").astype(str)
+
+
+def order_digests(df, order_col):
+    # Per-order content hash: the wrapping int64 sum of every row's hash, so it
+    # ignores row order and changes when any line is added, dropped or edited
+    if df.empty:
+        return pd.Series(dtype=np.int64)
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy().view(np.int64)
+    return pd.Series(row_hashes, index=order_keys(df, order_col).to_numpy()).groupby(level=0).sum()
+
+
+def classify(picked, erp, first_line_id=0):
+    # Both sides carry interned ids (see _RECON_KEYS); the ERP side's are
+    # renamed erp_<id column> so the two sets survive the join
+    sku_ids = pd.concat([picked[KEY_COLUMNS["sku"]], erp[KEY_COLUMNS["sku"]]])
+    stride = 1 if sku_ids.isna().all() else int(sku_ids.max()) + 1
+    left = picked.assign(pick_line_id=np.arange(len(picked)), _key=join_keys(picked, stride))
+    right = erp.assign(_key=join_keys(erp, stride))
+    right = right[right["_key"] >= 0].rename(columns={c: f"erp_{c}" for c in KEY_COLUMNS.values()})
+    merged = left.merge(right, on="_key", how="left").drop(columns="_key")
+
+    warehouse, erp_warehouse = merged[KEY_COLUMNS["warehouse"]], merged[f"erp_{KEY_COLUMNS['warehouse']}"]
+    exists = merged["CustOrderNum"].notna().to_numpy()
+    exact = exists & _true(warehouse == erp_warehouse) \
+        & _true(merged["order_shipment_line_units"] == merged["OrderQty"])
+    # NOT (a AND b) is only true when some part is definitely false, not NULL
+    not_fully_matched = exists & (_true(warehouse != erp_warehouse)
+                                  | _true(merged["order_shipment_line_units"] != merged["OrderQty"]))
+    shipped = _true(merged["OrderQty"] == merged["ShippedQty"])
+    canceled = _true(merged["OrderQty"] == merged["CancelQty"])
+    shipped_plus_canceled = _true(merged["OrderQty"] == merged["ShippedQty"] + merged["CancelQty"])
+    open_qty = _true(merged["OrderQty"] != merged["ShippedQty"] + merged["CancelQty"])
+    not_shipped = _true(merged["OrderQty"] != merged["ShippedQty"])
+    not_canceled = _true(merged["OrderQty"] != merged["CancelQty"])
+
+    # Pick-level: does any ERP line match the pick line on all four keys?
+    pick_ids = merged["pick_line_id"].to_numpy()
+    has_exact = (np.bincount(pick_ids[exact], minlength=len(picked)) > 0)[pick_ids]
+    relaxed = exists & ~has_exact
+
+    flags = {
+        "flag_exists_in_erp": exists,
+        "flag_missing_in_erp": ~exists,
+        "flag_fully_matched": exact,
+        "flag_not_fully_matched": not_fully_matched,
+        "flag_partial_shipped_only": not_fully_matched & shipped,
+        "flag_fully_canceled": not_fully_matched & canceled,
+        "flag_shipped_plus_canceled_matches": not_fully_matched & shipped_plus_canceled,
+        "flag_remaining_open": not_fully_matched & open_qty,
+        "flag_missing_exact_pick": ~has_exact & ~merged["pick_line_id"].duplicated().to_numpy(),
+        "flag_relaxed": relaxed,
+        "flag_relaxed_fully_shipped": relaxed & shipped,
+        "flag_relaxed_partial_shipped": relaxed & not_shipped,
+        "flag_relaxed_fully_canceled": relaxed & not_shipped & canceled,
+        "flag_relaxed_still_open": relaxed & not_shipped & not_canceled,
+    }
+    for name, values in flags.items():
+        merged[name] = values.astype(np.int8)
+    merged["bucket"] = np.select([flags[f"flag_{b}"] for b in BUCKET_ORDER], BUCKET_ORDER, default=UNCLASSIFIED)
+    merged["pick_line_id"] += first_line_id
+    return merged
+
+
+def write_classified(conn, classified, table=CLASSIFIED_TABLE):
+    classified.to_sql(table, conn, if_exists="replace", index=False, chunksize=50000)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_bucket ON {table} (bucket)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_pick ON {table} (pick_line_id)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_order ON {table} (order_name)")
+    conn.commit()
+
+
+def bucket_counts(classified):
+    return classified["bucket"].value_counts().to_dict()
@@ -0,0 +1,173 @@
+import json
+import pandas as pd
+
+# === CONFIGURATION ===
+# Every loader puts its join keys through the same canonical forms before they
+# are stored, so the reconciliation never depends on query-time rewrites:
+#   order number  trimmed, upper case, numeric Shopify names as "#<digits>"
+#   SKU           trimmed, upper case
+#   warehouse     trimmed, upper case, WAREHOUSE_ALIASES applied (AYS -> 10)
+#   quantity      numeric; whole-number columns stored as integers
+# Tables in pick_aging.db also carry interned integer ids for order, SKU and
+# warehouse (KEY_COLUMNS), so the reconciliation joins on integers.
+WAREHOUSE_ALIASES = [(r"^AYS", "10")]
+KEY_TABLES = {"order": "key_orders", "sku": "key_skus", "warehouse": "key_warehouses"}
+KEY_COLUMNS = {"order": "order_key", "sku": "sku_key", "warehouse": "warehouse_key"}
+
+# Source columns per role for each loaded table
+PICKED_KEYS = {"order": "order_name", "sku": "product_id", "warehouse": "location_id",
+               "quantity": ["order_shipment_line_units"]}
+ERP_KEYS = {"order": "CustOrderNum", "sku": "ItemNumber", "warehouse": "Warehouse",
+            "quantity": ["OrderQty", "ShippedQty", "CancelQty"]}
+ERP_LINES_TEXT_KEYS = {"order": "CustOrderNum", "sku": "ItemNumber", "warehouse": "Warehouse"}
+# The aging report's warehouse is shown as the ERP has it ("AYS097"); the AYS
+# alias only exists to match pick lines against ERP lines
+AGING_KEYS = {"order": "cShopifyOrderNumber"}
+
+
+# === CANONICAL FORMS ===
+def _text(series):
+    text = series.astype("string").str.strip()
+    return text.mask(text == "")
+
+
+def canonical_order_number(series):
+    return _text(series).str.upper().str.replace(r"^#*\s*(\d+)$", r"#\1", regex=True)
+
+
+def canonical_sku(series):
+    return _text(series).str.upper()
+
+
+def canonical_warehouse(series):
+    text = _text(series).str.upper()
+    for pattern, replacement in WAREHOUSE_ALIASES:
+        text = text.str.replace(pattern, replacement, regex=True)
+    return text
+
+
+def canonical_quantity(series):
+    numbers = pd.to_numeric(series, errors="coerce").astype("Float64")
+    whole = numbers.dropna()
+    return numbers.astype("Int64") if (whole == whole.round()).all() else numbers
+
+
+def order_gid(order_id):
+    # "123" -> "gid://shopify/Order/123"; global ids pass through
+    order_id = str(order_id).strip()
+    return order_id if order_id.startswith("gid://") else f"gid://shopify/Order/{order_id}"
+
+
+def shopify_id(gid):
+    # "gid://shopify/Order/123" -> "123"; plain ids pass through
+    if gid is None:
+        return None
+    return str(gid).strip().rsplit("/", 1)[-1]
+
+
+def shopify_ids(series):
+    return _text(series).str.rsplit("/", n=1).str[-1]
+
+
+CANONICAL = {"order": canonical_order_number, "sku": canonical_sku, "warehouse": canonical_warehouse}
+
+
+def canonicalize(df, spec):
+    # Rewrites the spec's columns of df in canonical form; missing columns are skipped
+    df = df.copy()
+    for role, column in spec.items():
+        if role == "quantity":
+            for name in column:
+                if name in df.columns:
+                    df[name] = canonical_quantity(df[name])
+        elif column in df.columns:
+            df[column] = CANONICAL[role](df[column])
+    return df
+
+
+# === INTERNED KEYS ===
+# One small table per key kind mapping each canonical value to an integer id.
+# Ids are never reused, so they stay valid across loads.
+def _ensure_key_table(conn, kind):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {KEY_TABLES[kind]} (
+            key INTEGER PRIMARY KEY,
+            value TEXT UNIQUE NOT NULL
+        )
+    """)
+
+
+class KeyIds:
+    # The value -> id maps of one connection's key tables, each read once and
+    # then only extended with the values it has not seen. Share one across the
+    # chunks of a streamed load so each chunk only inserts its new keys.
+    def __init__(self, conn):
+        self.conn = conn
+        self.ids = {}
+
+    def _ids(self, kind):
+        if kind not in self.ids:
+            _ensure_key_table(self.conn, kind)
+            rows = self.conn.execute(f"SELECT key, value FROM {KEY_TABLES[kind]}")
+            self.ids[kind] = {value: key for key, value in rows}
+        return self.ids[kind]
+
+    def intern(self, kind, values):
+        # values: canonical Series; returns an Int64 Series of ids (NA for NULL)
+        ids = self._ids(kind)
+        table = KEY_TABLES[kind]
+        distinct = values.dropna().unique().tolist()
+        new = [v for v in distinct if v not in ids]
+        if new:
+            with self.conn:
+                self.conn.executemany(f"INSERT OR IGNORE INTO {table} (value) VALUES (?)", [(v,) for v in new])
+            # Read back by value: another writer may have added some first
+            ids.update((value, key) for key, value in self.conn.execute(
+                f"SELECT key, value FROM {table} WHERE value IN (SELECT value FROM json_each(?))", (json.dumps(new),)
+            ))
+        # Mapped through this chunk's values only; map() copies its dict
+        return values.map({v: ids[v] for v in distinct}).astype("Int64")
+
+
+def intern(conn, kind, values):
+    return KeyIds(conn).intern(kind, values)
+
+
+def normalize_lines(conn, df, spec, key_ids=None):
+    # Canonical join columns plus their interned ids, ready to store. Streamed
+    # loads pass one KeyIds for all their chunks.
+    key_ids = key_ids or KeyIds(conn)
+    df = canonicalize(df, spec)
+    for kind, key_column in KEY_COLUMNS.items():
+        column = spec.get(kind)
+        if column in df.columns:
+            df[key_column] = key_ids.intern(kind, df[column])
+    return df
+
+
+def fill_missing_keys(conn, table, spec):
+    # Brings rows written without interned ids (older loads, manual edits) up
+    # to the loaders' form: canonical values plus ids. Returns rows updated.
+    existing = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    roles = [kind for kind in KEY_COLUMNS if spec.get(kind) in existing]
+    for kind in roles:
+        if KEY_COLUMNS[kind] not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {KEY_COLUMNS[kind]} INTEGER")
+    if not roles:
+        return 0
+
+    missing = " OR ".join(f'({KEY_COLUMNS[k]} IS NULL AND "{spec[k]}" IS NOT NULL)' for k in roles)
+    source = [spec[k] for k in roles] + [q for q in spec.get("quantity", []) if q in existing]
+    quoted = ", ".join(f'"{c}"' for c in source)
+    rows = pd.read_sql_query(f"SELECT rowid AS _rowid, {quoted} FROM {table} WHERE {missing}", conn)
+    if rows.empty:
+        return 0
+
+    rows = normalize_lines(conn, rows, {k: v for k, v in spec.items() if k == "quantity" or k in roles})
+    updated = source + [KEY_COLUMNS[k] for k in roles]
+    assignments = ", ".join(f'"{c}" = ?' for c in updated)
+    values = [[None if pd.isna(v) else v for v in rows[c].tolist()] for c in updated + ["_rowid"]]
+    with conn:
+        conn.executemany(f"UPDATE {table} SET {assignments} WHERE rowid = ?", zip(*values))
+    print(f"[✓] Normalized and keyed {len(rows)} rows in {table}")
+    return len(rows)
@@ -0,0 +1,167 @@
+import time
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# === CONFIGURATION ===
+POOL_SIZE = 8             # keep-alive sockets per host; covers the concurrent engines
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0        # seconds; doubled per attempt before jitter
+BACKOFF_CAP = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+DEFAULT_TIMEOUT = 20
+
+
+# === SHARED CLIENT ===
+# One requests.Session for every Shopify call in the process: TLS connections
+# are pooled and kept alive, responses are gzip-compressed, and 429/5xx or
+# dropped connections are retried with jittered exponential backoff that never
+# waits less than the server's Retry-After.
+class ShopifyClient:
+    def __init__(self, pool_size=POOL_SIZE, max_retries=MAX_RETRIES,
+                 backoff_base=BACKOFF_BASE, backoff_cap=BACKOFF_CAP):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers.update({"Accept-Encoding": "gzip"})
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.retries = 0
+        self.failures = 0
+        self.status_counts = {}
+        self.requested_cost = 0.0
+        self.actual_cost = 0.0
+
+    def _backoff(self, attempt, response=None):
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        response = None
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(time.monotonic() - started, "error")
+                if attempt == self.max_retries:
+                    self._count_failure()
+                    raise
+                delay = self._backoff(attempt)
+                print(f"[!] Shopify {method} failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            else:
+                self._record(time.monotonic() - started, response.status_code)
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    if response.status_code in RETRY_STATUSES:
+                        self._count_failure()
+                    return response
+                delay = self._backoff(attempt, response)
+                print(f"[!] Shopify HTTP {response.status_code}, retrying in {delay:.1f}s")
+                response.close()
+            with self.lock:
+                self.retries += 1
+            time.sleep(delay)
+        return response
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def graphql(self, url, headers, query, variables=None, timeout=DEFAULT_TIMEOUT):
+        payload = {"query": query}
+        if variables is not None:
+            payload["variables"] = variables
+        response = self.post(url, headers=headers, json=payload, timeout=timeout)
+        try:
+            data = response.json()
+        except ValueError:
+            return response, None
+        cost = (data.get("extensions") or {}).get("cost") or {}
+        with self.lock:
+            self.requested_cost += float(cost.get("requestedQueryCost") or 0)
+            self.actual_cost += float(cost.get("actualQueryCost") or 0)
+        return response, data
+
+    # === METRICS ===
+    def _record(self, latency, status):
+        with self.lock:
+            self.latencies.append(latency)
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def _count_failure(self):
+        with self.lock:
+            self.failures += 1
+
+    def connections_opened(self):
+        total = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                total += pool.num_connections
+        return total
+
+    def metrics(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            summary = {
+                "requests": len(latencies),
+                "retries": self.retries,
+                "failures": self.failures,
+                "status_counts": dict(self.status_counts),
+                "requested_cost": self.requested_cost,
+                "actual_cost": self.actual_cost,
+            }
+        if latencies:
+            summary["latency_p50"] = latencies[len(latencies) // 2]
+            summary["latency_p95"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            summary["latency_total"] = sum(latencies)
+        summary["connections_opened"] = self.connections_opened()
+        return summary
+
+    def print_metrics(self):
+        m = self.metrics()
+        if not m["requests"]:
+            return
+        print(f"[✓] Shopify HTTP: {m['requests']} requests over {m['connections_opened']} connections, "
+              f"{m['retries']} retries, {m['failures']} failures, "
+              f"latency p50 {m['latency_p50'] * 1000:.0f}ms / p95 {m['latency_p95'] * 1000:.0f}ms, "
+              f"cost {m['actual_cost']:.0f} actual / {m['requested_cost']:.0f} requested")
+
+
+def wait_for_budget(cost, needed):
+    # Sleeps until the leaky bucket in a response's extensions.cost has
+    # refilled to needed points at its restoreRate
+    status = cost.get("throttleStatus") or {}
+    available = status.get("currentlyAvailable")
+    restore_rate = status.get("restoreRate") or 50.0
+    if available is not None and available < needed:
+        delay = (needed - float(available)) / float(restore_rate)
+        print(f"[…] Shopify bucket at {available:.0f}, waiting {delay:.1f}s")
+        time.sleep(delay)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ShopifyClient()
+        return _client
@@ -0,0 +1,186 @@
+import time
+import asyncio
+from _SHOPIFY_CLIENT import get_client
+from _RECON_KEYS import order_gid
+
+# === CONFIGURATION ===
+DEFAULT_CONCURRENCY = 4      # batches kept in flight at once
+DEFAULT_BATCH_SIZE = 50      # aliased orders per GraphQL document
+LOW_WATER_FRACTION = 0.10    # keep this share of the bucket in reserve
+MAX_RETRIES = 5
+
+
+# === QUERY BUILDING ===
+def build_batch_query(order_ids):
+    query_parts = []
+    for i, oid in enumerate(order_ids):
+        query_parts.append(f'''
+        order_{i}: order(id: "{order_gid(oid)}") {{
+            id
+            name
+            displayFinancialStatus
+            displayFulfillmentStatus
+            closedAt
+            cancelledAt
+            fulfillments {{
+                status
+                location {{
+                    name
+                }}
+            }}
+        }}
+        ''')
+    return f'''
+    query {{
+        {"".join(query_parts)}
+    }}
+    '''
+
+
+def chunk_list(lst, size):
+    for i in range(0, len(lst), size):
+        yield lst[i:i + size]
+
+
+# === THROTTLE BUDGET ===
+# Local model of Shopify's leaky bucket. It is re-synced from every
+# extensions.cost.throttleStatus and refills at restoreRate between responses,
+# so callers only wait when the projected bucket would drop below the reserve.
+class ThrottleBudget:
+    def __init__(self, maximum=1000.0, restore_rate=50.0, low_water=LOW_WATER_FRACTION):
+        self.maximum = float(maximum)
+        self.restore_rate = float(restore_rate)
+        self.low_water = low_water
+        self.available = float(maximum)
+        self.synced_at = time.monotonic()
+        self.reserved = 0.0
+        self.estimated_cost = None
+        self.wait_seconds = 0.0
+        self.lock = asyncio.Lock()
+
+    def projected(self):
+        elapsed = time.monotonic() - self.synced_at
+        return min(self.maximum, self.available + elapsed * self.restore_rate) - self.reserved
+
+    async def acquire(self, cost):
+        async with self.lock:
+            floor = self.maximum * self.low_water
+            while True:
+                shortfall = cost + floor - self.projected()
+                if shortfall <= 0:
+                    break
+                delay = shortfall / max(self.restore_rate, 1.0)
+                self.wait_seconds += delay
+                await asyncio.sleep(delay)
+            self.reserved += cost
+        return cost
+
+    def release(self, reserved_cost, cost_ext):
+        self.reserved = max(0.0, self.reserved - reserved_cost)
+        if not cost_ext:
+            return None
+        status = cost_ext.get("throttleStatus") or {}
+        if status:
+            self.maximum = float(status.get("maximumAvailable", self.maximum))
+            self.restore_rate = float(status.get("restoreRate", self.restore_rate))
+            self.available = float(status.get("currentlyAvailable", self.available))
+            self.synced_at = time.monotonic()
+        actual = cost_ext.get("actualQueryCost")
+        requested = cost_ext.get("requestedQueryCost")
+        # The bucket is charged the requested cost up front, so size the next
+        # reservation on that and smooth it so one outlier doesn't stall the pool
+        observed = requested if requested is not None else actual
+        if observed is not None:
+            observed = float(observed)
+            if self.estimated_cost is None:
+                self.estimated_cost = observed
+            else:
+                self.estimated_cost = 0.7 * self.estimated_cost + 0.3 * observed
+        return actual
+
+
+# === ENRICHMENT ENGINE ===
+class GraphQLEnrichmentEngine:
+    def __init__(self, endpoint, headers, concurrency=DEFAULT_CONCURRENCY,
+                 batch_size=DEFAULT_BATCH_SIZE, client=None, timeout=20, verbose=True):
+        self.endpoint = endpoint
+        self.headers = headers
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.client = client or get_client()
+        self.verbose = verbose
+        self.budget = ThrottleBudget()
+        self.stats = {
+            "requests": 0,
+            "batches": 0,
+            "orders": 0,
+            "throttled": 0,
+            "failed_batches": 0,
+            "actual_cost": 0.0,
+            "elapsed": 0.0,
+        }
+
+    def _send(self, query):
+        response, data = self.client.graphql(self.endpoint, self.headers, query, timeout=self.timeout)
+        return response.status_code, data
+
+    async def _run_batch(self, batch, semaphore, on_batch):
+        query = build_batch_query(batch)
+        async with semaphore:
+            for attempt in range(MAX_RETRIES):
+                estimate = self.budget.estimated_cost or float(len(batch) * 2 + 1)
+                reserved = await self.budget.acquire(estimate)
+                cost_ext = None
+                try:
+                    status_code, data = await asyncio.to_thread(self._send, query)
+                    cost_ext = ((data or {}).get("extensions") or {}).get("cost")
+                except Exception as e:
+                    print(f"[!] Shopify batch error: {e}")
+                    data, status_code = None, None
+                finally:
+                    actual = self.budget.release(reserved, cost_ext)
+                self.stats["requests"] += 1
+                if actual is not None:
+                    self.stats["actual_cost"] += float(actual)
+
+                if data is None or status_code == 429 or status_code >= 500:
+                    await asyncio.sleep(min(2 ** attempt, 30))
+                    continue
+
+                errors = data.get("errors") or []
+                if any((err.get("extensions") or {}).get("code") == "THROTTLED" for err in errors):
+                    self.stats["throttled"] += 1
+                    continue
+
+                orders = [order for order in (data.get("data") or {}).values() if order]
+                if self.verbose:
+                    print(f"[→] Shopify GraphQL batch call ({len(batch)} IDs) HTTP {status_code}, "
+                          f"cost {actual}, bucket {self.budget.available:.0f}/{self.budget.maximum:.0f}")
+                self.stats["batches"] += 1
+                self.stats["orders"] += len(orders)
+                if on_batch:
+                    on_batch(batch, orders)
+                return orders
+
+        self.stats["failed_batches"] += 1
+        print(f"[!] Giving up on batch after {MAX_RETRIES} attempts (IDs: {batch})")
+        return []
+
+    async def run(self, order_ids, on_batch=None):
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = [
+            self._run_batch(batch, semaphore, on_batch)
+            for batch in chunk_list(list(order_ids), self.batch_size)
+        ]
+        results = await asyncio.gather(*tasks)
+        self.stats["elapsed"] = time.monotonic() - started
+        self.stats["throttle_wait"] = self.budget.wait_seconds
+        return [order for batch_orders in results for order in batch_orders]
+
+
+def enrich_orders(order_ids, endpoint, headers, on_batch=None, **kwargs):
+    engine = GraphQLEnrichmentEngine(endpoint, headers, **kwargs)
+    orders = asyncio.run(engine.run(order_ids, on_batch=on_batch))
+    return orders, engine.stats
@@ -0,0 +1,237 @@
+import json
+import hashlib
+from datetime import datetime, timedelta
+from _RECON_KEYS import order_gid
+
+# === CONFIGURATION ===
+# How long a cached Shopify order stays fresh, by what Shopify last said about it
+TTL_CLOSED = timedelta(days=30)       # fulfilled, closed, cancelled, refunded or voided
+TTL_OPEN = timedelta(hours=24)        # still open, not yet aged
+TTL_OPEN_AGED = timedelta(hours=4)    # still open and older than AGED_ORDER_DAYS in the ERP
+TTL_MISSING = timedelta(days=3)       # Shopify returned null for the ID
+AGED_ORDER_DAYS = 30
+MAX_CACHED_ORDERS = 50000             # least recently requested rows are evicted past this
+
+TS_FORMAT = "%Y%m%d_%H%M%S"
+CLOSED_FINANCIAL = {"REFUNDED", "VOIDED"}
+
+
+def classify(order_data):
+    if order_data is None:
+        return "missing"
+    if order_data.get("closedAt") or order_data.get("cancelledAt"):
+        return "closed"
+    if (order_data.get("displayFulfillmentStatus") or "").upper() == "FULFILLED":
+        return "closed"
+    if (order_data.get("displayFinancialStatus") or "").upper() in CLOSED_FINANCIAL:
+        return "closed"
+    return "open"
+
+
+def content_hash(order_data):
+    return hashlib.sha256(json.dumps(order_data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# === CACHE ===
+# shopify_orders doubles as the cache: one row per order GID with when it was
+# fetched, a hash of the payload, the status class that picks its TTL and when
+# an ERP run last asked for it (used for eviction). `timestamp` only moves when
+# the payload actually changes or the order goes missing, so the parse step
+# re-parses changed orders only and drops the parsed rows of missing ones.
+class ShopifyOrderCache:
+    COLUMNS = {
+        "fetched_at": "TEXT",
+        "content_hash": "TEXT",
+        "cache_status": "TEXT",
+        "last_requested": "TEXT",
+        "hit_count": "INTEGER DEFAULT 0",
+    }
+
+    def __init__(self, conn, now=None):
+        self.conn = conn
+        self.now = now or datetime.now()
+        self.stats = {"hits": 0, "misses_new": 0, "misses_stale": 0, "stored": 0,
+                      "unchanged": 0, "missing": 0, "evicted": 0}
+        self.ensure_schema()
+
+    def ensure_schema(self):
+        cursor = self.conn.cursor()
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS shopify_orders (
+            id TEXT PRIMARY KEY,
+            timestamp TEXT,
+            raw_json TEXT
+        )
+        """)
+        existing = {row[1] for row in cursor.execute("PRAGMA table_info(shopify_orders)")}
+        for column, column_type in self.COLUMNS.items():
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE shopify_orders ADD COLUMN {column} {column_type}")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_shopify_orders_last_requested ON shopify_orders (last_requested)")
+        self.conn.commit()
+
+    def ttl_for(self, cache_status, age_days):
+        if cache_status == "closed":
+            return TTL_CLOSED
+        if cache_status == "missing":
+            return TTL_MISSING
+        if age_days is not None and age_days >= AGED_ORDER_DAYS:
+            return TTL_OPEN_AGED
+        return TTL_OPEN
+
+    def ids_to_refresh(self, order_ids, ages=None):
+        # Returns the subset of order_ids that must be fetched from Shopify;
+        # everything else is served from the cache and counted as a hit
+        ages = ages or {}
+        now_ts = self.now.strftime(TS_FORMAT)
+        cached = {
+            row[0]: row[1:]
+            for row in self.conn.execute("SELECT id, fetched_at, cache_status FROM shopify_orders")
+        }
+        due = []
+        hits = []
+        for oid in order_ids:
+            gid = order_gid(oid)
+            entry = cached.get(gid)
+            if entry is None or not entry[0]:
+                self.stats["misses_new"] += 1
+                due.append(oid)
+                continue
+            fetched_at, cache_status = entry
+            ttl = self.ttl_for(cache_status, ages.get(str(oid)))
+            if datetime.strptime(fetched_at, TS_FORMAT) + ttl <= self.now:
+                self.stats["misses_stale"] += 1
+                due.append(oid)
+            else:
+                self.stats["hits"] += 1
+                hits.append((now_ts, gid))
+
+        self.conn.executemany(
+            "UPDATE shopify_orders SET last_requested = ?, hit_count = COALESCE(hit_count, 0) + 1 WHERE id = ?",
+            hits
+        )
+        self.conn.executemany(
+            "UPDATE shopify_orders SET last_requested = ? WHERE id = ?",
+            [(now_ts, order_gid(oid)) for oid in due]
+        )
+        self.conn.commit()
+        return due
+
+    def store(self, requested_ids, orders, run_timestamp):
+        # Returns the GIDs whose payload changed; IDs Shopify did not return
+        # are cached as missing under their own TTL
+        now_ts = self.now.strftime(TS_FORMAT)
+        existing = dict(self.conn.execute(
+            f"SELECT id, content_hash FROM shopify_orders WHERE id IN ({','.join('?' * len(requested_ids))})",
+            [order_gid(oid) for oid in requested_ids]
+        ).fetchall()) if requested_ids else {}
+
+        changed = []
+        returned = set()
+        for order_data in orders:
+            gid = order_data["id"]
+            returned.add(gid)
+            digest = content_hash(order_data)
+            if existing.get(gid) == digest:
+                self.stats["unchanged"] += 1
+                self.conn.execute(
+                    "UPDATE shopify_orders SET fetched_at = ?, cache_status = ? WHERE id = ?",
+                    (now_ts, classify(order_data), gid)
+                )
+                continue
+            self.stats["stored"] += 1
+            changed.append(gid)
+            self.conn.execute("""
+                INSERT INTO shopify_orders (id, timestamp, raw_json, fetched_at, content_hash, cache_status, last_requested)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    timestamp = excluded.timestamp,
+                    raw_json = excluded.raw_json,
+                    fetched_at = excluded.fetched_at,
+                    content_hash = excluded.content_hash,
+                    cache_status = excluded.cache_status,
+                    last_requested = excluded.last_requested
+            """, (gid, run_timestamp, json.dumps(order_data), now_ts, digest, classify(order_data), now_ts))
+
+        for oid in requested_ids:
+            gid = order_gid(oid)
+            if gid in returned:
+                continue
+            self.stats["missing"] += 1
+            self.conn.execute("""
+                INSERT INTO shopify_orders (id, timestamp, raw_json, fetched_at, content_hash, cache_status, last_requested)
+                VALUES (?, ?, NULL, ?, NULL, 'missing', ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    timestamp = excluded.timestamp,
+                    raw_json = NULL,
+                    fetched_at = excluded.fetched_at,
+                    content_hash = NULL,
+                    cache_status = 'missing'
+            """, (gid, run_timestamp, now_ts, now_ts))
+        self.conn.commit()
+        return changed
+
+    def evict(self, max_rows=MAX_CACHED_ORDERS):
+        # Drops the least recently requested orders beyond the size bound and
+        # returns their GIDs so dependent tables can be trimmed as well
+        total = self.conn.execute("SELECT COUNT(*) FROM shopify_orders").fetchone()[0]
+        if total <= max_rows:
+            return []
+        evicted = [row[0] for row in self.conn.execute(
+            "SELECT id FROM shopify_orders ORDER BY COALESCE(last_requested, '') ASC LIMIT ?",
+            (total - max_rows,)
+        )]
+        self.conn.executemany("DELETE FROM shopify_orders WHERE id = ?", [(gid,) for gid in evicted])
+        self.conn.commit()
+        self.stats["evicted"] += len(evicted)
+        return evicted
+
+    def seed_from(self, db_path):
+        # Fills an empty cache from the shopify_orders table of db_path (the
+        # published mad_recon.db build that held the cache before it moved out)
+        if self.conn.execute("SELECT 1 FROM shopify_orders LIMIT 1").fetchone():
+            return 0
+        columns = ", ".join(["id", "timestamp", "raw_json"] + list(self.COLUMNS))
+        self.conn.execute("ATTACH DATABASE ? AS seed", (db_path,))
+        try:
+            if self.conn.execute("SELECT 1 FROM seed.sqlite_master WHERE name = 'shopify_orders'").fetchone():
+                self.conn.execute(f"INSERT INTO shopify_orders ({columns}) SELECT {columns} FROM seed.shopify_orders")
+            self.conn.commit()
+        finally:
+            self.conn.execute("DETACH DATABASE seed")
+        seeded = self.conn.execute("SELECT COUNT(*) FROM shopify_orders").fetchone()[0]
+        print(f"[✓] Seeded the Shopify cache with {seeded} orders from {db_path}")
+        return seeded
+
+    def print_stats(self):
+        s = self.stats
+        lookups = s["hits"] + s["misses_new"] + s["misses_stale"]
+        hit_rate = (s["hits"] / lookups * 100) if lookups else 0.0
+        print(f"[✓] Shopify cache: {s['hits']} hits, {s['misses_new']} new, {s['misses_stale']} stale "
+              f"({hit_rate:.1f}% hit rate); {s['stored']} changed, {s['unchanged']} unchanged, "
+              f"{s['missing']} missing, {s['evicted']} evicted")
+
+
+def copy_orders_into(conn, cache_path):
+    # Replaces shopify_orders in the database conn is on (a build) with the
+    # cache's rows and returns the GIDs to re-parse: orders that are new or
+    # whose timestamp moved since the build's copy, and orders that left the
+    # cache. A crawl that died before its build was published is picked up
+    # by the next one this way, whatever run timestamp its orders carry.
+    ShopifyOrderCache(conn)  # same table in the build
+    columns = ", ".join(["id", "timestamp", "raw_json"] + list(ShopifyOrderCache.COLUMNS))
+    conn.execute("ATTACH DATABASE ? AS order_cache", (cache_path,))
+    try:
+        changed = [row[0] for row in conn.execute("""
+            SELECT c.id FROM order_cache.shopify_orders c LEFT JOIN main.shopify_orders m ON m.id = c.id
+            WHERE m.id IS NULL OR m.timestamp IS NOT c.timestamp
+            UNION ALL
+            SELECT id FROM main.shopify_orders WHERE id NOT IN (SELECT id FROM order_cache.shopify_orders)
+        """)]
+        with conn:
+            conn.execute("DELETE FROM main.shopify_orders")
+            conn.execute(f"INSERT INTO main.shopify_orders ({columns}) "
+                         f"SELECT {columns} FROM order_cache.shopify_orders")
+    finally:
+        conn.execute("DETACH DATABASE order_cache")
+    return changed
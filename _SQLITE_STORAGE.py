@@ -0,0 +1,201 @@
+import atexit
+import sqlite3
+import threading
+import pandas as pd
+from datetime import datetime
+
+# === CONFIGURATION ===
+# Every script gets its SQLite connections from here so they all run with the
+# same settings: WAL for writers (dashboard reads never wait on a loader and
+# vice versa; readers keep whatever mode the file has, see _DB_BUILDS),
+# synchronous=NORMAL (safe under WAL, no fsync per commit), a 64 MB page cache,
+# in-memory temp tables and a 256 MB memory map.
+JOURNAL_MODE = "WAL"
+SYNCHRONOUS = "NORMAL"
+CACHE_SIZE_KB = 64 * 1024
+MMAP_SIZE = 256 * 1024 * 1024
+BUSY_TIMEOUT_MS = 30000
+BATCH_ROWS = 5000  # rows per executemany/commit in BatchWriter
+
+
+def connect(db_path, read_only=False, shared=False):
+    # shared: usable from several threads; the caller serializes access
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=not shared)
+    if not read_only:
+        conn.execute(f"PRAGMA journal_mode={JOURNAL_MODE}")
+    conn.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    if read_only:
+        conn.execute("PRAGMA query_only=ON")
+    return conn
+
+
+# === CONNECTION REUSE ===
+# One connection per database per thread, kept open for the life of the
+# process, so per-page helpers stop paying for connect + pragmas every call.
+_local = threading.local()
+_open_connections = []
+_open_lock = threading.Lock()
+
+
+def get_connection(db_path):
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = connections[db_path] = connect(db_path)
+        with _open_lock:
+            _open_connections.append(conn)
+    return conn
+
+
+def close_connections():
+    with _open_lock:
+        for conn in _open_connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass
+        _open_connections.clear()
+    _local.__dict__.pop("connections", None)
+
+
+atexit.register(close_connections)
+
+
+# === BATCHED WRITES ===
+# Buffers rows for one statement and flushes them with executemany, committing
+# once per batch_rows rows instead of once per row or per connection.
+class BatchWriter:
+    def __init__(self, conn, sql, batch_rows=BATCH_ROWS):
+        self.conn = conn
+        self.sql = sql
+        self.batch_rows = batch_rows
+        self.pending = []
+        self.rows_written = 0
+
+    def add(self, row):
+        self.pending.append(row)
+        if len(self.pending) >= self.batch_rows:
+            self.flush()
+
+    def extend(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def flush(self):
+        if not self.pending:
+            return
+        with self.conn:
+            self.conn.executemany(self.sql, self.pending)
+        self.rows_written += len(self.pending)
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
+
+
+def insert_sql(table, columns, verb="INSERT"):
+    quoted = ", ".join(f'"{c}"' for c in columns)
+    return f"{verb} INTO {table} ({quoted}) VALUES ({', '.join('?' * len(columns))})"
+
+
+def insert_frame(conn, table, df, batch_rows=BATCH_ROWS, verb="INSERT"):
+    # Appends a DataFrame to an existing table through BatchWriter; NaN becomes NULL
+    if df.empty:
+        return 0
+    columns = []
+    for name in df.columns:
+        values = df[name].tolist()
+        if df[name].isna().any():
+            values = [None if pd.isna(v) else v for v in values]
+        columns.append(values)
+    with BatchWriter(conn, insert_sql(table, list(df.columns), verb), batch_rows) as writer:
+        writer.extend(zip(*columns))
+    return writer.rows_written
+
+
+# === SCHEMA MIGRATIONS ===
+# Each script declares an ordered list of (name, step) where step is SQL (may
+# hold several statements) or a callable taking the connection. Applied names
+# are recorded in schema_migrations, so scripts sharing a database file keep
+# independent histories and every step runs exactly once per database.
+def _ensure_migrations_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TEXT
+        )
+    """)
+    conn.commit()
+
+
+def forget_migrations(conn, migrations):
+    # For scripts that drop their tables: the next migrate() rebuilds them
+    _ensure_migrations_table(conn)
+    with conn:
+        conn.executemany("DELETE FROM schema_migrations WHERE name = ?", [(name,) for name, step in migrations])
+
+
+def migrate(conn, migrations):
+    _ensure_migrations_table(conn)
+    applied = {row[0] for row in conn.execute("SELECT name FROM schema_migrations")}
+    for name, step in migrations:
+        if name in applied:
+            continue
+        if callable(step):
+            step(conn)
+        else:
+            conn.executescript(step)
+        conn.execute(
+            "INSERT INTO schema_migrations (name, applied_at) VALUES (?, ?)",
+            (name, datetime.now().strftime("%Y%m%d_%H%M%S"))
+        )
+        conn.commit()
+        print(f"[✓] Applied schema migration: {name}")
+
+
+# === PIPELINE SNAPSHOTS ===
+# Each loader records its successful refresh of a database as a new row here.
+# The newest snapshot_id names the data readers currently see, so dashboards
+# can cache query results on it and drop them as soon as a load finishes.
+SNAPSHOT_TABLE = "pipeline_snapshots"
+NO_SNAPSHOT = (0, None, None)
+
+
+def bump_snapshot(conn, loader):
+    # Call once the loader's last commit is done; returns the new snapshot_id
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SNAPSHOT_TABLE} (
+            snapshot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            loader TEXT,
+            committed_at TEXT
+        )
+    """)
+    with conn:
+        snapshot_id = conn.execute(
+            f"INSERT INTO {SNAPSHOT_TABLE} (loader, committed_at) VALUES (?, ?)",
+            (loader, datetime.now().strftime("%Y%m%d_%H%M%S"))
+        ).lastrowid
+    print(f"[✓] Published snapshot {snapshot_id} ({loader})")
+    return snapshot_id
+
+
+def current_snapshot(conn):
+    # (snapshot_id, loader, committed_at) of the newest refresh; NO_SNAPSHOT before the first
+    try:
+        row = conn.execute(
+            f"SELECT snapshot_id, loader, committed_at FROM {SNAPSHOT_TABLE} ORDER BY snapshot_id DESC LIMIT 1"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return NO_SNAPSHOT
+    return row or NO_SNAPSHOT
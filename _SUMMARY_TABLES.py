@@ -0,0 +1,109 @@
+import sqlite3
+import pandas as pd
+
+# === CONFIGURATION ===
+# Compact per-group counts and units the dashboards' KPI headers and charts
+# read instead of scanning erp_aging_data or recon_classified on every rerun.
+# A summary table holds one row per combination of its dimensions; loads keep
+# it current in the same transaction as the rows it summarizes, by folding out
+# the changed orders' old rows (sign=-1) and folding in their new ones, or, for
+# writers that touch every row, by rebuilding it from the source table.
+AGING_BUCKETS = [(91, "91+"), (61, "61-90"), (31, "31-60"), (0, "0-30")]  # iAge lower bound -> label
+UNKNOWN_AGE = "unknown"
+
+
+def age_bucket_sql(column='{row}"iAge"'):
+    cases = " ".join(f"WHEN {column} >= {low} THEN '{label}'" for low, label in AGING_BUCKETS)
+    return f"CASE WHEN {column} IS NULL THEN '{UNKNOWN_AGE}' {cases} ELSE '{AGING_BUCKETS[-1][1]}' END"
+
+
+class SummarySpec:
+    # source rows GROUP BY dimensions (name -> SQL expression over one source
+    # row, columns prefixed {row}; NULLs become '' so every group has a key)
+    # with measures (name -> SQL aggregate, additive across disjoint sets of
+    # rows). The first measure counts rows: a group whose count folds to zero
+    # is dropped.
+    def __init__(self, table, source, dimensions, measures):
+        self.table = table
+        self.source = source
+        self.dimensions = dimensions
+        self.measures = measures
+
+    def dimension_sql(self, row=""):
+        return [expr.format(row=row) for expr in self.dimensions.values()]
+
+
+AGING_SUMMARY = SummarySpec(
+    "summary_erp_aging", "erp_aging_data",
+    dimensions={
+        "warehouse": "COALESCE({row}\"warehouse\", '')",
+        "age_bucket": age_bucket_sql(),
+        "hold_code": "COALESCE({row}\"hold-code\", '')",
+    },
+    measures={"orders": "COUNT(*)"},
+)
+RECON_SUMMARY = SummarySpec(
+    "summary_recon", "recon_classified",
+    dimensions={
+        "bucket": "{row}bucket",
+        "location": "COALESCE({row}location_id, '')",
+    },
+    measures={
+        "lines": "COUNT(*)",
+        "orders": "COUNT(DISTINCT order_name)",
+        "pick_units": "COALESCE(SUM(order_shipment_line_units), 0)",
+        "erp_open_units": "COALESCE(SUM(MAX(COALESCE(OrderQty, 0) - COALESCE(ShippedQty, 0) "
+                          "- COALESCE(CancelQty, 0), 0)), 0)",
+    },
+)
+
+
+def ensure_summary(conn, spec):
+    # Creates the table if needed; True while it is empty and wants a
+    # rebuild_summary rather than folds
+    columns = [f"{name} TEXT NOT NULL" for name in spec.dimensions] + [f"{name} NUMERIC" for name in spec.measures]
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {spec.table} ({', '.join(columns)}, "
+                 f"PRIMARY KEY ({', '.join(spec.dimensions)}))")
+    return conn.execute(f"SELECT 1 FROM {spec.table} LIMIT 1").fetchone() is None
+
+
+def _grouped_select(spec, source, where, sign):
+    dimensions = ", ".join(spec.dimension_sql())
+    measures = ", ".join(f"{sign} * ({aggregate})" for aggregate in spec.measures.values())
+    # The WHERE keeps SQLite's upsert parser from reading ON CONFLICT as a join
+    return f"SELECT {dimensions}, {measures} FROM {source} WHERE {where or 'true'} GROUP BY {dimensions}"
+
+
+def rebuild_summary(conn, spec):
+    # Runs inside the caller's transaction
+    ensure_summary(conn, spec)
+    conn.execute(f"DELETE FROM {spec.table}")
+    conn.execute(f"INSERT INTO {spec.table} ({', '.join([*spec.dimensions, *spec.measures])}) "
+                 f"{_grouped_select(spec, spec.source, '', 1)}")
+
+
+def _upsert_sql(spec, select):
+    names = [*spec.dimensions, *spec.measures]
+    updates = ", ".join(f"{name} = {name} + excluded.{name}" for name in spec.measures)
+    return (f"INSERT INTO {spec.table} ({', '.join(names)}) {select} "
+            f"ON CONFLICT ({', '.join(spec.dimensions)}) DO UPDATE SET {updates}")
+
+
+def _prune_sql(spec):
+    # Groups whose row count folded to zero
+    return f"DELETE FROM {spec.table} WHERE {next(iter(spec.measures))} = 0"
+
+
+def fold_into_summary(conn, spec, where="", sign=1, source=None, params=()):
+    # Adds (sign=1) or removes (sign=-1) the grouped measures of source's rows
+    # matching where; runs inside the caller's transaction
+    conn.execute(_upsert_sql(spec, _grouped_select(spec, source or spec.source, where, sign)), params)
+    conn.execute(_prune_sql(spec))
+
+
+def read_summary(conn, spec):
+    # The whole summary table, or an empty frame before its first build
+    try:
+        return pd.read_sql_query(f"SELECT * FROM {spec.table}", conn)
+    except (sqlite3.OperationalError, pd.errors.DatabaseError):
+        return pd.DataFrame(columns=[*spec.dimensions, *spec.measures])
@@ -1,6 +1,8 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
+from datetime import datetime
+from _PICK_RECON_TABLES import CLASSIFIED_TABLE, materialized_name, refresh_info
+from _EXPLORER_QUERIES import recon_source
+from _EXPLORER_UI import open_cache, sidebar_filters, paged_table, export_downloads, cache_debug_panel, recon_kpi_header
 
 # === CONFIGURATION ===
 DB_PATH = "pick_aging.db"
@@ -13,30 +15,50 @@ VIEW_MAPPING = {
     "Orders Open Needing Resolution": "picked_aging_remaining_open",
     "Orders to be Cancelled in OMS": "picked_aging_fully_canceled"
 }
+# Every pick line with its bucket; read from recon_classified, which holds
+# exactly that view's rows, so it can be filtered by bucket
+ALL_LINES_VIEW = "picked_aging_merged_with_erp"
+
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
 
 # === Streamlit UI ===
 st.set_page_config(page_title="ERP & Aging Explorer", layout="wide")
 st.title("🗂️ ERP & Aging Views Explorer")
 
+# Shared read-only connection and result cache; results are cached per pipeline
+# snapshot, so a rerun re-queries only after a load (see _QUERY_CACHE)
+cache = open_cache(DB_PATH)
+cache_debug_panel(cache)
+
+# === KPI header from summary_recon ===
+recon_kpi_header(cache)
+
 selected_view_label = st.selectbox("Select View", options=list(VIEW_MAPPING.keys()))
 selected_view_name = VIEW_MAPPING[selected_view_label]
 
-# === Load data from DB ===
-@st.cache_data
-def load_data(view_name):
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query(f"SELECT * FROM {view_name}", conn)
-    conn.close()
-    return df
+# === Query the materialized table built by the load step ===
+# Filters, counts and pages are all answered by SQLite (see _EXPLORER_QUERIES);
+# only the visible page reaches pandas and the browser
+table = materialized_name(selected_view_name)
+info = cache.get(refresh_info, table)
+if not info:
+    st.warning("The reconciliation tables have not been built yet — run the pick or ERP load step first.")
+    st.stop()
+
+if selected_view_name == ALL_LINES_VIEW:
+    columns = cache.get(table_columns, table) + ["bucket"]
+    source = recon_source(CLASSIFIED_TABLE, columns=columns, bucket=True)
+else:
+    source = recon_source(table)
 
 # === Display data ===
 st.subheader(f"View: {selected_view_label}")
-df = load_data(selected_view_name)
-
-st.write(f"**Total rows:** {len(df)}")
-st.dataframe(df, use_container_width=True)
-
-# Optionally allow CSV download
-csv = df.to_csv(index=False).encode("utf-8")
-st.download_button("Download CSV", csv, f"{selected_view_name}.csv", "text/csv")
+st.caption(f"Refreshed {datetime.strptime(info[0], '%Y%m%d_%H%M%S'):%Y-%m-%d %H:%M:%S}")
+values = sidebar_filters(cache, source, selected_view_name, "Filters")
+paged_table(cache, source, values, selected_view_name)
 
+# Downloads: the load step's gzip CSV/Parquet of the whole view, or the filtered rows streamed from SQLite
+export_downloads(cache, source, values, selected_view_name, selected_view_name)